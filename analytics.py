@@ -0,0 +1,144 @@
+import logging
+from datetime import datetime, timezone
+from sqlalchemy import select, delete, func, case, or_, union_all
+from database import upsert_insert
+from models import CallLog, CallLogArchive, DailyCallStats, MemberCallStats, Meeting, Member
+
+logger = logging.getLogger(__name__)
+
+# Final CallLog status -> stats column. Canceled calls were never answered
+# or refused by anyone, so they don't count.
+OUTCOMES = {"completed": "completed", "busy": "busy", "no-answer": "no_answer", "failed": "failed"}
+COUNTERS = ("calls", "completed", "busy", "no_answer", "failed")
+UPSERT_CHUNK = 500
+
+
+def _upsert(db, model, keys, rows):
+    rows = sorted(rows, key=lambda r: tuple(r[k] for k in keys))
+    for i in range(0, len(rows), UPSERT_CHUNK):
+        stmt = upsert_insert(db)(model).values(rows[i:i + UPSERT_CHUNK])
+        values = {c: getattr(model, c) + getattr(stmt.excluded, c) for c in COUNTERS}
+        if model is MemberCallStats:
+            values["last_call_at"] = case(
+                (or_(model.last_call_at.is_(None), stmt.excluded.last_call_at > model.last_call_at),
+                 stmt.excluded.last_call_at),
+                else_=model.last_call_at,
+            )
+        db.execute(stmt.on_conflict_do_update(index_elements=keys, set_=values))
+
+
+def record(db, logs):
+    """Add calls that just reached a final status to the stats tables.
+
+    ``logs`` are CallLog rows (or anything with the same attributes) already
+    carrying their new status; other statuses are ignored. One upsert per
+    table in the caller's transaction.
+    """
+    days, members = {}, {}
+    for log in logs:
+        column = OUTCOMES.get(log.status)
+        if column is None:
+            continue
+        at = log.initiated_at or datetime.now(timezone.utc).replace(tzinfo=None)
+        day = days.setdefault((log.org_id, log.meeting_id, at.date()), dict.fromkeys(COUNTERS, 0))
+        member = members.setdefault((log.org_id, log.member_id), {**dict.fromkeys(COUNTERS, 0), "last_call_at": at})
+        for counts in (day, member):
+            counts["calls"] += 1
+            counts[column] += 1
+        member["last_call_at"] = max(member["last_call_at"], at)
+    if days:
+        _upsert(db, DailyCallStats, ["org_id", "meeting_id", "day"], [
+            {"org_id": org_id, "meeting_id": meeting_id, "day": day, **counts}
+            for (org_id, meeting_id, day), counts in days.items()
+        ])
+        _upsert(db, MemberCallStats, ["org_id", "member_id"], [
+            {"org_id": org_id, "member_id": member_id, **counts}
+            for (org_id, member_id), counts in members.items()
+        ])
+
+
+def rebuild(db, org_id=None, batch_size=5000):
+    """Recompute the stats from call_log and call_log_archive. Caller commits."""
+    for model in (DailyCallStats, MemberCallStats):
+        q = delete(model)
+        db.execute(q.where(model.org_id == org_id) if org_id else q)
+    sources = []
+    for model in (CallLog, CallLogArchive):
+        q = select(model.org_id, model.meeting_id, model.member_id, model.initiated_at, model.status).where(
+            model.status.in_(OUTCOMES))
+        sources.append(q.where(model.org_id == org_id) if org_id else q)
+    batch, total = [], 0
+    for row in db.execute(union_all(*sources).execution_options(yield_per=batch_size)):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            record(db, batch)
+            total, batch = total + len(batch), []
+    record(db, batch)
+    return total + len(batch)
+
+
+def _rates(row):
+    data = {c: int(getattr(row, c) or 0) for c in COUNTERS}
+    data["answer_rate"] = round(data["completed"] / data["calls"], 3) if data["calls"] else None
+    return data
+
+
+def _sums(model):
+    return [func.sum(getattr(model, c)).label(c) for c in COUNTERS]
+
+
+def daily(db, org_id, since=None):
+    """Outcomes per day across all meetings, oldest first."""
+    q = select(DailyCallStats.day, *_sums(DailyCallStats)).where(DailyCallStats.org_id == org_id)
+    if since:
+        q = q.where(DailyCallStats.day >= since)
+    return [{"day": row.day.isoformat(), **_rates(row)}
+            for row in db.execute(q.group_by(DailyCallStats.day).order_by(DailyCallStats.day))]
+
+
+def by_meeting(db, org_id, since=None):
+    """Outcomes per meeting, newest meeting first."""
+    q = (
+        select(DailyCallStats.meeting_id, Meeting.title, Meeting.meeting_date, *_sums(DailyCallStats))
+        .outerjoin(Meeting, Meeting.id == DailyCallStats.meeting_id)
+        .where(DailyCallStats.org_id == org_id)
+    )
+    if since:
+        q = q.where(DailyCallStats.day >= since)
+    q = q.group_by(DailyCallStats.meeting_id, Meeting.title, Meeting.meeting_date)
+    return [{
+        "meeting_id": row.meeting_id,
+        "title": row.title,
+        "meeting_date": row.meeting_date.isoformat() if row.meeting_date else None,
+        **_rates(row),
+    } for row in db.execute(q.order_by(Meeting.meeting_date.desc(), DailyCallStats.meeting_id.desc()))]
+
+
+def least_reachable(db, org_id, min_calls=3, limit=20):
+    """Members with the lowest answer rate among those called ``min_calls`` times."""
+    q = (
+        select(MemberCallStats, Member.name, Member.phone)
+        .join(Member, Member.id == MemberCallStats.member_id)
+        .where(MemberCallStats.org_id == org_id, MemberCallStats.calls >= min_calls)
+        .order_by((MemberCallStats.completed * 1.0 / MemberCallStats.calls), MemberCallStats.calls.desc())
+        .limit(limit)
+    )
+    return [{
+        "member_id": stats.member_id,
+        "name": name,
+        "phone": phone,
+        "last_call_at": stats.last_call_at.isoformat() if stats.last_call_at else None,
+        **_rates(stats),
+    } for stats, name, phone in db.execute(q)]
+
+
+if __name__ == "__main__":
+    from database import SessionLocal
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        n = rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"rebuilt call stats from {n} calls")
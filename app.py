@@ -1,29 +1,90 @@
 import os
-import csv
 import re
 import uuid
-import subprocess
-import io
-from datetime import datetime, timezone
+import asyncio
+import logging
+from collections import Counter
+from contextlib import asynccontextmanager
+from functools import partial
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import urlencode
 
 import bcrypt
 from fastapi import FastAPI, Request, Depends, Form, UploadFile, File, Query
-from fastapi.responses import RedirectResponse, JSONResponse, Response
+from fastapi.responses import RedirectResponse, JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import Session
+from sqlalchemy import select, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
 from dotenv import load_dotenv
 from twilio.twiml.voice_response import VoiceResponse
 
 load_dotenv()
 
-from database import get_db, engine
-from models import Base, Organization, User, Member, Recording, Meeting, CallLog
+from database import (get_db, get_read_db, get_async_db, engine, read_engine, async_engine, pool_stats, pin_to_primary,
+                      SessionLocal, read_sessionmaker)
+from models import Base, Organization, User, Member, Recording, Meeting, CallLog, CallLogArchive, RetryPolicy, SendJob, MemberImport
 from auth import create_access_token, get_current_user, get_optional_user
-
-app = FastAPI()
-
-UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "uploads")
+import dispatch
+import retries
+import cancellation
+import send_jobs
+import status_writer
+import twiml_cache
+import progress_stream
+import query_stats
+import retention
+import analytics
+import member_import
+import exports
+import transcoding
+import heartbeats
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Start claiming right away so jobs leased by a crashed process are
+    # recovered even if nobody sends anything from this one.
+    dispatch.worker.start()
+    await asyncio.to_thread(retries.sweep)
+    retention.schedule(delay=60)
+    await asyncio.to_thread(transcoding.resume)
+    await asyncio.to_thread(member_import.resume)
+    yield
+    await asyncio.to_thread(retries.scheduler.stop)
+    await asyncio.to_thread(dispatch.worker.stop)
+    await asyncio.to_thread(status_writer.writer.stop)
+
+
+app = FastAPI(lifespan=lifespan)
+logger = logging.getLogger(__name__)
+
+QUERY_STATS_HEADERS = os.environ.get("QUERY_STATS_HEADERS", "0") == "1"
+# Process-wide internals (connection pools, ...) are for operators, not org
+# users; these endpoints 404 unless enabled.
+OPS_ENDPOINTS = os.environ.get("OPS_ENDPOINTS", "0") == "1"
+query_stats.install(engine)
+query_stats.install(read_engine)
+query_stats.install(async_engine.sync_engine)
+
+
+@app.middleware("http")
+async def count_queries(request: Request, call_next):
+    stats, token = query_stats.start()
+    try:
+        response = await call_next(request)
+    finally:
+        query_stats.stop(token)
+    pin_to_primary(request, response)
+    if QUERY_STATS_HEADERS:
+        response.headers["X-DB-Query-Count"] = str(stats.count)
+        response.headers["X-DB-Time-Ms"] = str(stats.ms)
+    logger.debug("%s %s -> %d: %d queries, %.1f ms in DB",
+                 request.method, request.url.path, response.status_code, stats.count, stats.ms)
+    return response
+
+UPLOAD_FOLDER = transcoding.UPLOAD_FOLDER
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(os.path.join(os.path.dirname(__file__), "static"), exist_ok=True)
 
@@ -39,16 +100,15 @@ def _slugify(name):
 
 
 MAX_AUDIO_SIZE = 50 * 1024 * 1024
-MAX_CSV_SIZE = 5 * 1024 * 1024
+MAX_CALL_ATTEMPTS = 5
 
 
 def _valid_phone(phone):
-    digits = re.sub(r"\D", "", phone)
-    if digits.startswith("1") and len(digits) == 11:
-        digits = digits[1:]
-    if len(digits) != 10:
-        return None
-    return f"+1{digits}"
+    return member_import.normalize_phones([phone])[0]
+
+
+def _valid_hhmm(value):
+    return re.fullmatch(r"([01]\d|2[0-3]):[0-5]\d", value) is not None
 
 
 def _org_upload_dir(org_id):
@@ -151,12 +211,15 @@ def index(request: Request, user: User = Depends(get_optional_user)):
 def members_page(
     request: Request,
     msg: str = "",
+    import_id: int = 0,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     members = db.query(Member).filter_by(org_id=user.org_id).order_by(Member.name).all()
+    job = db.query(MemberImport).filter_by(id=import_id, org_id=user.org_id).first() if import_id else None
     return templates.TemplateResponse("members.html", {
         "request": request, "members": members, "current_user": user, "msg": msg,
+        "member_import": member_import.summary(job) if job else None,
     })
 
 
@@ -164,45 +227,71 @@ def members_page(
 async def members_post(
     request: Request,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     form = await request.form()
     csv_file = form.get("csv_file")
 
     if csv_file and hasattr(csv_file, "filename") and csv_file.filename:
-        contents = await csv_file.read()
-        if len(contents) > MAX_CSV_SIZE:
-            return _redirect("/members", "CSV too large (5 MB max).")
-        stream = io.StringIO(contents.decode("utf-8", errors="replace"))
-        reader = csv.reader(stream)
-        added, skipped = 0, 0
-        for row in reader:
-            if len(row) >= 2:
-                name = row[0].strip()
-                phone = _valid_phone(row[1].strip())
-                if name and phone:
-                    db.add(Member(org_id=user.org_id, name=name, phone=phone))
-                    added += 1
-                elif name:
-                    skipped += 1
-        db.commit()
-        msg = f"CSV imported: {added} added."
-        if skipped:
-            msg += f" {skipped} skipped (invalid phone)."
-        return _redirect("/members", msg)
+        mode = form.get("mode", "insert")
+        if mode not in member_import.MODES:
+            return _redirect("/members", "Unknown import mode.")
+        # A sync deactivates whoever isn't in its file, so it can't overlap another import.
+        running = set(await db.scalars(select(MemberImport.mode).where(
+            MemberImport.org_id == user.org_id, MemberImport.status.in_(member_import.ACTIVE_STATUSES))))
+        if running and (mode == "sync" or "sync" in running):
+            return _redirect("/members", "Another import is still running; try again when it finishes.")
+        job = MemberImport(org_id=user.org_id, filename=csv_file.filename[:255], mode=mode,
+                           owner=heartbeats.OWNER)
+        db.add(job)
+        await db.commit()
+        path, job.size_bytes = await asyncio.to_thread(member_import.save_upload, csv_file.file, job.id)
+        await db.commit()
+        member_import.start(job.id, path)
+        return _redirect(f"/members?import_id={job.id}", "CSV import started.")
 
     name = form.get("name", "").strip()
     phone_raw = form.get("phone", "").strip()
     phone = _valid_phone(phone_raw) if phone_raw else None
     if name and phone:
+        if await db.scalar(select(Member.id).where(Member.org_id == user.org_id, Member.phone == phone)):
+            return _redirect("/members", "A member with that phone number already exists.")
         db.add(Member(org_id=user.org_id, name=name, phone=phone))
-        db.commit()
+        await db.commit()
         return _redirect("/members", "Member added.")
     elif name:
         return _redirect("/members", "Invalid phone number. Use a 10-digit US number.")
     return _redirect("/members")
 
 
+@app.get("/api/member-imports/{id}")
+def member_import_status(
+    id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    job = db.query(MemberImport).filter_by(id=id, org_id=user.org_id).first()
+    if not job:
+        return JSONResponse({"error": "not found"}, status_code=404)
+    return JSONResponse(member_import.summary(job))
+
+
+@app.get("/api/member-imports/{id}/errors")
+def member_import_errors(
+    id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    job = db.query(MemberImport).filter_by(id=id, org_id=user.org_id).first()
+    if not job:
+        return JSONResponse({"error": "not found"}, status_code=404)
+    rows = partial(member_import.error_rows, import_id=job.id)
+    body = exports.stream(SessionLocal, rows, ("line", "reason", "name", "phone"))
+    return StreamingResponse(body, media_type="text/csv", headers={
+        "Content-Disposition": f'attachment; filename="import-{job.id}-errors.csv"',
+    })
+
+
 @app.post("/members/{id}/edit")
 def member_edit(
     id: int,
@@ -219,6 +308,8 @@ def member_edit(
     cleaned = _valid_phone(phone.strip() or m.phone)
     if not cleaned:
         return _redirect("/members", "Invalid phone number. Use a 10-digit US number.")
+    if db.query(Member.id).filter(Member.org_id == user.org_id, Member.phone == cleaned, Member.id != m.id).first():
+        return _redirect("/members", "Another member already has that phone number.")
     m.phone = cleaned
     m.active = active is not None
     db.commit()
@@ -243,7 +334,7 @@ def recordings_page(
     request: Request,
     msg: str = "",
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     recs = db.query(Recording).filter_by(org_id=user.org_id).order_by(Recording.created_at.desc()).all()
     return templates.TemplateResponse("recordings.html", {
@@ -251,11 +342,16 @@ def recordings_page(
     })
 
 
+def _write_file(path, contents):
+    with open(path, "wb") as out:
+        out.write(contents)
+
+
 @app.post("/api/recordings")
 async def upload_recording(
     request: Request,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     form = await request.form()
     name = (form.get("name", "") or "Untitled").strip()
@@ -267,25 +363,28 @@ async def upload_recording(
         return JSONResponse({"error": "File too large (50 MB max)"}, status_code=400)
 
     org_id = user.org_id
-    upload_dir = _org_upload_dir(org_id)
-    uid = uuid.uuid4().hex[:10]
-    webm_path = os.path.join(upload_dir, f"{uid}.webm")
-    mp3_path = os.path.join(upload_dir, f"{uid}.mp3")
-    with open(webm_path, "wb") as out:
-        out.write(contents)
+    _org_upload_dir(org_id)
+    filename = f"{org_id}/{uuid.uuid4().hex[:10]}.mp3"
+    await asyncio.to_thread(_write_file, transcoding.source_path(filename), contents)
 
-    result = subprocess.run(
-        ["ffmpeg", "-y", "-i", webm_path, "-codec:a", "libmp3lame", "-qscale:a", "4", mp3_path],
-        capture_output=True,
-    )
-    os.remove(webm_path)
-    if result.returncode != 0:
-        return JSONResponse({"error": "ffmpeg conversion failed"}, status_code=500)
-
-    rec = Recording(org_id=org_id, name=name, filename=f"{org_id}/{uid}.mp3")
+    # The mp3 is made by the transcoding pool; poll /api/recordings/{id}.
+    rec = Recording(org_id=org_id, name=name, filename=filename, status="processing", owner=heartbeats.OWNER)
     db.add(rec)
-    db.commit()
-    return JSONResponse({"id": rec.id, "name": rec.name, "filename": rec.filename})
+    await db.commit()
+    transcoding.start(rec.id, rec.filename)
+    return JSONResponse(transcoding.summary(rec), status_code=202)
+
+
+@app.get("/api/recordings/{id}")
+def recording_status(
+    id: int,
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    rec = db.query(Recording).filter_by(id=id, org_id=user.org_id).first()
+    if not rec:
+        return JSONResponse({"error": "not found"}, status_code=404)
+    return JSONResponse(transcoding.summary(rec))
 
 
 @app.post("/recordings/{id}/delete")
@@ -301,6 +400,7 @@ def recording_delete(
             os.remove(path)
         db.delete(rec)
         db.commit()
+        twiml_cache.cache.invalidate(id)
     return _redirect("/recordings", "Recording deleted.")
 
 
@@ -309,7 +409,7 @@ def meetings_page(
     request: Request,
     msg: str = "",
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     meetings = db.query(Meeting).filter_by(org_id=user.org_id).order_by(Meeting.meeting_date.desc()).all()
     return templates.TemplateResponse("meetings.html", {
@@ -348,7 +448,7 @@ def meeting_detail(
     meeting_id: str = "",
     recording_id: str = "",
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     meeting = db.query(Meeting).filter_by(id=id, org_id=user.org_id).first()
     if not meeting:
@@ -369,16 +469,18 @@ async def meeting_members_update(
     meeting_id: str = "",
     recording_id: str = "",
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    meeting = db.query(Meeting).filter_by(id=id, org_id=user.org_id).first()
+    meeting = await db.scalar(
+        select(Meeting).options(selectinload(Meeting.members)).filter_by(id=id, org_id=user.org_id)
+    )
     if not meeting:
         return _redirect("/meetings", "Not found.")
     form = await request.form()
     selected_ids = [int(v) for v in form.getlist("member_ids")]
-    members = db.query(Member).filter(Member.id.in_(selected_ids), Member.org_id == user.org_id).all()
-    meeting.members = members
-    db.commit()
+    members = await db.scalars(select(Member).where(Member.id.in_(selected_ids), Member.org_id == user.org_id))
+    meeting.members = list(members)
+    await db.commit()
     if next == "send":
         return _redirect(f"/send?meeting_id={meeting_id}&recording_id={recording_id}", "Meeting members updated.")
     return _redirect(f"/meetings/{id}", "Meeting members updated.")
@@ -404,10 +506,11 @@ def send_page(
     meeting_id: int = 0,
     recording_id: int = 0,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     meetings = db.query(Meeting).filter_by(org_id=user.org_id).order_by(Meeting.meeting_date.desc()).all()
-    recordings = db.query(Recording).filter_by(org_id=user.org_id).order_by(Recording.created_at.desc()).all()
+    recordings = (db.query(Recording).filter_by(org_id=user.org_id, status="ready")
+                  .order_by(Recording.created_at.desc()).all())
     return templates.TemplateResponse("send.html", {
         "request": request, "meetings": meetings, "recordings": recordings,
         "sel_meeting": meeting_id, "sel_recording": recording_id,
@@ -417,17 +520,40 @@ def send_page(
 
 @app.post("/send")
 def send_post(
+    request: Request,
     meeting_id: int = Form(0),
     recording_id: int = Form(0),
+    max_attempts: int = Form(1),
+    retry_delay_minutes: int = Form(15),
+    quiet_start: str = Form(""),
+    quiet_end: str = Form(""),
     user: User = Depends(get_current_user),
     db: Session = Depends(get_db),
 ):
     if meeting_id and recording_id:
         meeting = db.query(Meeting).filter_by(id=meeting_id, org_id=user.org_id).first()
-        recording = db.query(Recording).filter_by(id=recording_id, org_id=user.org_id).first()
+        recording = db.query(Recording).filter_by(id=recording_id, org_id=user.org_id, status="ready").first()
         if meeting and recording:
+            policy_id = None
+            if max_attempts > 1:
+                quiet_start, quiet_end = quiet_start.strip(), quiet_end.strip()
+                if (quiet_start or quiet_end) and not (_valid_hhmm(quiet_start) and _valid_hhmm(quiet_end)):
+                    return _redirect("/send", "Quiet hours must be HH:MM.")
+                policy = RetryPolicy(
+                    org_id=user.org_id,
+                    max_attempts=min(max_attempts, MAX_CALL_ATTEMPTS),
+                    backoff_seconds=max(1, retry_delay_minutes) * 60,
+                    quiet_start=quiet_start or None,
+                    quiet_end=quiet_end or None,
+                    timezone=os.environ.get("QUIET_HOURS_TZ", "America/New_York"),
+                )
+                db.add(policy)
+                db.commit()
+                policy_id = policy.id
+            # Every answered call fetches this TwiML; render it once up front.
+            twiml_cache.cache.put(recording.id, _public_base_url(request), recording.filename)
             from caller import send_reminders
-            send_reminders(meeting_id, recording_id, user.org_id)
+            send_reminders(meeting_id, recording_id, user.org_id, retry_policy_id=policy_id)
             return _redirect("/send", "Calls are being sent.")
     return _redirect("/send")
 
@@ -436,7 +562,7 @@ def send_post(
 def api_meeting_members(
     meeting_id: int = 0,
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     if not meeting_id:
         return JSONResponse({"members": []})
@@ -450,21 +576,96 @@ def api_meeting_members(
 @app.get("/api/send-progress")
 def send_progress(
     meeting_id: int = 0,
+    send_id: int = 0,
+    since: str = "",
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    if not meeting_id:
+    if not meeting_id and not send_id:
+        return JSONResponse({"error": "missing meeting_id"}, status_code=400)
+    try:
+        cursor = datetime.fromisoformat(since) if since else None
+    except ValueError:
+        return JSONResponse({"error": "invalid since"}, status_code=400)
+    if cursor and cursor.tzinfo:
+        cursor = cursor.astimezone(timezone.utc).replace(tzinfo=None)
+    q = db.query(SendJob).filter_by(org_id=user.org_id)
+    if send_id:
+        job = q.filter_by(id=send_id).first()
+        if not job:
+            return JSONResponse({"error": "not found"}, status_code=404)
+    else:
+        job = q.filter_by(meeting_id=meeting_id).order_by(SendJob.id.desc()).first()
+    if job:
+        data = send_jobs.summary(job)
+        rows, newest = send_jobs.rows(db, CallLog.send_job_id == job.id, since=cursor)
+    else:
+        # Calls placed before sends were tracked as SendJobs.
+        criteria = (CallLog.meeting_id == meeting_id, CallLog.org_id == user.org_id)
+        counts = Counter(dict(db.query(CallLog.status, func.count()).filter(*criteria).group_by(CallLog.status).all()))
+        counts.update(retention.counts(db, user.org_id, meeting_id))
+        total = sum(counts.values())
+        completed = counts.get("completed", 0)
+        failed = sum(counts.get(s, 0) for s in ("failed", "busy", "no-answer", "canceled"))
+        data = {"total": total, "completed": completed, "failed": failed, "queued": total - completed - failed}
+        rows, newest = send_jobs.rows(db, *criteria, since=cursor)
+    data["rows"] = rows
+    data["cursor"] = newest.isoformat() if newest else None
+    return JSONResponse(data)
+
+
+@app.get("/api/send-progress/stream")
+async def send_progress_stream(
+    request: Request,
+    meeting_id: int = 0,
+    send_id: int = 0,
+    user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_async_db),
+):
+    q = select(SendJob.id).where(SendJob.org_id == user.org_id)
+    if send_id:
+        q = q.where(SendJob.id == send_id)
+    elif meeting_id:
+        q = q.where(SendJob.meeting_id == meeting_id)
+    else:
         return JSONResponse({"error": "missing meeting_id"}, status_code=400)
-    logs = db.query(CallLog).filter_by(meeting_id=meeting_id, org_id=user.org_id).all()
-    total = len(logs)
-    completed = sum(1 for l in logs if l.status == "completed")
-    failed = sum(1 for l in logs if l.status in ("failed", "busy", "no-answer", "canceled"))
-    queued = total - completed - failed
-    rows = [
-        {"member": l.member.name, "phone": l.member.phone, "status": l.status}
-        for l in logs
-    ]
-    return JSONResponse({"total": total, "completed": completed, "failed": failed, "queued": queued, "rows": rows})
+    send_id = await db.scalar(q.order_by(SendJob.id.desc()).limit(1))
+    if not send_id:
+        return JSONResponse({"error": "not found"}, status_code=404)
+    return StreamingResponse(
+        progress_stream.stream(request, send_id),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/api/sends")
+def send_history(
+    meeting_id: int = 0,
+    limit: int = Query(50, ge=1, le=200),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    q = db.query(SendJob).filter_by(org_id=user.org_id)
+    if meeting_id:
+        q = q.filter_by(meeting_id=meeting_id)
+    jobs = q.order_by(SendJob.id.desc()).limit(limit).all()
+    return JSONResponse({"sends": [send_jobs.summary(j) for j in jobs]})
+
+
+@app.get("/api/db-pool")
+def db_pool(user: User = Depends(get_current_user)):
+    if not OPS_ENDPOINTS:
+        return JSONResponse({"error": "not found"}, status_code=404)
+    return JSONResponse(pool_stats())
+
+
+@app.get("/api/dispatch-stats")
+def dispatch_stats(user: User = Depends(get_current_user)):
+    if not OPS_ENDPOINTS:
+        return JSONResponse({"error": "not found"}, status_code=404)
+    from caller import latency_stats
+    return JSONResponse({"twilio_latency": latency_stats(), "concurrency_limit": dispatch.worker.limiter.limit})
 
 
 @app.post("/api/cancel-calls")
@@ -475,14 +676,29 @@ def cancel_calls(
 ):
     if not meeting_id:
         return JSONResponse({"error": "missing meeting_id"}, status_code=400)
-    canceled = (
-        db.query(CallLog)
-        .filter_by(meeting_id=meeting_id, org_id=user.org_id)
-        .filter(CallLog.status.in_(["queued", "initiated"]))
-        .update({"status": "canceled", "updated_at": datetime.now(timezone.utc)}, synchronize_session="fetch")
-    )
-    db.commit()
-    return JSONResponse({"canceled": canceled})
+    if not db.query(Meeting.id).filter_by(id=meeting_id, org_id=user.org_id).first():
+        return JSONResponse({"error": "not found"}, status_code=404)
+    return JSONResponse(cancellation.cancel_send(db, user.org_id, meeting_id))
+
+
+LOG_PAGE_SIZE = 100
+CALL_STATUSES = ("scheduled", "queued", "initiated", "ringing", "in-progress",
+                 "completed", "busy", "no-answer", "failed", "canceled")
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _parse_log_cursor(value):
+    try:
+        at, log_id = value.rsplit("_", 1)
+        return datetime.fromisoformat(at), int(log_id)
+    except ValueError:
+        return None
 
 
 @app.get("/log")
@@ -490,44 +706,166 @@ def call_log_page(
     request: Request,
     msg: str = "",
     meeting_id: int = None,
+    status: str = "",
+    member_id: int = None,
+    date_from: str = "",
+    date_to: str = "",
+    before: str = "",
     user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
-    q = db.query(CallLog).filter_by(org_id=user.org_id)
-    if meeting_id:
-        q = q.filter_by(meeting_id=meeting_id)
-    logs = q.order_by(CallLog.initiated_at.desc()).all()
+    start, end = _parse_date(date_from), _parse_date(date_to)
+    cursor = _parse_log_cursor(before) if before else None
+
+    # Finished calls past retention live in call_log_archive, with their
+    # counts in call_rollup; a page merges the newest rows of both tables.
+    logs, facets = [], Counter()
+    for model in (CallLog, CallLogArchive):
+        filters = exports.call_log_filters(model, user.org_id, meeting_id, member_id, start, end)
+        # Facet counts ignore the status filter so every status stays reachable.
+        if model is CallLog or member_id:
+            facets.update(dict(db.query(model.status, func.count()).filter(*filters).group_by(model.status).all()))
+        q = db.query(model).filter(*filters).options(joinedload(model.meeting), joinedload(model.member))
+        if status:
+            q = q.filter(model.status == status)
+        if cursor:
+            q = q.filter(tuple_(model.initiated_at, model.id) < cursor)
+        logs += q.order_by(model.initiated_at.desc(), model.id.desc()).limit(LOG_PAGE_SIZE + 1).all()
+    if not member_id:
+        facets.update(retention.counts(db, user.org_id, meeting_id, start, end))
+    logs.sort(key=lambda log: (log.initiated_at, log.id), reverse=True)
+    logs = logs[:LOG_PAGE_SIZE + 1]
+    next_cursor = None
+    if len(logs) > LOG_PAGE_SIZE:
+        logs = logs[:LOG_PAGE_SIZE]
+        next_cursor = f"{logs[-1].initiated_at.isoformat()}_{logs[-1].id}"
+
+    params = {"meeting_id": meeting_id, "status": status, "member_id": member_id,
+              "date_from": start.isoformat() if start else "", "date_to": end.isoformat() if end else ""}
+    params = {k: v for k, v in params.items() if v}
     meetings = db.query(Meeting).filter_by(org_id=user.org_id).order_by(Meeting.meeting_date.desc()).all()
+    members = db.query(Member.id, Member.name).filter_by(org_id=user.org_id).order_by(Member.name).all()
     return templates.TemplateResponse("call_log.html", {
-        "request": request, "logs": logs, "meetings": meetings,
-        "selected_meeting": meeting_id, "current_user": user, "msg": msg,
+        "request": request, "logs": logs, "meetings": meetings, "members": members,
+        "selected_meeting": meeting_id, "selected_member": member_id, "selected_status": status,
+        "date_from": params.get("date_from", ""), "date_to": params.get("date_to", ""),
+        "statuses": CALL_STATUSES, "facets": dict(facets), "facet_total": sum(facets.values()),
+        "filter_query": urlencode({k: v for k, v in params.items() if k != "status"}),
+        "next_query": urlencode({**params, "before": next_cursor}) if next_cursor else None,
+        "first_query": urlencode(params) if cursor else None,
+        "export_query": urlencode(params),
+        "current_user": user, "msg": msg,
+    })
+
+
+def _export(request, rows, fields, fmt, name):
+    body = exports.stream(read_sessionmaker(request), rows, fields, fmt)
+    return StreamingResponse(body, media_type=exports.FORMATS[fmt], headers={
+        "Content-Disposition": f'attachment; filename="{name}-{date.today().isoformat()}.{fmt}"',
+    })
+
+
+@app.get("/api/export/call-log")
+def export_call_log(
+    request: Request,
+    format: str = "csv",
+    meeting_id: int = None,
+    status: str = "",
+    member_id: int = None,
+    date_from: str = "",
+    date_to: str = "",
+    user: User = Depends(get_current_user),
+):
+    if format not in exports.FORMATS:
+        return JSONResponse({"error": "format must be csv or ndjson"}, status_code=400)
+    rows = partial(exports.call_log_rows, org_id=user.org_id, meeting_id=meeting_id, status=status,
+                   member_id=member_id, start=_parse_date(date_from), end=_parse_date(date_to))
+    return _export(request, rows, exports.CALL_LOG_FIELDS, format, "call-log")
+
+
+@app.get("/api/export/members")
+def export_members(
+    request: Request,
+    format: str = "csv",
+    user: User = Depends(get_current_user),
+):
+    if format not in exports.FORMATS:
+        return JSONResponse({"error": "format must be csv or ndjson"}, status_code=400)
+    rows = partial(exports.member_rows, org_id=user.org_id)
+    return _export(request, rows, exports.MEMBER_FIELDS, format, "members")
+
+
+def _analytics(db, org_id, days, min_calls):
+    since = date.today() - timedelta(days=days - 1) if days else None
+    return {
+        "days": analytics.daily(db, org_id, since),
+        "meetings": analytics.by_meeting(db, org_id, since),
+        "least_reachable": analytics.least_reachable(db, org_id, min_calls),
+    }
+
+
+@app.get("/api/analytics")
+def analytics_api(
+    days: int = Query(30, ge=0, le=3650),
+    min_calls: int = Query(3, ge=1),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    return JSONResponse(_analytics(db, user.org_id, days, min_calls))
+
+
+@app.get("/analytics")
+def analytics_page(
+    request: Request,
+    days: int = Query(30, ge=0, le=3650),
+    min_calls: int = Query(3, ge=1),
+    user: User = Depends(get_current_user),
+    db: Session = Depends(get_read_db),
+):
+    data = _analytics(db, user.org_id, days, min_calls)
+    return templates.TemplateResponse("analytics.html", {
+        "request": request, **data, "selected_days": days, "min_calls": min_calls,
+        "peak": max((d["calls"] for d in data["days"]), default=0),
+        "current_user": user, "msg": "",
     })
 
 
 # --- Twilio endpoints ---
 
+def _public_base_url(request):
+    domain = os.environ.get("DOMAIN", request.headers.get("host", "localhost:5000"))
+    scheme = "https" if "localhost" not in domain else "http"
+    return f"{scheme}://{domain}"
+
+
 @app.api_route("/twiml", methods=["GET", "POST"])
 def twiml(request: Request, recording_id: int = 0, db: Session = Depends(get_db)):
-    rec = db.get(Recording, recording_id) if recording_id else None
-    resp = VoiceResponse()
-    if rec:
-        domain = os.environ.get("DOMAIN", request.headers.get("host", "localhost:5000"))
-        scheme = "https" if "localhost" not in domain else "http"
-        resp.play(f"{scheme}://{domain}/uploads/{rec.filename}")
-    else:
-        resp.say("No recording found. Goodbye.")
-    return Response(content=str(resp), media_type="text/xml")
+    base_url = _public_base_url(request)
+    cached = twiml_cache.cache.get(recording_id, base_url) if recording_id else None
+    if cached is None:
+        rec = db.get(Recording, recording_id) if recording_id else None
+        if not rec:
+            resp = VoiceResponse()
+            resp.say("No recording found. Goodbye.")
+            return Response(content=str(resp), media_type="text/xml", headers={"Cache-Control": "no-store"})
+        if rec.status != "ready":
+            # The mp3 doesn't exist yet; don't let anyone keep this.
+            return Response(content=twiml_cache.render(rec.filename, base_url), media_type="text/xml",
+                            headers={"Cache-Control": "no-store"})
+        cached = twiml_cache.cache.put(rec.id, base_url, rec.filename)
+    body, etag = cached
+    headers = {"Cache-Control": f"public, max-age={twiml_cache.TWIML_MAX_AGE}", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="text/xml", headers=headers)
 
 
 @app.post("/api/call-status")
-async def call_status(request: Request, db: Session = Depends(get_db)):
+async def call_status(request: Request, db: AsyncSession = Depends(get_async_db)):
     form = await request.form()
     sid = form.get("CallSid")
     status = form.get("CallStatus")
     if sid and status:
-        log = db.query(CallLog).filter_by(twilio_call_sid=sid).first()
-        if log:
-            log.status = status
-            log.updated_at = datetime.now(timezone.utc)
-            db.commit()
+        # Stored before answering: Twilio doesn't redeliver a callback we 2xx.
+        await status_writer.writer.record_callback_async(db, sid, status)
     return Response(status_code=204)
@@ -3,7 +3,7 @@ from datetime import datetime, timedelta, timezone
 from jose import jwt, JWTError
 from fastapi import Depends, Request, HTTPException
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_read_db
 from models import User
 
 SECRET_KEY = os.environ.get("SECRET_KEY", "change-me-in-production")
@@ -21,7 +21,7 @@ def decode_token(token: str) -> dict:
     return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
 
 
-def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
+def get_current_user(request: Request, db: Session = Depends(get_read_db)) -> User:
     token = request.cookies.get("access_token")
     if not token:
         raise HTTPException(status_code=302, headers={"Location": "/login"})
@@ -36,7 +36,7 @@ def get_current_user(request: Request, db: Session = Depends(get_db)) -> User:
     return user
 
 
-def get_optional_user(request: Request, db: Session = Depends(get_db)):
+def get_optional_user(request: Request, db: Session = Depends(get_read_db)):
     token = request.cookies.get("access_token")
     if not token:
         return None
@@ -0,0 +1,131 @@
+"""Fan-out benchmark for send_reminders.
+
+Builds a throwaway SQLite database with one meeting of N members, runs
+send_reminders against a stubbed Twilio client and reports:
+
+* time-to-first-call: send_reminders start -> first calls.create()
+* fan-out time: how long send_reminders itself takes
+* drain time: until every queued call has been placed
+
+Usage: python benchmarks/bench_fanout.py [--members 10000] [--legacy]
+
+``--legacy`` replays the old per-member ``db.add(); db.commit()`` loop for
+comparison.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from unittest.mock import MagicMock, patch
+
+_fd, _db_path = tempfile.mkstemp(suffix=".db")
+os.close(_fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ.setdefault("TWILIO_CPS", "100000")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, literal, select  # noqa: E402
+from database import engine, SessionLocal  # noqa: E402
+from models import Base, Organization, Member, Recording, Meeting, CallLog, DispatchJob, meeting_members  # noqa: E402
+import caller  # noqa: E402
+import dispatch  # noqa: E402
+
+
+def seed(n):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    org = Organization(name="Bench", slug="bench")
+    db.add(org)
+    db.flush()
+    rec = Recording(org_id=org.id, name="Rec", filename="1/bench.mp3")
+    mtg = Meeting(org_id=org.id, title="Bench", meeting_date=date(2025, 6, 15))
+    db.add_all([rec, mtg])
+    db.flush()
+    db.execute(insert(Member), [
+        {"org_id": org.id, "name": f"Member {i}", "phone": f"+1555{i:07d}", "active": True}
+        for i in range(n)
+    ])
+    db.execute(
+        meeting_members.insert().from_select(
+            ["meeting_id", "member_id"],
+            select(literal(mtg.id), Member.id).where(Member.org_id == org.id),
+        )
+    )
+    db.commit()
+    ids = org.id, mtg.id, rec.id
+    db.close()
+    return ids
+
+
+def legacy_send(meeting_id, recording_id, org_id):
+    db = SessionLocal()
+    try:
+        meeting = db.get(Meeting, meeting_id)
+        for member in [m for m in meeting.members if m.active]:
+            entry = CallLog(org_id=org_id, meeting_id=meeting_id, recording_id=recording_id,
+                            member_id=member.id, status="queued")
+            db.add(entry)
+            db.commit()
+            dispatch.enqueue(db, entry.id, member.phone, recording_id, "localhost:5000", "http", "")
+            db.commit()
+            dispatch.worker.wake()
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", type=int, default=10000)
+    parser.add_argument("--legacy", action="store_true")
+    args = parser.parse_args()
+
+    org_id, mtg_id, rec_id = seed(args.members)
+
+    first_call = threading.Event()
+    placed = [0]
+    lock = threading.Lock()
+    first_at = [None]
+
+    def create(**kwargs):
+        with lock:
+            placed[0] += 1
+            if first_at[0] is None:
+                first_at[0] = time.perf_counter()
+                first_call.set()
+        call = MagicMock()
+        call.sid = f"CA{placed[0]:032d}"
+        return call
+
+    client = MagicMock()
+    client.calls.create.side_effect = create
+
+    with patch("caller.get_twilio_client", return_value=client):
+        send = legacy_send if args.legacy else caller.send_reminders
+        start = time.perf_counter()
+        send(mtg_id, rec_id, org_id)
+        fanout = time.perf_counter() - start
+        first_call.wait(60)
+        while True:
+            db = SessionLocal()
+            remaining = db.query(DispatchJob).count()
+            db.close()
+            if not remaining:
+                break
+            time.sleep(0.05)
+        drained = time.perf_counter() - start
+        dispatch.worker.stop()
+
+    mode = "legacy per-row commit" if args.legacy else f"batched (batch={caller.FANOUT_BATCH_SIZE})"
+    print(f"members:            {args.members}")
+    print(f"mode:               {mode}")
+    print(f"time-to-first-call: {(first_at[0] - start) * 1000:.1f} ms")
+    print(f"fan-out time:       {fanout * 1000:.1f} ms")
+    print(f"drain time:         {drained:.2f} s ({placed[0]} calls)")
+    os.unlink(_db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Webhook and progress latency against a large call_log.
+
+Builds a throwaway SQLite database with ``--rows`` call_log rows spread
+over meetings of ``--per-meeting`` calls each (half of them tracked by a
+SendJob, half legacy), then times:
+
+* webhook: one status callback for a random call SID, written through the
+  status writer (SID lookup + update + counter move)
+* progress: GET /api/send-progress for a tracked send and for a legacy
+  meeting (GROUP BY on meeting_id/status)
+* call log: GET /log first page for the org
+
+Usage: python benchmarks/bench_indexes.py [--rows 1000000] [--no-indexes]
+
+``--no-indexes`` drops the secondary indexes after creating the schema so
+both runs can be compared.
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta, timezone
+
+_fd, _db_path = tempfile.mkstemp(suffix=".db")
+os.close(_fd)
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_path}"
+os.environ["SECRET_KEY"] = "bench"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import insert, text  # noqa: E402
+from database import engine, SessionLocal  # noqa: E402
+from models import Base, Organization, User, Member, Recording, Meeting, CallLog, SendJob  # noqa: E402
+from auth import create_access_token  # noqa: E402
+from app import app  # noqa: E402
+import status_writer  # noqa: E402
+
+STATUSES = ["completed"] * 6 + ["busy", "no-answer", "failed", "initiated"]
+
+
+def seed(rows, per_meeting, members):
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    org = Organization(name="Bench", slug="bench")
+    db.add(org)
+    db.flush()
+    user = User(org_id=org.id, email="bench@example.com", password_hash="x")
+    rec = Recording(org_id=org.id, name="Rec", filename="1/bench.mp3")
+    db.add_all([user, rec])
+    db.flush()
+    db.execute(insert(Member), [
+        {"org_id": org.id, "name": f"Member {i}", "phone": f"+1555{i:07d}", "active": True}
+        for i in range(members)
+    ])
+    member_ids = [m for (m,) in db.execute(text("SELECT id FROM member"))]
+    started = datetime.now(timezone.utc) - timedelta(days=365)
+    sends, legacy, n = [], [], 0
+    while n < rows:
+        mtg = Meeting(org_id=org.id, title=f"Meeting {len(sends) + len(legacy)}", meeting_date=date(2025, 6, 15))
+        db.add(mtg)
+        db.flush()
+        tracked = len(sends) <= len(legacy)
+        job = None
+        if tracked:
+            job = SendJob(org_id=org.id, meeting_id=mtg.id, recording_id=rec.id, total=0)
+            db.add(job)
+            db.flush()
+            sends.append((mtg.id, job.id))
+        else:
+            legacy.append(mtg.id)
+        batch = []
+        for i in range(min(per_meeting, rows - n)):
+            batch.append({
+                "org_id": org.id, "meeting_id": mtg.id, "recording_id": rec.id,
+                "member_id": member_ids[i % len(member_ids)], "send_job_id": job.id if job else None,
+                "twilio_call_sid": f"CA{n:032d}", "status": random.choice(STATUSES),
+                "initiated_at": started + timedelta(seconds=n), "updated_at": started + timedelta(seconds=n),
+            })
+            n += 1
+        db.execute(insert(CallLog), batch)
+        if job:
+            job.total = job.completed = len(batch)
+        db.commit()
+    user_id, org_id = user.id, org.id
+    db.close()
+    return user_id, org_id, sends, legacy
+
+
+def drop_indexes():
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(text(f"DROP INDEX IF EXISTS {index.name}"))
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--per-meeting", type=int, default=10_000)
+    parser.add_argument("--members", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--no-indexes", action="store_true")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    user_id, org_id, sends, legacy = seed(args.rows, args.per_meeting, args.members)
+    if args.no_indexes:
+        drop_indexes()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    print(f"seeded {args.rows} call_log rows in {time.perf_counter() - started:.1f} s "
+          f"({'no secondary indexes' if args.no_indexes else 'with indexes'})")
+
+    client = TestClient(app, cookies={"access_token": create_access_token(user_id, org_id)})
+    def webhook():
+        sid = f"CA{random.randrange(args.rows):032d}"
+        resp = client.post("/api/call-status", data={"CallSid": sid, "CallStatus": "completed"})
+        assert resp.status_code == 204
+        status_writer.writer.flush()
+
+    mtg_id, send_id = sends[-1]
+    results = {
+        "webhook (callback + flush)": timed(webhook, args.repeat),
+        "progress, tracked send": timed(lambda: client.get(f"/api/send-progress?send_id={send_id}"), args.repeat // 5 or 1),
+        "progress, legacy meeting": timed(lambda: client.get(f"/api/send-progress?meeting_id={legacy[-1]}"),
+                                          args.repeat // 5 or 1),
+        "call log, first page": timed(lambda: client.get("/log"), args.repeat // 5 or 1),
+    }
+    status_writer.writer.stop()
+    for name, (p50, p95) in results.items():
+        print(f"{name:28s} p50={p50:8.1f} ms  p95={p95:8.1f} ms")
+    os.unlink(_db_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,354 @@
 import os
+import time
 import logging
-from concurrent.futures import ThreadPoolExecutor
+import threading
+from collections import deque
+from aiohttp import ClientSession, ClientTimeout, TCPConnector
+from requests.adapters import HTTPAdapter
+from sqlalchemy import select, insert
 from twilio.rest import Client
+from twilio.http.http_client import TwilioHttpClient
+from twilio.http.async_http_client import AsyncTwilioHttpClient
 from database import SessionLocal
-from models import CallLog, Member, Meeting
+from models import CallLog, Member, SendJob, meeting_members
 from datetime import datetime, timezone
+import analytics
+import cancellation
+import dispatch
+import pacing
+import send_jobs
+import status_writer
 
 logger = logging.getLogger(__name__)
 
-executor = ThreadPoolExecutor(max_workers=10)
+FANOUT_BATCH_SIZE = int(os.environ.get("FANOUT_BATCH_SIZE", "500"))
+TWILIO_TIMEOUT = float(os.environ.get("TWILIO_TIMEOUT", "10"))
+TWILIO_MAX_RETRIES = int(os.environ.get("TWILIO_MAX_RETRIES", "0"))
+TWILIO_API_BASE_URL = os.environ.get("TWILIO_API_BASE_URL", "")
+
+
+class LatencyStats:
+    """Rolling record of Twilio API request latencies."""
+
+    def __init__(self, window=1000):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+
+    def record(self, seconds, ok=True):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+            if not ok:
+                self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            samples = sorted(self._samples)
+            count, errors = self.count, self.errors
+        if not samples:
+            return {"count": count, "errors": errors}
+        pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+        return {
+            "count": count,
+            "errors": errors,
+            "p50_ms": round(pick(0.5) * 1000, 1),
+            "p95_ms": round(pick(0.95) * 1000, 1),
+            "max_ms": round(samples[-1] * 1000, 1),
+        }
+
+
+class PooledHttpClient(TwilioHttpClient):
+    """TwilioHttpClient with a keep-alive pool sized to dispatch concurrency."""
+
+    def __init__(self, pool_size, timeout=TWILIO_TIMEOUT, max_retries=TWILIO_MAX_RETRIES):
+        super().__init__(pool_connections=True, timeout=timeout)
+        # pool_block keeps the number of open connections at pool_size
+        # instead of opening (and discarding) extra ones under load.
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size, pool_block=True,
+                              max_retries=max_retries)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.latency = LatencyStats()
+
+    def request(self, method, url, *args, **kwargs):
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = super().request(method, url, *args, **kwargs)
+            ok = response.status_code < 400
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            self.latency.record(elapsed, ok)
+            logger.debug("Twilio %s %s took %.1f ms", method, url, elapsed * 1000)
+
+
+class PooledAsyncHttpClient(AsyncTwilioHttpClient):
+    """aiohttp-based Twilio client for the async dispatch engine.
+
+    Must be created on the event loop that will use it.
+    """
+
+    def __init__(self, pool_size, timeout=TWILIO_TIMEOUT):
+        super().__init__(pool_connections=False, timeout=timeout)
+        self.session = ClientSession(
+            connector=TCPConnector(limit=pool_size, keepalive_timeout=30),
+            timeout=ClientTimeout(total=timeout),
+        )
+        self.latency = LatencyStats()
+
+    async def request(self, method, url, params=None, data=None, headers=None, auth=None,
+                      timeout=None, allow_redirects=False):
+        started = time.perf_counter()
+        ok = False
+        try:
+            response = await super().request(method, url, params, data, headers, auth,
+                                             timeout or self.timeout, allow_redirects)
+            ok = response.status_code < 400
+            return response
+        finally:
+            elapsed = time.perf_counter() - started
+            self.latency.record(elapsed, ok)
+            logger.debug("Twilio %s %s took %.1f ms", method, url, elapsed * 1000)
+
+
+def _build_client(http_client):
+    client = Client(os.environ["TWILIO_ACCOUNT_SID"], os.environ["TWILIO_AUTH_TOKEN"], http_client=http_client)
+    if TWILIO_API_BASE_URL:
+        # Point the Calls API somewhere else, e.g. at loadtest/twilio_emulator.py.
+        client.api.base_url = TWILIO_API_BASE_URL
+    return client
+
+
+def make_async_twilio_client(pool_size):
+    global _async_latency
+    client = _build_client(PooledAsyncHttpClient(pool_size=pool_size))
+    _async_latency = client.http_client.latency
+    return client
+
+
+_client = None
+_cancel_client = None
+_client_lock = threading.Lock()
+_async_latency = None
+
+
+def latency_stats():
+    """Twilio API latency of the clients dispatch has used in this process."""
+    stats = {}
+    if _client is not None:
+        stats["sync"] = _client.http_client.latency.snapshot()
+    if _cancel_client is not None:
+        stats["cancel"] = _cancel_client.http_client.latency.snapshot()
+    if _async_latency is not None:
+        stats["async"] = _async_latency.snapshot()
+    return stats
 
 
 def get_twilio_client():
-    return Client(os.environ["TWILIO_ACCOUNT_SID"], os.environ["TWILIO_AUTH_TOKEN"])
+    """Return the process-wide Twilio client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _build_client(PooledHttpClient(pool_size=dispatch.DISPATCH_CONCURRENCY))
+    return _client
+
+
+def get_cancel_twilio_client():
+    """Return the process-wide client for hang-ups.
+
+    It has its own pool of CANCEL_CONCURRENCY connections, so hanging up a
+    canceled campaign's calls doesn't queue behind dispatch's calls.create
+    requests.
+    """
+    global _cancel_client
+    if _cancel_client is None:
+        with _client_lock:
+            if _cancel_client is None:
+                _cancel_client = _build_client(PooledHttpClient(pool_size=cancellation.CANCEL_CONCURRENCY))
+    return _cancel_client
+
+
+def reset_twilio_client():
+    global _client, _cancel_client
+    with _client_lock:
+        for client in (_client, _cancel_client):
+            if client is not None:
+                client.http_client.session.close()
+        _client = _cancel_client = None
+
+
+def _dispatch_settings():
+    domain = os.environ.get("DOMAIN", "localhost:5000")
+    scheme = "http" if "localhost" in domain else "https"
+    from_number = os.environ.get("TWILIO_FROM_NUMBER", os.environ.get("TWILIO_FROM", ""))
+    return domain, scheme, from_number
 
 
-def send_reminders(meeting_id, recording_id, org_id):
+def send_reminders(meeting_id, recording_id, org_id, retry_policy_id=None):
+    """Queue a call to every active member of the meeting; returns the SendJob id."""
     db = SessionLocal()
     try:
-        meeting = db.get(Meeting, meeting_id)
-        members = [m for m in meeting.members if m.active] if meeting else []
-        domain = os.environ.get("DOMAIN", "localhost:5000")
-        scheme = "http" if "localhost" in domain else "https"
-        from_number = os.environ.get("TWILIO_FROM_NUMBER", os.environ.get("TWILIO_FROM", ""))
-
-        logger.info("Sending reminders to %d members (meeting=%d, recording=%d, org=%d)",
-                     len(members), meeting_id, recording_id, org_id)
-
-        for member in members:
-            entry = CallLog(
-                org_id=org_id,
-                meeting_id=meeting_id,
-                recording_id=recording_id,
-                member_id=member.id,
-                status="queued",
-            )
-            db.add(entry)
+        domain, scheme, from_number = _dispatch_settings()
+
+        logger.info("Sending reminders (meeting=%d, recording=%d, org=%d)", meeting_id, recording_id, org_id)
+        job = SendJob(org_id=org_id, meeting_id=meeting_id, recording_id=recording_id,
+                      retry_policy_id=retry_policy_id)
+        db.add(job)
+        db.commit()
+        send_job_id = job.id
+
+        total = 0
+        for batch in _active_member_batches(db, meeting_id):
+            phones = dict(batch)
+            logs = db.execute(
+                insert(CallLog).returning(CallLog.id, CallLog.member_id, sort_by_parameter_order=True),
+                [
+                    {"org_id": org_id, "meeting_id": meeting_id, "recording_id": recording_id,
+                     "member_id": member_id, "send_job_id": send_job_id,
+                     "retry_policy_id": retry_policy_id, "status": "queued"}
+                    for member_id in phones
+                ],
+            ).all()
+            send_jobs.add(db, send_job_id, "queued", len(logs))
+            dispatch.enqueue_many(db, [
+                {"call_log_id": log_id, "meeting_id": meeting_id, "phone": phones[member_id],
+                 "recording_id": recording_id,
+                 "domain": domain, "scheme": scheme, "from_number": from_number}
+                for log_id, member_id in logs
+            ])
             db.commit()
+            dispatch.worker.wake()
+            total += len(logs)
 
-            executor.submit(_place_call, entry.id, member.phone, recording_id, domain, scheme, from_number)
+        logger.info("Queued %d calls (meeting=%d, send=%d)", total, meeting_id, send_job_id)
+        return send_job_id
     finally:
         db.close()
 
 
-def _place_call(log_id, phone, recording_id, domain, scheme, from_number):
+def _active_member_batches(db, meeting_id, batch_size=None):
+    """Yield ``[(member_id, phone), ...]`` for a meeting's active members.
+
+    Pages by member id so only one batch is held in memory and no cursor is
+    left open across the commits in between.
+    """
+    batch_size = batch_size or FANOUT_BATCH_SIZE
+    last_id = 0
+    while True:
+        batch = db.execute(
+            select(Member.id, Member.phone)
+            .join(meeting_members, meeting_members.c.member_id == Member.id)
+            .where(meeting_members.c.meeting_id == meeting_id, Member.active.is_(True), Member.id > last_id)
+            .order_by(Member.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1][0]
+
+
+def _call_params(phone, recording_id, domain, scheme, from_number):
+    return dict(
+        to=phone,
+        from_=from_number,
+        url=f"{scheme}://{domain}/twiml?recording_id={recording_id}",
+        status_callback=f"{scheme}://{domain}/api/call-status",
+        status_callback_event=["initiated", "ringing", "answered", "completed"],
+        status_callback_method="POST",
+    )
+
+
+def _should_place(log_id):
+    if status_writer.writer.placed(log_id):
+        return False
     db = SessionLocal()
     try:
         entry = db.get(CallLog, log_id)
-        if entry.status == "canceled":
-            db.close()
-            return
-        try:
-            client = get_twilio_client()
-            twiml_url = f"{scheme}://{domain}/twiml?recording_id={recording_id}"
-            status_url = f"{scheme}://{domain}/api/call-status"
-
-            logger.info("Placing call to %s, twiml_url=%s", phone, twiml_url)
-
-            call = client.calls.create(
-                to=phone,
-                from_=from_number,
-                url=twiml_url,
-                status_callback=status_url,
-                status_callback_event=["initiated", "ringing", "answered", "completed"],
-                status_callback_method="POST",
-            )
-            entry.twilio_call_sid = call.sid
-            entry.status = "initiated"
-            logger.info("Call placed: SID=%s", call.sid)
-        except Exception as e:
-            logger.error("Call to %s failed: %s", phone, e)
+        if entry is None or entry.status == "canceled":
+            return False
+        # A previous lease on this job may already have placed the call.
+        return not entry.twilio_call_sid
+    finally:
+        db.close()
+
+
+def _record_result(log_id, sid, job=None):
+    status_writer.writer.record_placement(log_id, sid, job)
+
+
+def _call_failed(phone, e):
+    if pacing.is_throttle_error(e):
+        logger.warning("Call to %s throttled by Twilio: %s", phone, e)
+        raise pacing.Throttled(str(e)) from e
+    logger.error("Call to %s failed: %s", phone, e)
+
+
+def _place_call(log_id, phone, recording_id, domain, scheme, from_number, canceled=None, job=None):
+    """Place one call; returns the Twilio API latency, or None if no call was made.
+
+    ``canceled`` and ``_should_place`` are re-checked after waiting for the
+    pacer, which can take a while during a large campaign; meanwhile the
+    call may have been canceled or placed under another lease. The result
+    goes to the status writer, which deletes ``job`` when it writes it.
+    """
+    if not _should_place(log_id):
+        return None
+    try:
+        client = get_twilio_client()
+        params = _call_params(phone, recording_id, domain, scheme, from_number)
+        pacing.call_pacer.acquire()
+        if (canceled and canceled()) or not _should_place(log_id):
+            return None
+        logger.info("Placing call to %s, twiml_url=%s", phone, params["url"])
+        started = time.monotonic()
+        call = client.calls.create(**params)
+        latency = time.monotonic() - started
+    except Exception as e:
+        _call_failed(phone, e)
+        _record_result(log_id, None, job)
+        return None
+    _record_result(log_id, call.sid, job)
+    logger.info("Call placed: SID=%s", call.sid)
+    return latency
+
+
+async def _place_call_async(client, run_db, log_id, phone, recording_id, domain, scheme, from_number,
+                            canceled=None, job=None):
+    """Coroutine twin of ``_place_call``; DB work goes through ``run_db``."""
+    if not await run_db(_should_place, log_id):
+        return None
+    try:
+        params = _call_params(phone, recording_id, domain, scheme, from_number)
+        await pacing.call_pacer.acquire_async()
+        if (canceled and canceled()) or not await run_db(_should_place, log_id):
+            return None
+        logger.info("Placing call to %s, twiml_url=%s", phone, params["url"])
+        started = time.monotonic()
+        call = await client.calls.create_async(**params)
+        latency = time.monotonic() - started
+    except Exception as e:
+        _call_failed(phone, e)
+        _record_result(log_id, None, job)
+        return None
+    _record_result(log_id, call.sid, job)
+    logger.info("Call placed: SID=%s", call.sid)
+    return latency
+
+
+def _fail_call(log_id):
+    db = SessionLocal()
+    try:
+        entry = db.get(CallLog, log_id)
+        if entry and entry.status == "queued":
+            send_jobs.move(db, entry.send_job_id, "queued", "failed")
             entry.status = "failed"
-        entry.updated_at = datetime.now(timezone.utc)
-        db.commit()
+            entry.updated_at = datetime.now(timezone.utc)
+            analytics.record(db, [entry])
+            db.commit()
     finally:
         db.close()
@@ -0,0 +1,137 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from sqlalchemy import select, update, delete
+from models import CallLog, DispatchJob
+import send_jobs
+import progress_stream
+
+logger = logging.getLogger(__name__)
+
+CANCEL_CONCURRENCY = int(os.environ.get("CANCEL_CONCURRENCY", "20"))
+CANCEL_REGISTRY_TTL = int(os.environ.get("CANCEL_REGISTRY_TTL", "86400"))
+
+IN_FLIGHT_STATUSES = ("initiated", "ringing", "in-progress")
+
+
+def _epoch(dt):
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+
+class CancellationRegistry:
+    """Meetings whose sends were canceled, checked by dispatch without the DB.
+
+    A cancel applies to jobs created before it, so sending the same meeting
+    again afterwards is not affected. Entries expire after ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl=CANCEL_REGISTRY_TTL):
+        self.ttl = ttl
+        self._canceled = {}
+        self._lock = threading.Lock()
+
+    def cancel(self, meeting_id):
+        now = time.time()
+        with self._lock:
+            self._canceled[meeting_id] = now
+            for key, at in list(self._canceled.items()):
+                if now - at > self.ttl:
+                    del self._canceled[key]
+
+    def is_canceled(self, meeting_id, created_at):
+        canceled_at = self._canceled.get(meeting_id)
+        return canceled_at is not None and _epoch(created_at) <= canceled_at
+
+    def clear(self):
+        with self._lock:
+            self._canceled.clear()
+
+
+registry = CancellationRegistry()
+_pool = ThreadPoolExecutor(max_workers=CANCEL_CONCURRENCY, thread_name_prefix="cancel")
+
+
+def hang_up(client, sid, status):
+    """Stop a live call: "canceled" works until it is answered, "completed" after."""
+    first = "completed" if status == "in-progress" else "canceled"
+    try:
+        client.calls(sid).update(status=first)
+    except Exception:
+        if first == "completed":
+            raise
+        client.calls(sid).update(status="completed")
+
+
+def cancel_send(db, org_id, meeting_id):
+    """Stop every outstanding call of a meeting and report what was stopped where."""
+    from caller import get_cancel_twilio_client
+
+    started = time.perf_counter()
+    registry.cancel(meeting_id)
+    now = datetime.now(timezone.utc)
+    report = {}
+    touched = set()
+
+    for stage in ("scheduled", "queued"):
+        send_job_ids = db.scalars(
+            update(CallLog)
+            .where(CallLog.meeting_id == meeting_id, CallLog.org_id == org_id, CallLog.status == stage)
+            .values(status="canceled", updated_at=now)
+            .returning(CallLog.send_job_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        send_jobs.move_many(db, send_job_ids, stage, "canceled")
+        touched.update(send_job_ids)
+        report[stage] = len(send_job_ids)
+    db.execute(
+        delete(DispatchJob)
+        .where(
+            DispatchJob.status == "pending",
+            DispatchJob.call_log_id.in_(
+                select(CallLog.id).where(CallLog.meeting_id == meeting_id, CallLog.org_id == org_id,
+                                         CallLog.status == "canceled")
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    live = db.execute(
+        select(CallLog.id, CallLog.twilio_call_sid, CallLog.status)
+        .where(CallLog.meeting_id == meeting_id, CallLog.org_id == org_id,
+               CallLog.status.in_(IN_FLIGHT_STATUSES), CallLog.twilio_call_sid.isnot(None))
+    ).all()
+    db.commit()
+    report["database_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+    stopped = []
+    if live:
+        client = get_cancel_twilio_client()
+        futures = {_pool.submit(hang_up, client, sid, status): log_id for log_id, sid, status in live}
+        for future, log_id in futures.items():
+            try:
+                future.result()
+                stopped.append(log_id)
+            except Exception as e:
+                logger.warning("Could not hang up call %d: %s", log_id, e)
+    if stopped:
+        send_job_ids = db.scalars(
+            update(CallLog)
+            .where(CallLog.id.in_(stopped), CallLog.status.in_(IN_FLIGHT_STATUSES))
+            .values(status="canceled", updated_at=datetime.now(timezone.utc))
+            .returning(CallLog.send_job_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+        send_jobs.move_many(db, send_job_ids, "initiated", "canceled")
+        db.commit()
+        touched.update(send_job_ids)
+    progress_stream.hub.notify(touched)
+    report["in_flight"] = len(stopped)
+    report["in_flight_failed"] = len(live) - len(stopped)
+    report["canceled"] = report["scheduled"] + report["queued"] + len(stopped)
+    report["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    logger.info("Canceled meeting %d: %s", meeting_id, report)
+    return report
@@ -1,6 +1,11 @@
 import os
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from fastapi import Depends, Request
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,9 +15,96 @@ DATABASE_URL = os.environ.get(
     f"sqlite:///{os.path.join(os.path.dirname(__file__), 'callreminder.db')}"
 )
 
-engine = create_engine(DATABASE_URL)
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+
+def _async_url(url):
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=driver) if driver else url
+
+
+ASYNC_DATABASE_URL = os.environ.get("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+
+# SQLite: WAL lets the web workers read while a dispatch thread writes, and
+# busy_timeout makes writers queue for the lock instead of failing with
+# "database is locked".
+SQLITE_JOURNAL_MODE = os.environ.get("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("SQLITE_BUSY_TIMEOUT_MS", "15000"))
+SQLITE_SYNCHRONOUS = os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL")
+
+# No connection is held across calls.create, but each dispatch thread opens
+# short sessions around it (the _should_place checks, completing its job), so
+# up to DISPATCH_CONCURRENCY can be checked out at once. The pool covers
+# those plus web requests, with a few for the status writer, retry timer and
+# retention threads; imports, transcodes and heartbeats borrow from
+# DB_MAX_OVERFLOW when they overlap.
+DB_WEB_CONNECTIONS = int(os.environ.get("DB_WEB_CONNECTIONS", "10"))
+DB_POOL_SIZE = int(os.environ.get(
+    "DB_POOL_SIZE",
+    DB_WEB_CONNECTIONS + int(os.environ.get("DISPATCH_CONCURRENCY", "10")) + 3,
+))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _engine_options(url):
+    url = make_url(url)
+    if _is_memory_sqlite(url):
+        return {}
+    options = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW, "pool_timeout": DB_POOL_TIMEOUT}
+    if url.get_backend_name() != "sqlite":
+        options.update(pool_pre_ping=DB_POOL_PRE_PING, pool_recycle=DB_POOL_RECYCLE)
+    return options
+
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+    finally:
+        cursor.close()
+
+
+def _configure(sync_engine):
+    if sync_engine.dialect.name == "sqlite" and not _is_memory_sqlite(sync_engine.url):
+        event.listen(sync_engine, "connect", _sqlite_pragmas)
+    return sync_engine
+
+
+engine = _configure(create_engine(DATABASE_URL, **_engine_options(DATABASE_URL)))
 SessionLocal = sessionmaker(bind=engine)
 
+# Read-only pages can go to a replica. After a write, the user's browser is
+# pinned to the primary for READ_AFTER_WRITE_SECONDS so it sees its change.
+READ_DATABASE_URL = os.environ.get("READ_DATABASE_URL", "")
+READ_AFTER_WRITE_SECONDS = float(os.environ.get("READ_AFTER_WRITE_SECONDS", "5"))
+PRIMARY_COOKIE = "db_primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+if READ_DATABASE_URL:
+    read_engine = _configure(create_engine(READ_DATABASE_URL, **_engine_options(READ_DATABASE_URL)))
+else:
+    read_engine = engine
+ReadSessionLocal = sessionmaker(bind=read_engine)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **_engine_options(ASYNC_DATABASE_URL))
+_configure(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
+
+def upsert_insert(db):
+    """The dialect's ``insert`` (with ``on_conflict_do_*``) for a session's database."""
+    return postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+
 
 def get_db():
     db = SessionLocal()
@@ -20,3 +112,62 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def _pinned_to_primary(request):
+    try:
+        return float(request.cookies.get(PRIMARY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+def read_sessionmaker(request):
+    """ReadSessionLocal, unless there is no replica, this request writes or
+    the user wrote recently; SessionLocal then."""
+    if read_engine is engine or request.method not in SAFE_METHODS or _pinned_to_primary(request):
+        return SessionLocal
+    return ReadSessionLocal
+
+
+def get_read_db(request: Request, db: Session = Depends(get_db)):
+    """Session for read-only work, from ``read_sessionmaker``. Shares
+    ``get_db``'s session for the primary (it does not connect until used)."""
+    if read_sessionmaker(request) is SessionLocal:
+        yield db
+        return
+    read_db = ReadSessionLocal()
+    try:
+        yield read_db
+    finally:
+        read_db.close()
+
+
+def pin_to_primary(request, response):
+    """Send reads of a user who just wrote to the primary for a while."""
+    if read_engine is not engine and request.method not in SAFE_METHODS and response.status_code < 400:
+        response.set_cookie(PRIMARY_COOKIE, f"{time.time() + READ_AFTER_WRITE_SECONDS:.0f}",
+                            max_age=int(READ_AFTER_WRITE_SECONDS) + 1, httponly=True, samesite="lax")
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def pool_stats():
+    """Connection pool usage of both engines, for monitoring."""
+    stats = {}
+    engines = [("sync", engine), ("async", async_engine.sync_engine)]
+    if read_engine is not engine:
+        engines.append(("read", read_engine))
+    for name, e in engines:
+        pool = e.pool
+        stats[name] = {
+            "pool": type(pool).__name__,
+            "size": pool.size() if hasattr(pool, "size") else None,
+            "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+            "checked_in": pool.checkedin() if hasattr(pool, "checkedin") else None,
+            # QueuePool counts overflow from -size up; only report connections past size.
+            "overflow": max(pool.overflow(), 0) if hasattr(pool, "overflow") else None,
+        }
+    return stats
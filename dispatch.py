@@ -0,0 +1,478 @@
+import os
+import time
+import socket
+import asyncio
+import uuid
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, insert, update, delete, or_, and_
+from database import SessionLocal
+from models import DispatchJob
+import pacing
+import cancellation
+import status_writer
+
+logger = logging.getLogger(__name__)
+
+DISPATCH_CONCURRENCY = int(os.environ.get("DISPATCH_CONCURRENCY", "10"))
+DISPATCH_LEASE_SECONDS = int(os.environ.get("DISPATCH_LEASE_SECONDS", "120"))
+DISPATCH_POLL_INTERVAL = float(os.environ.get("DISPATCH_POLL_INTERVAL", "1.0"))
+DISPATCH_MAX_ATTEMPTS = int(os.environ.get("DISPATCH_MAX_ATTEMPTS", "3"))
+DISPATCH_DRAIN_TIMEOUT = float(os.environ.get("DISPATCH_DRAIN_TIMEOUT", "30"))
+DISPATCH_ENGINE = os.environ.get("DISPATCH_ENGINE", "thread")
+DISPATCH_ASYNC_CONCURRENCY = int(os.environ.get("DISPATCH_ASYNC_CONCURRENCY", "500"))
+DISPATCH_DB_THREADS = int(os.environ.get("DISPATCH_DB_THREADS", "4"))
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _claimable(now):
+    # A job is claimable when it is due, or when the worker that leased it
+    # stopped renewing (crashed, was killed mid-deploy, ...).
+    return or_(
+        and_(DispatchJob.status == "pending", DispatchJob.run_at <= now),
+        and_(DispatchJob.status == "claimed", DispatchJob.lease_expires_at < now),
+    )
+
+
+def enqueue(db, call_log_id, phone, recording_id, domain, scheme, from_number, run_at=None, meeting_id=None):
+    """Add a job to the session; it becomes visible to workers on commit."""
+    job = DispatchJob(
+        call_log_id=call_log_id,
+        meeting_id=meeting_id,
+        phone=phone,
+        recording_id=recording_id,
+        domain=domain,
+        scheme=scheme,
+        from_number=from_number,
+        status="pending",
+        run_at=run_at or _now(),
+    )
+    db.add(job)
+    return job
+
+
+def enqueue_many(db, jobs):
+    """Bulk-insert job dicts (``enqueue`` keyword arguments) in one statement."""
+    if jobs:
+        now = _now()
+        db.execute(insert(DispatchJob), [{"status": "pending", "run_at": now, **job} for job in jobs])
+
+
+def claim(db, owner, limit, lease_seconds=DISPATCH_LEASE_SECONDS):
+    """Lease up to ``limit`` due jobs to ``owner`` and return them.
+
+    The conditional UPDATE re-checks claimability, so when several processes
+    race for the same rows each job is handed to exactly one of them.
+    """
+    if limit <= 0:
+        return []
+    now = _now()
+    candidates = (
+        select(DispatchJob.id)
+        .where(_claimable(now))
+        .order_by(DispatchJob.run_at, DispatchJob.id)
+        .limit(limit)
+    )
+    if db.bind.dialect.name == "postgresql":
+        candidates = candidates.with_for_update(skip_locked=True)
+    ids = db.scalars(candidates).all()
+    if not ids:
+        db.rollback()
+        return []
+    token = f"{owner}:{uuid.uuid4().hex[:8]}"
+    db.execute(
+        update(DispatchJob)
+        .where(DispatchJob.id.in_(ids), _claimable(now))
+        .values(
+            status="claimed",
+            lease_owner=token,
+            lease_expires_at=now + timedelta(seconds=lease_seconds),
+            attempts=DispatchJob.attempts + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    jobs = db.scalars(select(DispatchJob).where(DispatchJob.lease_owner == token)).all()
+    db.expunge_all()
+    return jobs
+
+
+def renew(db, tokens, lease_seconds=DISPATCH_LEASE_SECONDS):
+    """Extend the leases of jobs still in flight under the given claim tokens."""
+    if not tokens:
+        return
+    db.execute(
+        update(DispatchJob)
+        .where(DispatchJob.lease_owner.in_(list(tokens)), DispatchJob.status == "claimed")
+        .values(lease_expires_at=_now() + timedelta(seconds=lease_seconds))
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def _renew(tokens):
+    db = SessionLocal()
+    try:
+        renew(db, tokens)
+    finally:
+        db.close()
+
+
+def claim_budget(limit, in_flight):
+    """How many more jobs a worker should hold.
+
+    Besides free concurrency, never more than the pacer can start within
+    half a lease: jobs waiting on the pacer past their lease would be
+    reclaimed by another worker.
+    """
+    paced = max(1, int(pacing.call_pacer.rate * DISPATCH_LEASE_SECONDS / 2))
+    return min(limit, paced) - in_flight
+
+
+def complete(db, job):
+    db.execute(
+        delete(DispatchJob)
+        .where(DispatchJob.id == job.id, DispatchJob.lease_owner == job.lease_owner)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def release(db, job, run_at=None, count_attempt=True):
+    """Hand a leased job back to the queue, optionally deferring it."""
+    values = {"status": "pending", "lease_owner": None, "lease_expires_at": None, "run_at": run_at or _now()}
+    if not count_attempt:
+        values["attempts"] = DispatchJob.attempts - 1
+    db.execute(
+        update(DispatchJob)
+        .where(DispatchJob.id == job.id, DispatchJob.lease_owner == job.lease_owner)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+
+
+def _canceled(job):
+    return job.meeting_id is not None and cancellation.registry.is_canceled(job.meeting_id, job.created_at)
+
+
+def run_job(job, limiter=None):
+    from caller import _place_call, _fail_call
+
+    db = SessionLocal()
+    try:
+        if _canceled(job):
+            logger.info("Dispatch job %d dropped: meeting %d was canceled", job.id, job.meeting_id)
+        elif job.attempts > DISPATCH_MAX_ATTEMPTS:
+            logger.error("Dispatch job %d for call %d exceeded %d attempts",
+                         job.id, job.call_log_id, DISPATCH_MAX_ATTEMPTS)
+            _fail_call(job.call_log_id)
+        else:
+            try:
+                latency = _place_call(job.call_log_id, job.phone, job.recording_id,
+                                      job.domain, job.scheme, job.from_number,
+                                      canceled=lambda: _canceled(job), job=job)
+            except pacing.Throttled:
+                # Throttling says nothing about the call itself: put it back
+                # without spending an attempt and slow the whole process down.
+                pacing.call_pacer.pause(pacing.THROTTLE_BACKOFF_SECONDS)
+                if limiter:
+                    limiter.on_throttle()
+                release(db, job, run_at=_now() + timedelta(seconds=pacing.THROTTLE_BACKOFF_SECONDS),
+                        count_attempt=False)
+                return
+            if limiter and latency is not None:
+                limiter.on_success(latency)
+        if not status_writer.writer.placed(job.call_log_id):
+            # Otherwise the writer deletes the job when it stores the result.
+            complete(db, job)
+    except Exception:
+        # Leave the lease in place; the job is retried once it expires.
+        logger.exception("Dispatch job %d failed", job.id)
+    finally:
+        db.close()
+
+
+class DispatchWorker:
+    """Claims jobs from the ``dispatch_job`` table and places their calls.
+
+    Every web process runs one worker. Jobs are leased rather than deleted on
+    claim, so a process that dies mid-campaign only delays its calls until the
+    lease expires and another worker picks them up. ``concurrency`` is the
+    ceiling; the number of calls actually in flight follows ``limiter``.
+    """
+
+    def __init__(self, concurrency=DISPATCH_CONCURRENCY, poll_interval=DISPATCH_POLL_INTERVAL):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.limiter = pacing.AIMDLimiter(initial=concurrency, maximum=concurrency)
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._thread = None
+        self._pool = None
+        self._in_flight = 0
+        self._leases = Counter()
+        self._renewed = time.monotonic()
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._stopping.clear()
+            self._pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="dispatch")
+            self._thread = threading.Thread(target=self._loop, name="dispatch-claimer", daemon=True)
+            self._thread.start()
+            logger.info("Dispatch worker %s started (concurrency=%d)", self.owner, self.concurrency)
+
+    def wake(self):
+        self.start()
+        self._wakeup.set()
+
+    def stop(self, timeout=DISPATCH_DRAIN_TIMEOUT):
+        """Stop claiming new jobs and wait for in-flight calls to finish."""
+        with self._lock:
+            if not self.running:
+                return
+            self._stopping.set()
+            self._wakeup.set()
+            thread, pool = self._thread, self._pool
+        thread.join(timeout)
+        with self._idle:
+            self._idle.wait_for(lambda: self._in_flight == 0, timeout)
+            if self._in_flight:
+                logger.warning("Dispatch worker %s stopped with %d calls in flight; "
+                               "their jobs will be recovered when the lease expires",
+                               self.owner, self._in_flight)
+        pool.shutdown(wait=False)
+        with self._lock:
+            self._thread = None
+            self._pool = None
+        logger.info("Dispatch worker %s stopped", self.owner)
+
+    def _free_slots(self):
+        with self._lock:
+            return claim_budget(self.limiter.limit, self._in_flight)
+
+    def _done(self, token):
+        with self._idle:
+            self._in_flight -= 1
+            self._leases[token] -= 1
+            if not self._leases[token]:
+                del self._leases[token]
+            self._idle.notify_all()
+        self._wakeup.set()
+
+    def _renew_leases(self):
+        if time.monotonic() - self._renewed < DISPATCH_LEASE_SECONDS / 3:
+            return
+        self._renewed = time.monotonic()
+        with self._lock:
+            tokens = set(self._leases)
+        # Jobs whose calls were placed but not written yet stay leased too.
+        tokens |= status_writer.writer.held_leases()
+        try:
+            _renew(tokens)
+        except Exception:
+            logger.exception("Dispatch lease renewal failed")
+
+    def _loop(self):
+        while not self._stopping.is_set():
+            jobs = []
+            free = self._free_slots()
+            if free > 0:
+                db = SessionLocal()
+                try:
+                    jobs = claim(db, self.owner, free)
+                except Exception:
+                    logger.exception("Dispatch claim failed")
+                finally:
+                    db.close()
+            for job in jobs:
+                with self._lock:
+                    self._in_flight += 1
+                    self._leases[job.lease_owner] += 1
+                future = self._pool.submit(run_job, job, self.limiter)
+                future.add_done_callback(lambda _f, token=job.lease_owner: self._done(token))
+            self._renew_leases()
+            if free <= 0 or len(jobs) < free:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+
+def _claim(owner, limit):
+    db = SessionLocal()
+    try:
+        return claim(db, owner, limit)
+    finally:
+        db.close()
+
+
+def _settle(job, run_at=None, count_attempt=True):
+    db = SessionLocal()
+    try:
+        if run_at is None:
+            complete(db, job)
+        else:
+            release(db, job, run_at=run_at, count_attempt=count_attempt)
+    finally:
+        db.close()
+
+
+async def run_job_async(job, client, run_db, limiter=None):
+    from caller import _place_call_async, _fail_call
+
+    try:
+        if _canceled(job):
+            logger.info("Dispatch job %d dropped: meeting %d was canceled", job.id, job.meeting_id)
+        elif job.attempts > DISPATCH_MAX_ATTEMPTS:
+            logger.error("Dispatch job %d for call %d exceeded %d attempts",
+                         job.id, job.call_log_id, DISPATCH_MAX_ATTEMPTS)
+            await run_db(_fail_call, job.call_log_id)
+        else:
+            try:
+                latency = await _place_call_async(client, run_db, job.call_log_id, job.phone, job.recording_id,
+                                                  job.domain, job.scheme, job.from_number,
+                                                  canceled=lambda: _canceled(job), job=job)
+            except pacing.Throttled:
+                pacing.call_pacer.pause(pacing.THROTTLE_BACKOFF_SECONDS)
+                if limiter:
+                    limiter.on_throttle()
+                await run_db(_settle, job, _now() + timedelta(seconds=pacing.THROTTLE_BACKOFF_SECONDS), False)
+                return
+            if limiter and latency is not None:
+                limiter.on_success(latency)
+        if not status_writer.writer.placed(job.call_log_id):
+            await run_db(_settle, job)
+    except Exception:
+        logger.exception("Dispatch job %d failed", job.id)
+
+
+class AsyncDispatchWorker:
+    """Event-loop dispatch engine, selected with ``DISPATCH_ENGINE=async``.
+
+    Same queue, leases and CallLog transitions as ``DispatchWorker``, but each
+    in-flight call is a task on one loop instead of a blocked thread, so
+    ``concurrency`` can be in the thousands. Blocking DB work runs on a small
+    dedicated thread pool.
+    """
+
+    def __init__(self, concurrency=DISPATCH_ASYNC_CONCURRENCY, poll_interval=DISPATCH_POLL_INTERVAL,
+                 db_threads=DISPATCH_DB_THREADS):
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.db_threads = db_threads
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.limiter = pacing.AIMDLimiter(initial=concurrency, maximum=concurrency)
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._drain_timeout = DISPATCH_DRAIN_TIMEOUT
+        self._thread = None
+        self._loop = None
+        self._wakeup = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        with self._lock:
+            if self.running:
+                return
+            self._stopping.clear()
+            ready = threading.Event()
+            self._thread = threading.Thread(target=self._run, args=(ready,), name="dispatch-loop", daemon=True)
+            self._thread.start()
+            ready.wait()
+            logger.info("Async dispatch worker %s started (concurrency=%d)", self.owner, self.concurrency)
+
+    def wake(self):
+        self.start()
+        self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def stop(self, timeout=DISPATCH_DRAIN_TIMEOUT):
+        with self._lock:
+            if not self.running:
+                return
+            self._drain_timeout = timeout
+            self._stopping.set()
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+            thread = self._thread
+        thread.join(timeout + 5)
+        with self._lock:
+            self._thread = None
+        logger.info("Async dispatch worker %s stopped", self.owner)
+
+    def _run(self, ready):
+        self._loop = asyncio.new_event_loop()
+        self._wakeup = asyncio.Event()
+        ready.set()
+        try:
+            self._loop.run_until_complete(self._main())
+        finally:
+            self._loop.close()
+
+    async def _main(self):
+        from caller import make_async_twilio_client
+
+        loop = asyncio.get_running_loop()
+        db_pool = ThreadPoolExecutor(max_workers=self.db_threads, thread_name_prefix="dispatch-db")
+        client = make_async_twilio_client(pool_size=self.concurrency)
+
+        def run_db(fn, *args):
+            return loop.run_in_executor(db_pool, fn, *args)
+
+        tasks = {}
+        renewed = time.monotonic()
+        try:
+            while not self._stopping.is_set():
+                jobs = []
+                free = claim_budget(self.limiter.limit, len(tasks))
+                if free > 0:
+                    try:
+                        jobs = await run_db(_claim, self.owner, free)
+                    except Exception:
+                        logger.exception("Dispatch claim failed")
+                for job in jobs:
+                    task = loop.create_task(run_job_async(job, client, run_db, self.limiter))
+                    tasks[task] = job.lease_owner
+                    task.add_done_callback(tasks.pop)
+                    task.add_done_callback(lambda _t: self._wakeup.set())
+                if time.monotonic() - renewed >= DISPATCH_LEASE_SECONDS / 3:
+                    renewed = time.monotonic()
+                    try:
+                        await run_db(_renew, set(tasks.values()) | status_writer.writer.held_leases())
+                    except Exception:
+                        logger.exception("Dispatch lease renewal failed")
+                if free <= 0 or len(jobs) < free:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    self._wakeup.clear()
+            if tasks:
+                _done, pending = await asyncio.wait(list(tasks), timeout=self._drain_timeout)
+                if pending:
+                    logger.warning("Async dispatch worker %s stopped with %d calls in flight; "
+                                   "their jobs will be recovered when the lease expires",
+                                   self.owner, len(pending))
+                    for task in pending:
+                        task.cancel()
+        finally:
+            await client.http_client.close()
+            db_pool.shutdown(wait=False)
+
+
+worker = AsyncDispatchWorker() if DISPATCH_ENGINE == "async" else DispatchWorker()
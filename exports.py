@@ -0,0 +1,97 @@
+import os
+import io
+import csv
+import json
+import heapq
+from datetime import date, datetime, timedelta
+from sqlalchemy import select, literal
+from models import CallLog, CallLogArchive, Meeting, Member
+
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "2000"))
+EXPORT_CHUNK_BYTES = 64 * 1024
+FORMATS = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+CALL_LOG_FIELDS = ("id", "initiated_at", "updated_at", "status", "attempt", "meeting_id", "meeting",
+                   "meeting_date", "member_id", "member", "phone", "twilio_call_sid", "archived")
+MEMBER_FIELDS = ("id", "name", "phone", "active", "created_at")
+
+
+def call_log_filters(model, org_id, meeting_id=None, member_id=None, start=None, end=None):
+    """WHERE clauses shared by /log and the call log export (dates inclusive)."""
+    filters = [model.org_id == org_id]
+    if meeting_id:
+        filters.append(model.meeting_id == meeting_id)
+    if member_id:
+        filters.append(model.member_id == member_id)
+    if start:
+        filters.append(model.initiated_at >= datetime.combine(start, datetime.min.time()))
+    if end:
+        filters.append(model.initiated_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return filters
+
+
+def _sort_key(row):
+    return row.initiated_at is not None, row.initiated_at or datetime.min, row.id
+
+
+def call_log_rows(db, org_id, meeting_id=None, status="", member_id=None, start=None, end=None):
+    """Calls oldest first, hot and archived merged, read in EXPORT_BATCH_SIZE batches."""
+    streams = []
+    for model in (CallLog, CallLogArchive):
+        filters = call_log_filters(model, org_id, meeting_id, member_id, start, end)
+        if status:
+            filters.append(model.status == status)
+        q = (
+            select(model.id, model.initiated_at, model.updated_at, model.status, model.attempt, model.meeting_id,
+                   Meeting.title, Meeting.meeting_date, model.member_id, Member.name, Member.phone,
+                   model.twilio_call_sid, literal(model is CallLogArchive).label("archived"))
+            .outerjoin(Meeting, Meeting.id == model.meeting_id)
+            .outerjoin(Member, Member.id == model.member_id)
+            .where(*filters)
+            .order_by(model.initiated_at.asc().nulls_first(), model.id)
+            .execution_options(yield_per=EXPORT_BATCH_SIZE)
+        )
+        streams.append(db.execute(q))
+    yield from heapq.merge(*streams, key=_sort_key)
+
+
+def member_rows(db, org_id):
+    q = (
+        select(Member.id, Member.name, Member.phone, Member.active, Member.created_at)
+        .where(Member.org_id == org_id)
+        .order_by(Member.name, Member.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    yield from db.execute(q)
+
+
+def _value(value):
+    return value.isoformat() if isinstance(value, (date, datetime)) else value
+
+
+def stream(session_factory, rows, fields, fmt="csv"):
+    """Encode ``rows(db)`` as CSV or NDJSON in chunks of about EXPORT_CHUNK_BYTES.
+
+    The generator opens and closes its own session: a streamed body outlives
+    the request's dependencies.
+    """
+    out = io.StringIO()
+    if fmt == "csv":
+        writer = csv.writer(out)
+        writer.writerow(fields)
+        write = writer.writerow
+    else:
+        def write(row):
+            out.write(json.dumps(dict(zip(fields, row)), default=str))
+            out.write("\n")
+    db = session_factory()
+    try:
+        for row in rows(db):
+            write([_value(v) for v in row])
+            if out.tell() > EXPORT_CHUNK_BYTES:
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+    finally:
+        db.close()
+    yield out.getvalue()
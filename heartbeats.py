@@ -0,0 +1,93 @@
+import os
+import uuid
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update, or_
+from database import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+JOB_HEARTBEAT_SECONDS = float(os.environ.get("JOB_HEARTBEAT_SECONDS", "20"))
+# A job whose heartbeat is older than this belongs to a process that is gone.
+JOB_STALE_SECONDS = float(os.environ.get("JOB_STALE_SECONDS", "90"))
+OWNER = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def stale(model, now=None):
+    """Rows of ``model`` nobody has kept alive for JOB_STALE_SECONDS."""
+    cutoff = (now or _now()) - timedelta(seconds=JOB_STALE_SECONDS)
+    return or_(model.heartbeat_at.is_(None), model.heartbeat_at < cutoff)
+
+
+class Heartbeat:
+    """Keeps ``heartbeat_at`` fresh on the ``model`` rows this process works on.
+
+    Background jobs (roster imports, transcodes) are rows with an ``owner``
+    and a ``heartbeat_at``. The owning process refreshes them from one thread
+    every ``interval`` seconds while they are queued or running; on startup,
+    another process only takes over a row once its heartbeat is stale, so
+    jobs live in a sibling worker are never run twice.
+    """
+
+    def __init__(self, model, interval=JOB_HEARTBEAT_SECONDS):
+        self.model = model
+        self.interval = interval
+        self._ids = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def claim(self, db, row_id, *where):
+        """Take over a stale row; True if this process owns it now. Caller commits.
+
+        The conditional UPDATE re-checks staleness, so of several processes
+        racing for the row exactly one gets it.
+        """
+        return db.execute(
+            update(self.model)
+            .where(self.model.id == row_id, stale(self.model), *where)
+            .values(owner=OWNER, heartbeat_at=_now())
+            .execution_options(synchronize_session=False)
+        ).rowcount == 1
+
+    def hold(self, row_id):
+        with self._lock:
+            self._ids.add(row_id)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True,
+                                                name=f"heartbeat-{self.model.__tablename__}")
+                self._thread.start()
+
+    def release(self, row_id):
+        with self._lock:
+            self._ids.discard(row_id)
+
+    def beat(self):
+        with self._lock:
+            ids = list(self._ids)
+        if not ids:
+            return
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(self.model)
+                .where(self.model.id.in_(ids), self.model.owner == OWNER)
+                .values(heartbeat_at=_now())
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.beat()
+            except Exception:
+                logger.exception("Heartbeat for %s failed", self.model.__tablename__)
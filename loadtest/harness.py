@@ -0,0 +1,187 @@
+"""End-to-end load harness for the calling pipeline.
+
+Starts the Twilio emulator and the app as two uvicorn processes against a
+throwaway SQLite database, seeds N orgs x M members, fires ``POST /send``
+for every org at once and follows the campaign until every call reaches a
+terminal status.
+
+Usage::
+
+    python -m loadtest.harness --orgs 5 --members 200 --time-scale 0.05
+
+Reports placement rate (calls/sec), time until every call was placed, time
+to completion and webhook processing lag as seen by the emulator.
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TERMINAL = ("completed", "busy", "no-answer", "failed", "canceled")
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_up(url, proc, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{url} exited with {proc.returncode}")
+        try:
+            httpx.get(url, timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+def _uvicorn(module, port, env):
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", module, "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT, env=env,
+    )
+
+
+def seed(orgs, members):
+    from sqlalchemy import insert, literal, select
+    from database import engine, SessionLocal
+    from models import Base, Organization, User, Member, Recording, Meeting, meeting_members
+
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    campaigns = []
+    for n in range(orgs):
+        org = Organization(name=f"Load Org {n}", slug=f"load-org-{n}")
+        db.add(org)
+        db.flush()
+        user = User(org_id=org.id, email=f"load{n}@example.com", password_hash="x", role="owner")
+        rec = Recording(org_id=org.id, name="Load", filename=f"{org.id}/load.mp3")
+        mtg = Meeting(org_id=org.id, title="Load", meeting_date=date.today())
+        db.add_all([user, rec, mtg])
+        db.flush()
+        db.execute(insert(Member), [
+            {"org_id": org.id, "name": f"Member {n}-{i}", "phone": f"+1{n % 10}55{i:07d}", "active": True}
+            for i in range(members)
+        ])
+        db.execute(meeting_members.insert().from_select(
+            ["meeting_id", "member_id"],
+            select(literal(mtg.id), Member.id).where(Member.org_id == org.id),
+        ))
+        campaigns.append((org.id, user.id, mtg.id, rec.id))
+    db.commit()
+    db.close()
+    return campaigns
+
+
+def status_counts():
+    from sqlalchemy import func, select
+    from database import SessionLocal
+    from models import CallLog
+
+    db = SessionLocal()
+    try:
+        return dict(db.execute(select(CallLog.status, func.count()).group_by(CallLog.status)).all())
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--orgs", type=int, default=3)
+    parser.add_argument("--members", type=int, default=100)
+    parser.add_argument("--time-scale", type=float, default=0.05,
+                        help="multiplier for emulated ring/talk times")
+    parser.add_argument("--latency-ms", type=float, default=150)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--emulator-cps", type=float, default=0,
+                        help="throttle above this many calls/sec (0 = never)")
+    parser.add_argument("--cps", type=float, default=1000, help="TWILIO_CPS given to the app")
+    parser.add_argument("--engine", choices=["thread", "async"], default="thread")
+    parser.add_argument("--timeout", type=float, default=600)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.mkdtemp(prefix="rcba-load-")
+    app_port, emu_port = _free_port(), _free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(tmpdir, 'load.db')}",
+        SECRET_KEY="loadtest",
+        TWILIO_ACCOUNT_SID="AC" + "0" * 32,
+        TWILIO_AUTH_TOKEN="loadtest",
+        TWILIO_API_BASE_URL=f"http://127.0.0.1:{emu_port}",
+        TWILIO_CPS=str(args.cps),
+        DOMAIN=f"localhost:{app_port}",
+        DISPATCH_ENGINE=args.engine,
+        EMULATOR_TIME_SCALE=str(args.time_scale),
+        EMULATOR_LATENCY_MS=str(args.latency_ms),
+        EMULATOR_ERROR_RATE=str(args.error_rate),
+        EMULATOR_CPS=str(args.emulator_cps),
+    )
+    os.environ.update(DATABASE_URL=env["DATABASE_URL"], SECRET_KEY=env["SECRET_KEY"])
+    sys.path.insert(0, ROOT)
+    campaigns = seed(args.orgs, args.members)
+    total = args.orgs * args.members
+
+    from auth import create_access_token
+
+    emulator = _uvicorn("loadtest.twilio_emulator:app", emu_port, env)
+    app = _uvicorn("app:app", app_port, env)
+    try:
+        _wait_until_up(f"http://127.0.0.1:{emu_port}/stats", emulator)
+        _wait_until_up(f"http://127.0.0.1:{app_port}/login", app)
+
+        def send(org_id, user_id, mtg_id, rec_id):
+            cookies = {"access_token": create_access_token(user_id, org_id)}
+            httpx.post(f"http://127.0.0.1:{app_port}/send", cookies=cookies, timeout=300,
+                       data={"meeting_id": mtg_id, "recording_id": rec_id})
+
+        started = time.monotonic()
+        senders = [threading.Thread(target=send, args=c) for c in campaigns]
+        for t in senders:
+            t.start()
+        for t in senders:
+            t.join()
+        sent = time.monotonic() - started
+
+        placed_at = None
+        while time.monotonic() - started < args.timeout:
+            counts = status_counts()
+            pending = counts.get("queued", 0) + counts.get("scheduled", 0)
+            if placed_at is None and sum(counts.values()) >= total and not pending:
+                placed_at = time.monotonic() - started
+            if sum(counts.values()) >= total and sum(counts.get(s, 0) for s in TERMINAL) >= total:
+                break
+            time.sleep(0.25)
+        finished = time.monotonic() - started
+        emu = httpx.get(f"http://127.0.0.1:{emu_port}/stats").json()
+    finally:
+        for proc in (app, emulator):
+            proc.terminate()
+            proc.wait(10)
+
+    print(f"orgs x members:       {args.orgs} x {args.members} = {total} calls ({args.engine} engine)")
+    print(f"/send requests:       {sent:.2f} s")
+    if placed_at:
+        print(f"all calls placed:     {placed_at:.2f} s ({total / placed_at:.1f} calls/sec)")
+    print(f"time to completion:   {finished:.2f} s")
+    print(f"final statuses:       {status_counts()}")
+    print(f"emulator:             created={emu['created']} throttled={emu['throttled']} errors={emu['errors']}")
+    print(f"webhook lag:          p50={emu['callback_p50_ms']} ms p95={emu['callback_p95_ms']} ms "
+          f"max={emu['callback_max_ms']} ms over {emu['callbacks_sent']} callbacks "
+          f"({emu['callbacks_failed']} failed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Local stand-in for the Twilio Calls REST API.
+
+Accepts ``calls.create`` / ``calls(sid).update`` requests from the twilio
+library and plays each call through a realistic lifecycle, POSTing
+initiated / ringing / in-progress / completed (or busy, no-answer, failed)
+status callbacks to the call's ``StatusCallback`` URL.
+
+Run it with::
+
+    uvicorn loadtest.twilio_emulator:app --port 8099
+
+and point the app at it with ``TWILIO_API_BASE_URL=http://127.0.0.1:8099``.
+Behaviour is configured through ``EMULATOR_*`` environment variables (see
+``EmulatorConfig.from_env``); ``GET /stats`` reports what it has seen.
+"""
+import os
+import time
+import uuid
+import random
+import asyncio
+import logging
+from dataclasses import dataclass
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class EmulatorConfig:
+    api_latency_ms: float = 150.0
+    api_jitter_ms: float = 50.0
+    error_rate: float = 0.0
+    cps: float = 0.0
+    answer_rate: float = 0.7
+    busy_rate: float = 0.1
+    fail_rate: float = 0.05
+    time_scale: float = 1.0
+    seed: int = None
+
+    @classmethod
+    def from_env(cls):
+        env = os.environ.get
+        return cls(
+            api_latency_ms=float(env("EMULATOR_LATENCY_MS", "150")),
+            api_jitter_ms=float(env("EMULATOR_JITTER_MS", "50")),
+            error_rate=float(env("EMULATOR_ERROR_RATE", "0")),
+            cps=float(env("EMULATOR_CPS", "0")),
+            answer_rate=float(env("EMULATOR_ANSWER_RATE", "0.7")),
+            busy_rate=float(env("EMULATOR_BUSY_RATE", "0.1")),
+            fail_rate=float(env("EMULATOR_FAIL_RATE", "0.05")),
+            time_scale=float(env("EMULATOR_TIME_SCALE", "1")),
+        )
+
+
+# Seconds after creation at which each lifecycle step happens, before
+# time_scale is applied. Ranges are sampled uniformly.
+RINGING_AFTER = (0.3, 1.0)
+ANSWER_AFTER = (3.0, 12.0)
+TALK_TIME = (15.0, 35.0)
+BUSY_AFTER = (1.0, 3.0)
+NO_ANSWER_AFTER = (25.0, 32.0)
+FAILED_AFTER = (0.5, 1.5)
+
+
+class Emulator:
+    def __init__(self, config, transport=None):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.calls = {}
+        self.stats = {"created": 0, "throttled": 0, "errors": 0, "updated": 0,
+                      "callbacks_sent": 0, "callbacks_failed": 0}
+        self.callback_latencies = []
+        self._window_start = time.monotonic()
+        self._window_count = 0
+        self._tasks = set()
+        self._http = httpx.AsyncClient(transport=transport, timeout=30)
+
+    def _throttled(self):
+        if not self.config.cps:
+            return False
+        now = time.monotonic()
+        if now - self._window_start >= 1:
+            self._window_start, self._window_count = now, 0
+        self._window_count += 1
+        return self._window_count > self.config.cps
+
+    def _delay(self, bounds):
+        return self.random.uniform(*bounds) * self.config.time_scale
+
+    def _outcome(self):
+        roll = self.random.random()
+        if roll < self.config.fail_rate:
+            return "failed"
+        roll -= self.config.fail_rate
+        if roll < self.config.busy_rate:
+            return "busy"
+        roll -= self.config.busy_rate
+        if roll < self.config.answer_rate:
+            return "completed"
+        return "no-answer"
+
+    def resource(self, call):
+        return {
+            "sid": call["sid"],
+            "account_sid": call["account_sid"],
+            "to": call["to"],
+            "from": call["from"],
+            "status": call["status"],
+            "direction": "outbound-api",
+            "uri": f"/2010-04-01/Accounts/{call['account_sid']}/Calls/{call['sid']}.json",
+        }
+
+    def create(self, account_sid, form):
+        call = {
+            "sid": "CA" + uuid.uuid4().hex,
+            "account_sid": account_sid,
+            "to": form.get("To"),
+            "from": form.get("From"),
+            "status": "queued",
+            "callback": form.get("StatusCallback"),
+            "events": set(form.getlist("StatusCallbackEvent")),
+            "sequence": 0,
+            "created": time.monotonic(),
+        }
+        self.calls[call["sid"]] = call
+        self.stats["created"] += 1
+        task = asyncio.get_running_loop().create_task(self._lifecycle(call))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return call
+
+    async def _lifecycle(self, call):
+        outcome = self._outcome()
+        steps = [(0.05 * self.config.time_scale, "initiated", "initiated")]
+        if outcome == "failed":
+            steps.append((self._delay(FAILED_AFTER), "failed", "completed"))
+        else:
+            steps.append((self._delay(RINGING_AFTER), "ringing", "ringing"))
+            if outcome == "busy":
+                steps.append((self._delay(BUSY_AFTER), "busy", "completed"))
+            elif outcome == "no-answer":
+                steps.append((self._delay(NO_ANSWER_AFTER), "no-answer", "completed"))
+            else:
+                steps.append((self._delay(ANSWER_AFTER), "in-progress", "answered"))
+                steps.append((self._delay(TALK_TIME), "completed", "completed"))
+        for delay, status, event in steps:
+            await asyncio.sleep(delay)
+            if call["status"] in ("completed", "busy", "no-answer", "failed", "canceled"):
+                return
+            call["status"] = status
+            if event in call["events"] or event == "completed":
+                await self._callback(call)
+
+    async def _callback(self, call):
+        if not call["callback"]:
+            return
+        call["sequence"] += 1
+        data = {
+            "CallSid": call["sid"],
+            "AccountSid": call["account_sid"],
+            "CallStatus": call["status"],
+            "To": call["to"],
+            "From": call["from"],
+            "Direction": "outbound-api",
+            "SequenceNumber": str(call["sequence"]),
+        }
+        started = time.monotonic()
+        try:
+            resp = await self._http.post(call["callback"], data=data)
+            ok = resp.status_code < 400
+        except httpx.HTTPError as e:
+            logger.warning("Callback to %s failed: %s", call["callback"], e)
+            ok = False
+        self.callback_latencies.append(time.monotonic() - started)
+        self.stats["callbacks_sent" if ok else "callbacks_failed"] += 1
+
+    async def update(self, sid, status):
+        call = self.calls.get(sid)
+        if call is None:
+            return None
+        self.stats["updated"] += 1
+        live = call["status"] not in ("completed", "busy", "no-answer", "failed", "canceled")
+        if live and status in ("canceled", "completed"):
+            if status == "canceled" and call["status"] == "in-progress":
+                raise ValueError("Call is in-progress. Cannot cancel.")
+            call["status"] = status
+            await self._callback(call)
+        return call
+
+    def snapshot(self):
+        latencies = sorted(self.callback_latencies)
+        pick = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 1)
+        statuses = {}
+        for call in self.calls.values():
+            statuses[call["status"]] = statuses.get(call["status"], 0) + 1
+        return {
+            **self.stats,
+            "live": sum(1 for c in self.calls.values() if c["status"] in ("queued", "initiated", "ringing", "in-progress")),
+            "statuses": statuses,
+            "callback_p50_ms": pick(0.5) if latencies else None,
+            "callback_p95_ms": pick(0.95) if latencies else None,
+            "callback_max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+        }
+
+
+def _error(status, code, message):
+    return JSONResponse({"code": code, "message": message, "status": status}, status_code=status)
+
+
+def create_app(config=None, transport=None):
+    emulator = Emulator(config or EmulatorConfig.from_env(), transport=transport)
+    api = FastAPI()
+    api.state.emulator = emulator
+
+    async def _latency():
+        cfg = emulator.config
+        delay = max(0.0, emulator.random.gauss(cfg.api_latency_ms, cfg.api_jitter_ms)) / 1000
+        await asyncio.sleep(delay)
+
+    @api.post("/2010-04-01/Accounts/{account_sid}/Calls.json")
+    async def create_call(account_sid: str, request: Request):
+        form = await request.form()
+        await _latency()
+        if emulator._throttled():
+            emulator.stats["throttled"] += 1
+            return _error(429, 20429, "Too Many Requests")
+        if emulator.random.random() < emulator.config.error_rate:
+            emulator.stats["errors"] += 1
+            return _error(500, 20500, "Internal Server Error")
+        if not form.get("To") or not form.get("Url"):
+            return _error(400, 21201, "No 'To' number or 'Url' is specified")
+        call = emulator.create(account_sid, form)
+        return JSONResponse(emulator.resource(call), status_code=201)
+
+    @api.post("/2010-04-01/Accounts/{account_sid}/Calls/{sid}.json")
+    async def update_call(account_sid: str, sid: str, request: Request):
+        form = await request.form()
+        await _latency()
+        try:
+            call = await emulator.update(sid, form.get("Status"))
+        except ValueError as e:
+            return _error(400, 21220, str(e))
+        if call is None:
+            return _error(404, 20404, "The requested resource was not found")
+        return JSONResponse(emulator.resource(call))
+
+    @api.get("/stats")
+    def stats():
+        return emulator.snapshot()
+
+    return api
+
+
+app = create_app()
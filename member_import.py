@@ -0,0 +1,230 @@
+import os
+import io
+import re
+import csv
+import shutil
+import logging
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from sqlalchemy import insert, update, delete, select, or_, and_
+from database import SessionLocal, upsert_insert
+from models import Member, MemberImport, MemberImportError
+import heartbeats
+
+logger = logging.getLogger(__name__)
+
+MEMBER_IMPORT_BATCH_SIZE = int(os.environ.get("MEMBER_IMPORT_BATCH_SIZE", "1000"))
+MEMBER_IMPORT_CONCURRENCY = int(os.environ.get("MEMBER_IMPORT_CONCURRENCY", "2"))
+MEMBER_IMPORT_DIR = os.environ.get("MEMBER_IMPORT_DIR", os.path.join(tempfile.gettempdir(), "member-imports"))
+COPY_CHUNK = 1024 * 1024
+NAME_MAX = Member.name.type.length
+# insert: only add new phones; update: also rename members whose phone is
+# already on file; sync: update, reactivate, and deactivate every member
+# whose phone is missing from the file.
+MODES = ("insert", "update", "sync")
+ACTIVE_STATUSES = ("pending", "running")
+
+_NON_DIGITS = re.compile(r"\D")
+_pool = ThreadPoolExecutor(MEMBER_IMPORT_CONCURRENCY, thread_name_prefix="member-import")
+heartbeat = heartbeats.Heartbeat(MemberImport)
+
+
+def normalize_phones(values):
+    """E.164 US numbers for raw phone strings, None where one isn't valid."""
+    phones = []
+    for value in values:
+        digits = _NON_DIGITS.sub("", value)
+        if len(digits) == 11 and digits[0] == "1":
+            digits = digits[1:]
+        phones.append(f"+1{digits}" if len(digits) == 10 else None)
+    return phones
+
+
+def save_upload(fileobj, import_id):
+    """Copy an upload to the import directory in chunks; returns (path, size)."""
+    os.makedirs(MEMBER_IMPORT_DIR, exist_ok=True)
+    path = os.path.join(MEMBER_IMPORT_DIR, f"{import_id}.csv")
+    with open(path, "wb") as out:
+        shutil.copyfileobj(fileobj, out, COPY_CHUNK)
+    return path, os.path.getsize(path)
+
+
+def _upsert(db, import_id, org_id, mode, names):
+    """Insert or update the batch's members by (org_id, phone) in one statement.
+
+    Returns how many of the phones were already on file.
+    """
+    phones = sorted(names)
+    existing = set(db.scalars(select(Member.phone).where(Member.org_id == org_id, Member.phone.in_(phones))))
+    stmt = upsert_insert(db)(Member)
+    if mode == "insert":
+        stmt = stmt.on_conflict_do_nothing(index_elements=["org_id", "phone"])
+    else:
+        values = {"name": stmt.excluded.name, "last_import_id": stmt.excluded.last_import_id}
+        if mode == "sync":
+            values["active"] = True
+        stmt = stmt.on_conflict_do_update(index_elements=["org_id", "phone"], set_=values)
+    db.execute(stmt, [{"org_id": org_id, "name": names[phone], "phone": phone, "active": True,
+                       "last_import_id": import_id} for phone in phones])
+    return len(existing)
+
+
+def _deactivate_missing(db, import_id, org_id):
+    # Members another unfinished import just wrote are not "missing".
+    others = select(MemberImport.id).where(
+        MemberImport.org_id == org_id, MemberImport.status.in_(ACTIVE_STATUSES), MemberImport.id != import_id)
+    result = db.execute(
+        update(Member)
+        .where(Member.org_id == org_id, Member.active.is_(True),
+               or_(Member.last_import_id.is_(None),
+                   and_(Member.last_import_id != import_id, Member.last_import_id.not_in(others))))
+        .values(active=False)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+def start(import_id, path):
+    """Run an import owned by this process (created with ``owner=heartbeats.OWNER``)."""
+    heartbeat.hold(import_id)
+    return _pool.submit(run, import_id, path)
+
+
+def resume():
+    """Take over imports whose process died; fail those whose file is gone.
+
+    Imports still kept alive by a sibling worker are left alone. Saved files
+    are removed only once their import is finished or gone.
+    """
+    db = SessionLocal()
+    try:
+        ids = db.scalars(select(MemberImport.id).where(
+            MemberImport.status.in_(ACTIVE_STATUSES), heartbeats.stale(MemberImport))).all()
+        paths = {}
+        for import_id in ids:
+            if not heartbeat.claim(db, import_id, MemberImport.status.in_(ACTIVE_STATUSES)):
+                continue
+            path = os.path.join(MEMBER_IMPORT_DIR, f"{import_id}.csv")
+            if os.path.exists(path):
+                paths[import_id] = path
+            else:
+                db.execute(update(MemberImport).where(MemberImport.id == import_id).values(
+                    status="failed", error="upload lost before the import finished",
+                    finished_at=datetime.now(timezone.utc)))
+        db.commit()
+        names = os.listdir(MEMBER_IMPORT_DIR) if os.path.isdir(MEMBER_IMPORT_DIR) else []
+        saved = {int(name[:-4]): name for name in names if name.endswith(".csv") and name[:-4].isdigit()}
+        active = set(db.scalars(select(MemberImport.id).where(
+            MemberImport.id.in_(list(saved)), MemberImport.status.in_(ACTIVE_STATUSES))))
+    finally:
+        db.close()
+    for import_id, name in saved.items():
+        if import_id not in active:
+            os.remove(os.path.join(MEMBER_IMPORT_DIR, name))
+    for import_id, path in paths.items():
+        start(import_id, path)
+
+
+def _write_batch(db, import_id, org_id, mode, pending, raw, totals):
+    names, valid, errors = {}, 0, []
+    for (line, name, phone_raw), phone in zip(pending, normalize_phones(p[2] for p in pending)):
+        if not name:
+            reason = "missing name"
+        elif len(name) > NAME_MAX:
+            reason = f"name longer than {NAME_MAX} characters"
+        elif phone is None:
+            reason = "missing phone" if not phone_raw else "invalid phone"
+        else:
+            # A phone repeated within the batch: insert keeps the first row,
+            # the other modes the last, as across batches.
+            if mode != "insert" or phone not in names:
+                names[phone] = name
+            valid += 1
+            continue
+        errors.append({"import_id": import_id, "line": line, "reason": reason,
+                       "name": name[:255], "phone": phone_raw[:255]})
+    existing = _upsert(db, import_id, org_id, mode, names) if names else 0
+    if errors:
+        db.execute(insert(MemberImportError), errors)
+    totals["rows"] += len(pending)
+    totals["added"] += len(names) - existing
+    totals["existing"] += valid - (len(names) - existing)
+    totals["skipped"] += len(errors)
+    db.execute(update(MemberImport).where(MemberImport.id == import_id).values(bytes_read=raw.tell(), **totals))
+    db.commit()
+
+
+def run(import_id, path):
+    """Import a saved roster CSV (``Name,Phone`` rows, header optional).
+
+    Rows are parsed as a stream and upserted by phone in batches of
+    MEMBER_IMPORT_BATCH_SIZE, each batch committed with the import's
+    progress, so memory stays flat whatever the file size.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(MemberImport, import_id)
+        job.status = "running"
+        org_id, mode = job.org_id, job.mode
+        # A resumed import starts over; its rows upsert by phone again.
+        db.execute(delete(MemberImportError).where(MemberImportError.import_id == import_id))
+        db.commit()
+        totals = {"rows": 0, "added": 0, "existing": 0, "skipped": 0}
+        pending = []
+        with open(path, "rb") as raw:
+            reader = csv.reader(io.TextIOWrapper(raw, encoding="utf-8-sig", errors="replace", newline=""))
+            for row in reader:
+                if not any(cell.strip() for cell in row):
+                    continue
+                name = row[0].strip()
+                phone_raw = row[1].strip() if len(row) > 1 else ""
+                pending.append((reader.line_num, name, phone_raw))
+                if len(pending) >= MEMBER_IMPORT_BATCH_SIZE:
+                    _write_batch(db, import_id, org_id, mode, pending, raw, totals)
+                    pending = []
+            _write_batch(db, import_id, org_id, mode, pending, raw, totals)
+        # An empty or unreadable roster must not deactivate everyone.
+        if mode == "sync" and totals["added"] + totals["existing"]:
+            job.deactivated = _deactivate_missing(db, import_id, org_id)
+        job.status = "done"
+        job.bytes_read = job.size_bytes
+        job.finished_at = datetime.now(timezone.utc)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.exception("Member import %d failed", import_id)
+        db.execute(update(MemberImport).where(MemberImport.id == import_id).values(
+            status="failed", error=str(e)[:500], finished_at=datetime.now(timezone.utc)))
+        db.commit()
+    finally:
+        db.close()
+        heartbeat.release(import_id)
+        os.remove(path)
+
+
+def summary(job):
+    return {
+        "id": job.id,
+        "filename": job.filename,
+        "status": job.status,
+        "rows": job.rows,
+        "mode": job.mode,
+        "added": job.added,
+        "existing": job.existing,
+        "skipped": job.skipped,
+        "deactivated": job.deactivated,
+        "percent": round(100 * job.bytes_read / job.size_bytes, 1) if job.size_bytes else 100.0,
+        "error": job.error,
+    }
+
+
+def error_rows(db, import_id, batch_size=1000):
+    """Rejected rows of an import in line order, streamed."""
+    q = (
+        select(MemberImportError.line, MemberImportError.reason, MemberImportError.name, MemberImportError.phone)
+        .where(MemberImportError.import_id == import_id)
+        .order_by(MemberImportError.line)
+        .execution_options(yield_per=batch_size)
+    )
+    yield from db.execute(q)
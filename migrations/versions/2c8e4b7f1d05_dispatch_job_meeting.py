@@ -0,0 +1,29 @@
+"""dispatch job meeting id
+
+Revision ID: 2c8e4b7f1d05
+Revises: 9d3f5a61e8b2
+Create Date: 2026-10-17 13:05:27.190442
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c8e4b7f1d05'
+down_revision = '9d3f5a61e8b2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('dispatch_job', sa.Column('meeting_id', sa.Integer(), nullable=True))
+    op.execute(
+        "UPDATE dispatch_job SET meeting_id = "
+        "(SELECT meeting_id FROM call_log WHERE call_log.id = dispatch_job.call_log_id)"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('dispatch_job') as batch_op:
+        batch_op.drop_column('meeting_id')
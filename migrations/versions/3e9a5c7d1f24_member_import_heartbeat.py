@@ -0,0 +1,28 @@
+"""member import owner and heartbeat
+
+Revision ID: 3e9a5c7d1f24
+Revises: f1b7d2a9c364
+Create Date: 2026-10-18 14:06:52.117043
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3e9a5c7d1f24'
+down_revision = 'f1b7d2a9c364'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('member_import') as batch_op:
+        batch_op.add_column(sa.Column('owner', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('member_import') as batch_op:
+        batch_op.drop_column('heartbeat_at')
+        batch_op.drop_column('owner')
@@ -0,0 +1,44 @@
+"""dispatch job queue
+
+Revision ID: 4b1e7d2a9c30
+Revises: c60b08a5fbe5
+Create Date: 2026-10-17 09:12:44.318204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4b1e7d2a9c30'
+down_revision = 'c60b08a5fbe5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('dispatch_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('call_log_id', sa.Integer(), nullable=False),
+    sa.Column('phone', sa.String(length=20), nullable=False),
+    sa.Column('recording_id', sa.Integer(), nullable=False),
+    sa.Column('domain', sa.String(length=255), nullable=False),
+    sa.Column('scheme', sa.String(length=10), nullable=False),
+    sa.Column('from_number', sa.String(length=20), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('run_at', sa.DateTime(), nullable=True),
+    sa.Column('lease_owner', sa.String(length=64), nullable=True),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['call_log_id'], ['call_log.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_dispatch_job_status_run_at', 'dispatch_job', ['status', 'run_at'], unique=False)
+    op.create_index('ix_dispatch_job_lease_owner', 'dispatch_job', ['lease_owner'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_dispatch_job_lease_owner', table_name='dispatch_job')
+    op.drop_index('ix_dispatch_job_status_run_at', table_name='dispatch_job')
+    op.drop_table('dispatch_job')
@@ -0,0 +1,82 @@
+"""daily and per-member call stats
+
+Revision ID: 5f2d8c41a7e9
+Revises: e3a9f27c6b14
+Create Date: 2026-10-17 19:41:03.268915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f2d8c41a7e9'
+down_revision = 'e3a9f27c6b14'
+branch_labels = None
+depends_on = None
+
+CALLS = """
+    SELECT org_id, meeting_id, member_id, initiated_at, status FROM call_log
+    UNION ALL
+    SELECT org_id, meeting_id, member_id, initiated_at, status FROM call_log_archive
+"""
+COUNTS = """
+    count(*),
+    sum(CASE WHEN status = 'completed' THEN 1 ELSE 0 END),
+    sum(CASE WHEN status = 'busy' THEN 1 ELSE 0 END),
+    sum(CASE WHEN status = 'no-answer' THEN 1 ELSE 0 END),
+    sum(CASE WHEN status = 'failed' THEN 1 ELSE 0 END)
+"""
+OUTCOMES = "status IN ('completed', 'busy', 'no-answer', 'failed') AND initiated_at IS NOT NULL"
+
+
+def upgrade():
+    op.create_table('daily_call_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('org_id', sa.Integer(), nullable=False),
+    sa.Column('meeting_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('calls', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('busy', sa.Integer(), nullable=False),
+    sa.Column('no_answer', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_daily_call_stats_org_id_day', 'daily_call_stats', ['org_id', 'day'], unique=False)
+    op.create_index('ix_daily_call_stats_org_id_meeting_id_day', 'daily_call_stats', ['org_id', 'meeting_id', 'day'], unique=True)
+    op.create_table('member_call_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('org_id', sa.Integer(), nullable=False),
+    sa.Column('member_id', sa.Integer(), nullable=False),
+    sa.Column('calls', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('busy', sa.Integer(), nullable=False),
+    sa.Column('no_answer', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('last_call_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_member_call_stats_org_id_member_id', 'member_call_stats', ['org_id', 'member_id'], unique=True)
+
+    # Backfill from existing history; the status writer keeps them current.
+    op.execute(f"""
+        INSERT INTO daily_call_stats (org_id, meeting_id, day, calls, completed, busy, no_answer, failed)
+        SELECT org_id, meeting_id, date(initiated_at), {COUNTS}
+        FROM ({CALLS}) calls WHERE {OUTCOMES}
+        GROUP BY org_id, meeting_id, date(initiated_at)
+    """)
+    op.execute(f"""
+        INSERT INTO member_call_stats (org_id, member_id, calls, completed, busy, no_answer, failed, last_call_at)
+        SELECT org_id, member_id, {COUNTS}, max(initiated_at)
+        FROM ({CALLS}) calls WHERE {OUTCOMES}
+        GROUP BY org_id, member_id
+    """)
+
+
+def downgrade():
+    op.drop_index('ix_member_call_stats_org_id_member_id', table_name='member_call_stats')
+    op.drop_table('member_call_stats')
+    op.drop_index('ix_daily_call_stats_org_id_meeting_id_day', table_name='daily_call_stats')
+    op.drop_index('ix_daily_call_stats_org_id_day', table_name='daily_call_stats')
+    op.drop_table('daily_call_stats')
@@ -0,0 +1,50 @@
+"""send job with status counters
+
+Revision ID: 6a0c2e9b4f17
+Revises: 2c8e4b7f1d05
+Create Date: 2026-10-17 14:22:51.804113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6a0c2e9b4f17'
+down_revision = '2c8e4b7f1d05'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('send_job',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('org_id', sa.Integer(), nullable=False),
+    sa.Column('meeting_id', sa.Integer(), nullable=False),
+    sa.Column('recording_id', sa.Integer(), nullable=False),
+    sa.Column('retry_policy_id', sa.Integer(), nullable=True),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('queued', sa.Integer(), nullable=False),
+    sa.Column('initiated', sa.Integer(), nullable=False),
+    sa.Column('completed', sa.Integer(), nullable=False),
+    sa.Column('failed', sa.Integer(), nullable=False),
+    sa.Column('canceled', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['meeting_id'], ['meeting.id'], ),
+    sa.ForeignKeyConstraint(['org_id'], ['organization.id'], ),
+    sa.ForeignKeyConstraint(['recording_id'], ['recording.id'], ),
+    sa.ForeignKeyConstraint(['retry_policy_id'], ['retry_policy.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_send_job_meeting_id', 'send_job', ['meeting_id', 'id'], unique=False)
+    with op.batch_alter_table('call_log') as batch_op:
+        batch_op.add_column(sa.Column('send_job_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_call_log_send_job_id', 'send_job', ['send_job_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('call_log') as batch_op:
+        batch_op.drop_constraint('fk_call_log_send_job_id', type_='foreignkey')
+        batch_op.drop_column('send_job_id')
+    op.drop_index('ix_send_job_meeting_id', table_name='send_job')
+    op.drop_table('send_job')
@@ -0,0 +1,28 @@
+"""recording transcode owner and heartbeat
+
+Revision ID: 7b4d1e6a9c82
+Revises: 3e9a5c7d1f24
+Create Date: 2026-10-18 14:31:18.640915
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b4d1e6a9c82'
+down_revision = '3e9a5c7d1f24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('recording') as batch_op:
+        batch_op.add_column(sa.Column('owner', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('recording') as batch_op:
+        batch_op.drop_column('heartbeat_at')
+        batch_op.drop_column('owner')
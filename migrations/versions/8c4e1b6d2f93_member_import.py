@@ -0,0 +1,54 @@
+"""background member imports
+
+Revision ID: 8c4e1b6d2f93
+Revises: 5f2d8c41a7e9
+Create Date: 2026-10-17 20:52:37.904126
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4e1b6d2f93'
+down_revision = '5f2d8c41a7e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('member_import',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('org_id', sa.Integer(), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('size_bytes', sa.Integer(), nullable=False),
+    sa.Column('bytes_read', sa.Integer(), nullable=False),
+    sa.Column('rows', sa.Integer(), nullable=False),
+    sa.Column('added', sa.Integer(), nullable=False),
+    sa.Column('skipped', sa.Integer(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['org_id'], ['organization.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_member_import_org_id', 'member_import', ['org_id', 'id'], unique=False)
+    op.create_table('member_import_error',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('import_id', sa.Integer(), nullable=False),
+    sa.Column('line', sa.Integer(), nullable=False),
+    sa.Column('reason', sa.String(length=120), nullable=False),
+    sa.Column('name', sa.String(length=255), nullable=True),
+    sa.Column('phone', sa.String(length=255), nullable=True),
+    sa.ForeignKeyConstraint(['import_id'], ['member_import.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_member_import_error_import_id_line', 'member_import_error', ['import_id', 'line'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_member_import_error_import_id_line', table_name='member_import_error')
+    op.drop_table('member_import_error')
+    op.drop_index('ix_member_import_org_id', table_name='member_import')
+    op.drop_table('member_import')
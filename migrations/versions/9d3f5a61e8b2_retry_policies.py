@@ -0,0 +1,47 @@
+"""retry policies and call attempts
+
+Revision ID: 9d3f5a61e8b2
+Revises: 4b1e7d2a9c30
+Create Date: 2026-10-17 11:40:03.552871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3f5a61e8b2'
+down_revision = '4b1e7d2a9c30'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('retry_policy',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('org_id', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('backoff_seconds', sa.Integer(), nullable=False),
+    sa.Column('backoff_factor', sa.Integer(), nullable=False),
+    sa.Column('retry_on', sa.String(length=100), nullable=False),
+    sa.Column('quiet_start', sa.String(length=5), nullable=True),
+    sa.Column('quiet_end', sa.String(length=5), nullable=True),
+    sa.Column('timezone', sa.String(length=64), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['org_id'], ['organization.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('call_log') as batch_op:
+        batch_op.add_column(sa.Column('retry_policy_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('attempt', sa.Integer(), nullable=False, server_default='1'))
+        batch_op.add_column(sa.Column('scheduled_for', sa.DateTime(), nullable=True))
+        batch_op.create_foreign_key('fk_call_log_retry_policy_id', 'retry_policy', ['retry_policy_id'], ['id'])
+
+
+def downgrade():
+    with op.batch_alter_table('call_log') as batch_op:
+        batch_op.drop_constraint('fk_call_log_retry_policy_id', type_='foreignkey')
+        batch_op.drop_column('scheduled_for')
+        batch_op.drop_column('attempt')
+        batch_op.drop_column('retry_policy_id')
+    op.drop_table('retry_policy')
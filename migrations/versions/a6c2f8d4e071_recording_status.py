@@ -0,0 +1,28 @@
+"""recording transcoding status
+
+Revision ID: a6c2f8d4e071
+Revises: d94a7e3c1b58
+Create Date: 2026-10-17 23:41:05.318274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6c2f8d4e071'
+down_revision = 'd94a7e3c1b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('recording') as batch_op:
+        batch_op.add_column(sa.Column('status', sa.String(length=20), nullable=False, server_default='ready'))
+        batch_op.add_column(sa.Column('error', sa.String(length=500), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('recording') as batch_op:
+        batch_op.drop_column('error')
+        batch_op.drop_column('status')
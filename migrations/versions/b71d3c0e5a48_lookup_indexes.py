@@ -0,0 +1,47 @@
+"""lookup indexes
+
+Revision ID: b71d3c0e5a48
+Revises: 6a0c2e9b4f17
+Create Date: 2026-10-17 16:40:12.518902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b71d3c0e5a48'
+down_revision = '6a0c2e9b4f17'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_user_org_id', 'user', ['org_id'], False),
+    ('ix_meeting_members_member_id', 'meeting_members', ['member_id'], False),
+    ('ix_member_org_id_name', 'member', ['org_id', 'name'], False),
+    ('ix_recording_org_id_created_at', 'recording', ['org_id', 'created_at'], False),
+    ('ix_meeting_org_id_meeting_date', 'meeting', ['org_id', 'meeting_date'], False),
+    ('ix_send_job_org_id', 'send_job', ['org_id', 'id'], False),
+    ('ix_call_log_twilio_call_sid', 'call_log', ['twilio_call_sid'], True),
+    ('ix_call_log_meeting_id_status', 'call_log', ['meeting_id', 'status'], False),
+    ('ix_call_log_meeting_id_member_id', 'call_log', ['meeting_id', 'member_id'], False),
+    ('ix_call_log_org_id_initiated_at', 'call_log', ['org_id', 'initiated_at', 'id'], False),
+    ('ix_call_log_send_job_id_updated_at', 'call_log', ['send_job_id', 'updated_at'], False),
+    ('ix_call_log_status_scheduled_for', 'call_log', ['status', 'scheduled_for'], False),
+    ('ix_dispatch_job_call_log_id', 'dispatch_job', ['call_log_id'], False),
+]
+
+
+def upgrade():
+    # CONCURRENTLY on Postgres so a large call_log stays writable while
+    # webhooks keep arriving; it cannot run inside a transaction.
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _columns, _unique in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
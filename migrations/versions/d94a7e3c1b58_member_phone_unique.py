@@ -0,0 +1,97 @@
+"""unique member phone per org, import modes
+
+Revision ID: d94a7e3c1b58
+Revises: 8c4e1b6d2f93
+Create Date: 2026-10-17 22:14:48.551902
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd94a7e3c1b58'
+down_revision = '8c4e1b6d2f93'
+branch_labels = None
+depends_on = None
+
+CALLS = """
+    SELECT org_id, meeting_id, member_id, initiated_at, status FROM call_log
+    UNION ALL
+    SELECT org_id, meeting_id, member_id, initiated_at, status FROM call_log_archive
+"""
+
+
+def _merge_duplicate_members():
+    """Fold members sharing (org_id, phone) into the oldest one.
+
+    Meeting memberships, call history and call stats move to the kept
+    member, which stays active if any of its duplicates was.
+    """
+    op.execute("""
+        CREATE TABLE member_merge AS
+        SELECT m.id AS dup_id, k.keep_id
+        FROM member m
+        JOIN (SELECT org_id, phone, min(id) AS keep_id FROM member
+              GROUP BY org_id, phone HAVING count(*) > 1) k
+          ON m.org_id = k.org_id AND m.phone = k.phone
+        WHERE m.id <> k.keep_id
+    """)
+    op.execute("""
+        INSERT INTO meeting_members (meeting_id, member_id)
+        SELECT DISTINCT mm.meeting_id, mg.keep_id
+        FROM meeting_members mm JOIN member_merge mg ON mm.member_id = mg.dup_id
+        WHERE NOT EXISTS (SELECT 1 FROM meeting_members x
+                          WHERE x.meeting_id = mm.meeting_id AND x.member_id = mg.keep_id)
+    """)
+    op.execute("DELETE FROM meeting_members WHERE member_id IN (SELECT dup_id FROM member_merge)")
+    for table in ("call_log", "call_log_archive"):
+        op.execute(f"""
+            UPDATE {table}
+            SET member_id = (SELECT keep_id FROM member_merge WHERE dup_id = {table}.member_id)
+            WHERE member_id IN (SELECT dup_id FROM member_merge)
+        """)
+    op.execute("""
+        DELETE FROM member_call_stats
+        WHERE member_id IN (SELECT dup_id FROM member_merge) OR member_id IN (SELECT keep_id FROM member_merge)
+    """)
+    op.execute(f"""
+        INSERT INTO member_call_stats (org_id, member_id, calls, completed, busy, no_answer, failed, last_call_at)
+        SELECT org_id, member_id, count(*),
+            sum(CASE WHEN status = 'completed' THEN 1 ELSE 0 END),
+            sum(CASE WHEN status = 'busy' THEN 1 ELSE 0 END),
+            sum(CASE WHEN status = 'no-answer' THEN 1 ELSE 0 END),
+            sum(CASE WHEN status = 'failed' THEN 1 ELSE 0 END),
+            max(initiated_at)
+        FROM ({CALLS}) calls
+        WHERE status IN ('completed', 'busy', 'no-answer', 'failed') AND initiated_at IS NOT NULL
+          AND member_id IN (SELECT keep_id FROM member_merge)
+        GROUP BY org_id, member_id
+    """)
+    op.execute("""
+        UPDATE member SET active = TRUE
+        WHERE id IN (SELECT mg.keep_id FROM member_merge mg JOIN member d ON d.id = mg.dup_id WHERE d.active)
+    """)
+    op.execute("DELETE FROM member WHERE id IN (SELECT dup_id FROM member_merge)")
+    op.execute("DROP TABLE member_merge")
+
+
+def upgrade():
+    _merge_duplicate_members()
+    with op.batch_alter_table('member') as batch_op:
+        batch_op.add_column(sa.Column('last_import_id', sa.Integer(), nullable=True))
+    op.create_index('ix_member_org_id_phone', 'member', ['org_id', 'phone'], unique=True)
+    with op.batch_alter_table('member_import') as batch_op:
+        batch_op.add_column(sa.Column('mode', sa.String(length=10), nullable=False, server_default='insert'))
+        batch_op.add_column(sa.Column('existing', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('deactivated', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('member_import') as batch_op:
+        batch_op.drop_column('deactivated')
+        batch_op.drop_column('existing')
+        batch_op.drop_column('mode')
+    op.drop_index('ix_member_org_id_phone', table_name='member')
+    with op.batch_alter_table('member') as batch_op:
+        batch_op.drop_column('last_import_id')
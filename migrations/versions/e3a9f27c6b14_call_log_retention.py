@@ -0,0 +1,54 @@
+"""call log archive and rollups
+
+Revision ID: e3a9f27c6b14
+Revises: b71d3c0e5a48
+Create Date: 2026-10-17 18:05:12.417530
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a9f27c6b14'
+down_revision = 'b71d3c0e5a48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('call_log_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('org_id', sa.Integer(), nullable=False),
+    sa.Column('meeting_id', sa.Integer(), nullable=False),
+    sa.Column('recording_id', sa.Integer(), nullable=False),
+    sa.Column('member_id', sa.Integer(), nullable=False),
+    sa.Column('send_job_id', sa.Integer(), nullable=True),
+    sa.Column('attempt', sa.Integer(), nullable=False),
+    sa.Column('twilio_call_sid', sa.String(length=40), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=True),
+    sa.Column('initiated_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_call_log_archive_org_id_initiated_at', 'call_log_archive', ['org_id', 'initiated_at', 'id'], unique=False)
+    op.create_table('call_rollup',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('org_id', sa.Integer(), nullable=False),
+    sa.Column('meeting_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('calls', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_call_rollup_org_id_day', 'call_rollup', ['org_id', 'day'], unique=False)
+    op.create_index('ix_call_rollup_org_id_meeting_id_day_status', 'call_rollup', ['org_id', 'meeting_id', 'day', 'status'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_call_rollup_org_id_meeting_id_day_status', table_name='call_rollup')
+    op.drop_index('ix_call_rollup_org_id_day', table_name='call_rollup')
+    op.drop_table('call_rollup')
+    op.drop_index('ix_call_log_archive_org_id_initiated_at', table_name='call_log_archive')
+    op.drop_table('call_log_archive')
@@ -0,0 +1,30 @@
+"""durable call status callbacks
+
+Revision ID: f1b7d2a9c364
+Revises: a6c2f8d4e071
+Create Date: 2026-10-18 10:12:37.904512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1b7d2a9c364'
+down_revision = 'a6c2f8d4e071'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('call_status_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('sid', sa.String(length=40), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('received_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('call_status_event')
@@ -1,5 +1,5 @@
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Text, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Date, Text, ForeignKey, Table, Index
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -24,12 +24,15 @@ class User(Base):
     role = Column(String(20), nullable=False, default="owner")
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
+    __table_args__ = (Index("ix_user_org_id", "org_id"),)
+
 
 meeting_members = Table(
     "meeting_members",
     Base.metadata,
     Column("meeting_id", Integer, ForeignKey("meeting.id"), primary_key=True),
     Column("member_id", Integer, ForeignKey("member.id"), primary_key=True),
+    Index("ix_meeting_members_member_id", "member_id"),
 )
 
 
@@ -40,7 +43,51 @@ class Member(Base):
     name = Column(String(120), nullable=False)
     phone = Column(String(20), nullable=False)
     active = Column(Boolean, default=True)
+    last_import_id = Column(Integer)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_member_org_id_name", "org_id", "name"),
+        Index("ix_member_org_id_phone", "org_id", "phone", unique=True),
+    )
+
+
+class MemberImport(Base):
+    """A roster CSV being imported in the background by ``member_import``."""
+    __tablename__ = "member_import"
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, ForeignKey("organization.id"), nullable=False)
+    filename = Column(String(255), nullable=False, default="")
+    mode = Column(String(10), nullable=False, default="insert")
+    status = Column(String(20), nullable=False, default="pending")
+    size_bytes = Column(Integer, nullable=False, default=0)
+    bytes_read = Column(Integer, nullable=False, default=0)
+    rows = Column(Integer, nullable=False, default=0)
+    added = Column(Integer, nullable=False, default=0)
+    existing = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    deactivated = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    # The process running the import keeps heartbeat_at fresh; see heartbeats.py.
+    owner = Column(String(64))
+    heartbeat_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    finished_at = Column(DateTime)
+
+    __table_args__ = (Index("ix_member_import_org_id", "org_id", "id"),)
+
+
+class MemberImportError(Base):
+    """One rejected row of a MemberImport."""
+    __tablename__ = "member_import_error"
+    id = Column(Integer, primary_key=True)
+    import_id = Column(Integer, ForeignKey("member_import.id"), nullable=False)
+    line = Column(Integer, nullable=False)
+    reason = Column(String(120), nullable=False)
+    name = Column(String(255))
+    phone = Column(String(255))
+
+    __table_args__ = (Index("ix_member_import_error_import_id_line", "import_id", "line"),)
 
 
 class Recording(Base):
@@ -49,8 +96,16 @@ class Recording(Base):
     org_id = Column(Integer, ForeignKey("organization.id"), nullable=False)
     name = Column(String(120), nullable=False)
     filename = Column(String(255), nullable=False)
+    # processing -> ready | failed; see transcoding.py.
+    status = Column(String(20), nullable=False, default="ready")
+    error = Column(String(500))
+    # The process transcoding it keeps heartbeat_at fresh; see heartbeats.py.
+    owner = Column(String(64))
+    heartbeat_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
+    __table_args__ = (Index("ix_recording_org_id_created_at", "org_id", "created_at"),)
+
 
 class Meeting(Base):
     __tablename__ = "meeting"
@@ -61,9 +116,46 @@ class Meeting(Base):
     notes = Column(Text, default="")
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
 
+    __table_args__ = (Index("ix_meeting_org_id_meeting_date", "org_id", "meeting_date"),)
+
     members = relationship("Member", secondary=meeting_members, backref="meetings", lazy=True)
 
 
+class RetryPolicy(Base):
+    __tablename__ = "retry_policy"
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, ForeignKey("organization.id"), nullable=False)
+    max_attempts = Column(Integer, nullable=False, default=1)
+    backoff_seconds = Column(Integer, nullable=False, default=900)
+    backoff_factor = Column(Integer, nullable=False, default=2)
+    retry_on = Column(String(100), nullable=False, default="busy,no-answer,failed")
+    quiet_start = Column(String(5))
+    quiet_end = Column(String(5))
+    timezone = Column(String(64), nullable=False, default="America/New_York")
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+
+class SendJob(Base):
+    __tablename__ = "send_job"
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, ForeignKey("organization.id"), nullable=False)
+    meeting_id = Column(Integer, ForeignKey("meeting.id"), nullable=False)
+    recording_id = Column(Integer, ForeignKey("recording.id"), nullable=False)
+    retry_policy_id = Column(Integer, ForeignKey("retry_policy.id"))
+    total = Column(Integer, nullable=False, default=0)
+    queued = Column(Integer, nullable=False, default=0)
+    initiated = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    canceled = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_send_job_meeting_id", "meeting_id", "id"),
+        Index("ix_send_job_org_id", "org_id", "id"),
+    )
+
+
 class CallLog(Base):
     __tablename__ = "call_log"
     id = Column(Integer, primary_key=True)
@@ -71,8 +163,12 @@ class CallLog(Base):
     meeting_id = Column(Integer, ForeignKey("meeting.id"), nullable=False)
     recording_id = Column(Integer, ForeignKey("recording.id"), nullable=False)
     member_id = Column(Integer, ForeignKey("member.id"), nullable=False)
+    send_job_id = Column(Integer, ForeignKey("send_job.id"))
+    retry_policy_id = Column(Integer, ForeignKey("retry_policy.id"))
+    attempt = Column(Integer, nullable=False, default=1)
     twilio_call_sid = Column(String(40))
     status = Column(String(20), default="queued")
+    scheduled_for = Column(DateTime)
     initiated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc),
                         onupdate=lambda: datetime.now(timezone.utc))
@@ -80,3 +176,128 @@ class CallLog(Base):
     meeting = relationship("Meeting", backref="call_logs")
     recording = relationship("Recording")
     member = relationship("Member")
+    retry_policy = relationship("RetryPolicy")
+
+    __table_args__ = (
+        Index("ix_call_log_twilio_call_sid", "twilio_call_sid", unique=True),
+        Index("ix_call_log_meeting_id_status", "meeting_id", "status"),
+        Index("ix_call_log_meeting_id_member_id", "meeting_id", "member_id"),
+        Index("ix_call_log_org_id_initiated_at", "org_id", "initiated_at", "id"),
+        Index("ix_call_log_send_job_id_updated_at", "send_job_id", "updated_at"),
+        Index("ix_call_log_status_scheduled_for", "status", "scheduled_for"),
+    )
+
+
+class CallLogArchive(Base):
+    """Finished call_log rows moved out of the hot table by ``retention``.
+
+    Same ids as call_log; references are plain integers so history outlives
+    deleted members and meetings.
+    """
+    __tablename__ = "call_log_archive"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    org_id = Column(Integer, nullable=False)
+    meeting_id = Column(Integer, nullable=False)
+    recording_id = Column(Integer, nullable=False)
+    member_id = Column(Integer, nullable=False)
+    send_job_id = Column(Integer)
+    attempt = Column(Integer, nullable=False, default=1)
+    twilio_call_sid = Column(String(40))
+    status = Column(String(20))
+    initiated_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    meeting = relationship("Meeting", primaryjoin="foreign(CallLogArchive.meeting_id) == Meeting.id", viewonly=True)
+    member = relationship("Member", primaryjoin="foreign(CallLogArchive.member_id) == Member.id", viewonly=True)
+
+    __table_args__ = (
+        Index("ix_call_log_archive_org_id_initiated_at", "org_id", "initiated_at", "id"),
+    )
+
+
+class CallRollup(Base):
+    """Calls per meeting, day and final status for rows that left call_log."""
+    __tablename__ = "call_rollup"
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, nullable=False)
+    meeting_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+    status = Column(String(20), nullable=False)
+    calls = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_call_rollup_org_id_meeting_id_day_status", "org_id", "meeting_id", "day", "status", unique=True),
+        Index("ix_call_rollup_org_id_day", "org_id", "day"),
+    )
+
+
+class DailyCallStats(Base):
+    """Call outcomes per meeting and day, kept current by ``analytics.record``."""
+    __tablename__ = "daily_call_stats"
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, nullable=False)
+    meeting_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+    calls = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    busy = Column(Integer, nullable=False, default=0)
+    no_answer = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_daily_call_stats_org_id_meeting_id_day", "org_id", "meeting_id", "day", unique=True),
+        Index("ix_daily_call_stats_org_id_day", "org_id", "day"),
+    )
+
+
+class MemberCallStats(Base):
+    """Call outcomes per member, kept current by ``analytics.record``."""
+    __tablename__ = "member_call_stats"
+    id = Column(Integer, primary_key=True)
+    org_id = Column(Integer, nullable=False)
+    member_id = Column(Integer, nullable=False)
+    calls = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    busy = Column(Integer, nullable=False, default=0)
+    no_answer = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    last_call_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_member_call_stats_org_id_member_id", "org_id", "member_id", unique=True),
+    )
+
+
+class DispatchJob(Base):
+    __tablename__ = "dispatch_job"
+    id = Column(Integer, primary_key=True)
+    call_log_id = Column(Integer, ForeignKey("call_log.id"), nullable=False)
+    meeting_id = Column(Integer)
+    phone = Column(String(20), nullable=False)
+    recording_id = Column(Integer, nullable=False)
+    domain = Column(String(255), nullable=False)
+    scheme = Column(String(10), nullable=False)
+    from_number = Column(String(20), nullable=False, default="")
+    status = Column(String(20), nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    run_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    lease_owner = Column(String(64))
+    lease_expires_at = Column(DateTime)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_dispatch_job_status_run_at", "status", "run_at"),
+        Index("ix_dispatch_job_lease_owner", "lease_owner"),
+        Index("ix_dispatch_job_call_log_id", "call_log_id"),
+    )
+
+
+class CallStatusEvent(Base):
+    """A Twilio status callback, stored before the webhook answers and
+    deleted once the status writer has applied it to its CallLog."""
+    __tablename__ = "call_status_event"
+    id = Column(Integer, primary_key=True)
+    sid = Column(String(40), nullable=False)
+    status = Column(String(20), nullable=False)
+    received_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
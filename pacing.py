@@ -0,0 +1,116 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Twilio enforces calls-per-second per account, and every uvicorn worker runs
+# its own dispatcher, so each process gets an equal share of the account CPS.
+TWILIO_CPS = float(os.environ.get("TWILIO_CPS", "1"))
+WEB_CONCURRENCY = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+DISPATCH_LATENCY_TARGET = float(os.environ.get("DISPATCH_LATENCY_TARGET", "2.0"))
+THROTTLE_BACKOFF_SECONDS = float(os.environ.get("THROTTLE_BACKOFF_SECONDS", "5"))
+
+
+class TokenBucket:
+    """Thread-safe token bucket; ``acquire`` blocks until a token is available."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take(self):
+        """Take a token and return 0, or return how long until one is due."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self._take()
+            if not wait:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """Drain the bucket so no token is handed out for ``seconds``."""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, -seconds * self.rate)
+
+
+class AIMDLimiter:
+    """Additive-increase / multiplicative-decrease concurrency limit.
+
+    The limit grows by roughly one slot per window of successful calls whose
+    latency stays under ``latency_target`` and is cut by ``backoff`` on a
+    throttle response or a slow call. Cuts are rate limited by ``cooldown``
+    so one burst of errors from a single window only counts once.
+    """
+
+    def __init__(self, initial, minimum=1, maximum=None, latency_target=DISPATCH_LATENCY_TARGET,
+                 backoff=0.5, cooldown=1.0):
+        self.minimum = minimum
+        self.maximum = maximum or initial
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.cooldown = cooldown
+        self._limit = float(min(max(initial, minimum), self.maximum))
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def on_success(self, latency):
+        if latency > self.latency_target:
+            self._decrease("latency %.2fs over target" % latency)
+            return
+        with self._lock:
+            self._limit = min(self.maximum, self._limit + 1 / self._limit)
+
+    def on_throttle(self):
+        self._decrease("throttled")
+
+    def _decrease(self, reason):
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_decrease < self.cooldown:
+                return
+            self._last_decrease = now
+            self._limit = max(self.minimum, self._limit * self.backoff)
+            logger.info("Dispatch concurrency reduced to %d (%s)", self.limit, reason)
+
+
+class Throttled(Exception):
+    """Twilio rejected a request for exceeding the account's rate limits."""
+
+
+def is_throttle_error(exc):
+    return getattr(exc, "status", None) == 429 or getattr(exc, "code", None) == 20429
+
+
+call_pacer = TokenBucket(TWILIO_CPS / WEB_CONCURRENCY)
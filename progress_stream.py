@@ -0,0 +1,173 @@
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime, timezone
+from database import SessionLocal
+from models import CallLog, SendJob
+import send_jobs
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_POLL_INTERVAL = float(os.environ.get("PROGRESS_POLL_INTERVAL", "2"))
+PROGRESS_STREAM_MAX_SECONDS = float(os.environ.get("PROGRESS_STREAM_MAX_SECONDS", "300"))
+PROGRESS_HEARTBEAT_SECONDS = 15
+VIEWER_QUEUE_SIZE = 1000
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def snapshot(send_id):
+    """Counters plus every call of the send, in the shape of /api/send-progress."""
+    db = SessionLocal()
+    try:
+        job = db.get(SendJob, send_id)
+        if job is None:
+            return None
+        rows, _newest = send_jobs.rows(db, CallLog.send_job_id == send_id)
+        return {**send_jobs.summary(job), "rows": rows}
+    finally:
+        db.close()
+
+
+def changes(send_id, since):
+    """Counters, changed calls and the next cursor for a send (see ``send_jobs.rows``)."""
+    db = SessionLocal()
+    try:
+        job = db.get(SendJob, send_id)
+        if job is None:
+            return None, [], since
+        rows, newest = send_jobs.rows(db, CallLog.send_job_id == send_id, since=since)
+        return send_jobs.summary(job), rows, newest
+    finally:
+        db.close()
+
+
+def event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+
+class _Topic:
+    def __init__(self, send_id):
+        self.send_id = send_id
+        self.viewers = set()
+        self.wake = asyncio.Event()
+        self.statuses = {}
+        self.counts = None
+        self.cursor = _utcnow()
+        self.task = None
+
+
+class ProgressHub:
+    """Fans one DB poll per send out to every viewer in this process.
+
+    Each watched send has a single task that re-reads its counters and the
+    calls changed since the last read, every ``interval`` seconds or as
+    soon as ``notify`` says this process wrote to it. Viewers receive the
+    resulting SSE events through their own queue.
+    """
+
+    def __init__(self, interval=PROGRESS_POLL_INTERVAL):
+        self.interval = interval
+        self._topics = {}
+        self._loop = None
+
+    def viewers(self, send_id):
+        topic = self._topics.get(send_id)
+        return len(topic.viewers) if topic else 0
+
+    def subscribe(self, send_id):
+        self._loop = asyncio.get_running_loop()
+        topic = self._topics.get(send_id)
+        if topic is None:
+            topic = self._topics[send_id] = _Topic(send_id)
+            topic.task = asyncio.create_task(self._follow(topic))
+        queue = asyncio.Queue(VIEWER_QUEUE_SIZE)
+        topic.viewers.add(queue)
+        return queue
+
+    def unsubscribe(self, send_id, queue):
+        topic = self._topics.get(send_id)
+        if topic is None:
+            return
+        topic.viewers.discard(queue)
+        if not topic.viewers:
+            del self._topics[send_id]
+            topic.task.cancel()
+
+    def notify(self, send_ids):
+        """Thread-safe: the given sends changed, poll them now."""
+        loop = self._loop
+        ids = {i for i in send_ids if i}
+        if loop is None or not ids or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(self._wake, ids)
+        except RuntimeError:
+            pass
+
+    def _wake(self, send_ids):
+        for send_id in send_ids:
+            topic = self._topics.get(send_id)
+            if topic is not None:
+                topic.wake.set()
+
+    async def _follow(self, topic):
+        while topic.viewers:
+            try:
+                await asyncio.wait_for(topic.wake.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            topic.wake.clear()
+            try:
+                counts, rows, topic.cursor = await asyncio.to_thread(changes, topic.send_id, topic.cursor)
+            except Exception:
+                logger.exception("Polling progress of send %d failed", topic.send_id)
+                continue
+            for row in rows:
+                if topic.statuses.get(row["id"]) != row["status"]:
+                    topic.statuses[row["id"]] = row["status"]
+                    self._publish(topic, event("call", row))
+            if counts is not None and counts != topic.counts:
+                topic.counts = counts
+                self._publish(topic, event("counts", counts))
+
+    def _publish(self, topic, message):
+        for queue in topic.viewers:
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Too far behind: end its stream, EventSource reconnects
+                # and starts over from a fresh snapshot.
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+
+hub = ProgressHub()
+
+
+async def stream(request, send_id):
+    """SSE body for one viewer: a snapshot, then call and counts events.
+
+    Ends after PROGRESS_STREAM_MAX_SECONDS; EventSource reconnects by itself.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + PROGRESS_STREAM_MAX_SECONDS
+    queue = hub.subscribe(send_id)
+    try:
+        yield event("snapshot", await asyncio.to_thread(snapshot, send_id))
+        while loop.time() < deadline:
+            try:
+                message = await asyncio.wait_for(queue.get(), min(PROGRESS_HEARTBEAT_SECONDS, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    return
+                yield ": ping\n\n"
+                continue
+            if message is None:
+                return
+            yield message
+    finally:
+        hub.unsubscribe(send_id, queue)
@@ -0,0 +1,51 @@
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+
+_current = ContextVar("query_stats", default=None)
+
+
+class QueryStats:
+    __slots__ = ("count", "seconds")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    @property
+    def ms(self):
+        return round(self.seconds * 1000, 1)
+
+
+def start():
+    """Begin counting queries for the current context (a request)."""
+    stats = QueryStats()
+    return stats, _current.set(stats)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        context._query_started = time.perf_counter()
+
+
+def _after(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    started = getattr(context, "_query_started", None)
+    if stats is not None and started is not None:
+        stats.count += 1
+        stats.seconds += time.perf_counter() - started
+
+
+def install(engine):
+    """Attach the counters to a (sync) Engine; async engines pass ``.sync_engine``."""
+    if not event.contains(engine, "before_cursor_execute", _before):
+        event.listen(engine, "before_cursor_execute", _before)
+        event.listen(engine, "after_cursor_execute", _after)
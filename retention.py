@@ -0,0 +1,203 @@
+import os
+import csv
+import gzip
+import uuid
+import shutil
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, delete, insert, func, exists
+from database import SessionLocal, upsert_insert
+from models import CallLog, CallLogArchive, CallRollup, DispatchJob
+import retries
+
+logger = logging.getLogger(__name__)
+
+# Finished calls older than this leave call_log: their counts go into
+# call_rollup and the raw rows into call_log_archive (or, with
+# CALL_LOG_ARCHIVE_DIR set, into gzipped CSV files there).
+CALL_LOG_RETENTION_DAYS = int(os.environ.get("CALL_LOG_RETENTION_DAYS", "90"))
+CALL_LOG_ARCHIVE_DIR = os.environ.get("CALL_LOG_ARCHIVE_DIR", "")
+RETENTION_BATCH_SIZE = int(os.environ.get("RETENTION_BATCH_SIZE", "5000"))
+RETENTION_INTERVAL_SECONDS = int(os.environ.get("RETENTION_INTERVAL_SECONDS", "86400"))
+
+FINAL_STATUSES = ("completed", "busy", "no-answer", "failed", "canceled")
+UPSERT_CHUNK = 500
+ARCHIVE_COLUMNS = ("id", "org_id", "meeting_id", "recording_id", "member_id", "send_job_id",
+                   "attempt", "twilio_call_sid", "status", "initiated_at", "updated_at")
+
+# A run over a large call_log can take minutes; it gets its own thread so the
+# retry timer it is scheduled on keeps firing due retries meanwhile.
+_pool = ThreadPoolExecutor(1, thread_name_prefix="retention")
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def cutoff(now=None):
+    return (now or _utcnow()) - timedelta(days=CALL_LOG_RETENTION_DAYS)
+
+
+def _rollup(db, rows):
+    counts = {}
+    for row in rows:
+        key = (row.org_id, row.meeting_id, row.initiated_at.date(), row.status)
+        counts[key] = counts.get(key, 0) + 1
+    values = [{"org_id": org_id, "meeting_id": meeting_id, "day": day, "status": status, "calls": n}
+              for (org_id, meeting_id, day, status), n in sorted(counts.items())]
+    for i in range(0, len(values), UPSERT_CHUNK):
+        stmt = upsert_insert(db)(CallRollup).values(values[i:i + UPSERT_CHUNK])
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["org_id", "meeting_id", "day", "status"],
+            set_={"calls": CallRollup.calls + stmt.excluded.calls},
+        ))
+
+
+def _stage(rows, directory):
+    """Write the batch's rows, one gzip member per month, next to the files
+    they belong in. Returns ``[(path, staged_path), ...]`` for ``_publish``."""
+    os.makedirs(directory, exist_ok=True)
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(row.initiated_at.strftime("%Y-%m"), []).append(row)
+    staged = []
+    try:
+        for month, month_rows in by_month.items():
+            path = os.path.join(directory, f"call_log-{month}.csv.gz")
+            part = f"{path}.{uuid.uuid4().hex[:8]}.part"
+            staged.append((path, part))
+            with gzip.open(part, "wt", newline="") as f:
+                writer = csv.writer(f)
+                for row in month_rows:
+                    writer.writerow([getattr(row, c) for c in ARCHIVE_COLUMNS])
+    except Exception:
+        _discard(staged)
+        raise
+    return staged
+
+
+def _publish(staged):
+    """Append staged members once their batch is committed. Concatenated
+    gzip members read as one stream."""
+    for path, part in staged:
+        with open(path, "ab") as out:
+            if not out.tell():
+                out.write(gzip.compress(",".join(ARCHIVE_COLUMNS).encode() + b"\r\n"))
+            with open(part, "rb") as f:
+                shutil.copyfileobj(f, out)
+        os.remove(part)
+
+
+def _discard(staged):
+    for _path, part in staged:
+        if os.path.exists(part):
+            os.remove(part)
+
+
+def archive_batch(db, before, batch_size=None, archive_dir=None):
+    """Roll up and move one batch of finished calls initiated before ``before``.
+
+    Calls still referenced by a dispatch job are left alone. The rows are
+    claimed by deleting them, so concurrent runs (every web process
+    schedules one) never move the same call twice. Returns ``(moved,
+    staged)``: with ``archive_dir`` the rows are only staged, and the caller
+    commits, then passes ``staged`` to ``_publish``.
+    """
+    archive_dir = CALL_LOG_ARCHIVE_DIR if archive_dir is None else archive_dir
+    oldest = (
+        select(CallLog.id)
+        .where(
+            CallLog.initiated_at < before,
+            CallLog.status.in_(FINAL_STATUSES),
+            ~exists().where(DispatchJob.call_log_id == CallLog.id),
+        )
+        .order_by(CallLog.initiated_at, CallLog.id)
+        .limit(batch_size or RETENTION_BATCH_SIZE)
+    )
+    if db.get_bind().dialect.name == "postgresql":
+        oldest = oldest.with_for_update(skip_locked=True)
+    rows = db.execute(
+        delete(CallLog)
+        .where(CallLog.id.in_(oldest))
+        .returning(*(getattr(CallLog, c) for c in ARCHIVE_COLUMNS))
+        .execution_options(synchronize_session=False)
+    ).all()
+    if not rows:
+        return 0, []
+    _rollup(db, rows)
+    if archive_dir:
+        return len(rows), _stage(rows, archive_dir)
+    db.execute(insert(CallLogArchive), [dict(row._mapping) for row in rows])
+    return len(rows), []
+
+
+def run(now=None, batch_size=None, archive_dir=None):
+    """Move every finished call older than the retention window, batch by batch."""
+    before, moved = cutoff(now), 0
+    while True:
+        db = SessionLocal()
+        staged = []
+        try:
+            n, staged = archive_batch(db, before, batch_size, archive_dir)
+            db.commit()
+        except Exception:
+            db.rollback()
+            _discard(staged)
+            logger.exception("Call log retention failed after %d rows", moved)
+            raise
+        finally:
+            db.close()
+        try:
+            _publish(staged)
+        except Exception:
+            # Committed already: the rows are only in the .part files now.
+            logger.exception("Could not append archived calls; they are kept in %s",
+                             ", ".join(part for _path, part in staged))
+            raise
+        moved += n
+        if not n:
+            break
+    if moved:
+        logger.info("Archived %d call log rows initiated before %s", moved, before)
+    return moved
+
+
+def _run_and_reschedule():
+    try:
+        run()
+    except Exception:
+        pass  # logged by run(); try again next interval
+    schedule()
+
+
+def _scheduled_run():
+    _pool.submit(_run_and_reschedule)
+
+
+def schedule(delay=None):
+    """Run retention every RETENTION_INTERVAL_SECONDS after the last run ends.
+
+    The retry scheduler's timer only hands the run to the retention thread.
+    """
+    if RETENTION_INTERVAL_SECONDS <= 0:
+        return
+    delay = RETENTION_INTERVAL_SECONDS if delay is None else delay
+    retries.scheduler.schedule(datetime.now(timezone.utc) + timedelta(seconds=delay), _scheduled_run)
+
+
+def counts(db, org_id, meeting_id=None, start=None, end=None):
+    """Status counts from call_rollup, filtered like the hot-table queries."""
+    q = select(CallRollup.status, func.sum(CallRollup.calls)).where(CallRollup.org_id == org_id)
+    if meeting_id:
+        q = q.where(CallRollup.meeting_id == meeting_id)
+    if start:
+        q = q.where(CallRollup.day >= start)
+    if end:
+        q = q.where(CallRollup.day <= end)
+    return {status: int(n) for status, n in db.execute(q.group_by(CallRollup.status))}
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    print(f"archived {run()} rows")
@@ -0,0 +1,221 @@
+import os
+import heapq
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from sqlalchemy import select, update
+from database import SessionLocal
+from models import CallLog, Member, RetryPolicy
+import dispatch
+import send_jobs
+
+logger = logging.getLogger(__name__)
+
+RETRY_SWEEP_SECONDS = int(os.environ.get("RETRY_SWEEP_SECONDS", "300"))
+
+
+class TimerScheduler:
+    """Single-thread timer queue backed by a binary heap.
+
+    A pending timer is one heap entry, so thousands of scheduled retries cost
+    a few hundred bytes each and one sleeping thread in total.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+
+    def __len__(self):
+        with self._cond:
+            return len(self._heap)
+
+    def schedule(self, when, fn, *args):
+        """Run ``fn(*args)`` at ``when`` (aware datetime) on the timer thread."""
+        self.start()
+        delay = (when - datetime.now(timezone.utc)).total_seconds()
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic() + max(0.0, delay), next(self._seq), fn, args))
+            self._cond.notify()
+
+    def start(self):
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="retry-timer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join(5)
+        with self._cond:
+            self._heap.clear()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._stopping:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    wait = self._heap[0][0] - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if self._stopping:
+                    return
+                _when, _seq, fn, args = heapq.heappop(self._heap)
+            try:
+                fn(*args)
+            except Exception:
+                logger.exception("Timer callback %s failed", getattr(fn, "__name__", fn))
+
+
+scheduler = TimerScheduler()
+
+
+def _parse_hhmm(value):
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def next_retry_time(policy, attempt, now=None):
+    """When attempt ``attempt + 1`` may run, or None if the policy is exhausted."""
+    if attempt >= policy.max_attempts:
+        return None
+    now = now or datetime.now(timezone.utc)
+    delay = policy.backoff_seconds * policy.backoff_factor ** (attempt - 1)
+    when = now + timedelta(seconds=delay)
+    if policy.quiet_start and policy.quiet_end:
+        tz = ZoneInfo(policy.timezone)
+        local = when.astimezone(tz)
+        minute = local.hour * 60 + local.minute
+        start, end = _parse_hhmm(policy.quiet_start), _parse_hhmm(policy.quiet_end)
+        if start > end:
+            quiet = minute >= start or minute < end
+        else:
+            quiet = start <= minute < end
+        if quiet:
+            resume = local.replace(hour=end // 60, minute=end % 60, second=0, microsecond=0)
+            if resume <= local:
+                resume += timedelta(days=1)
+            when = resume.astimezone(timezone.utc)
+    return when
+
+
+def add_retry(db, log):
+    """Add the next attempt for ``log`` to the session if its policy wants one.
+
+    The new attempt is a "scheduled" CallLog row so it survives a restart
+    (``sweep`` re-arms it); the in-memory timer only decides when it is
+    handed to the dispatch queue. The caller commits, then ``arm``s it.
+    """
+    if not log.retry_policy_id:
+        return None
+    policy = db.get(RetryPolicy, log.retry_policy_id)
+    if policy is None or log.status not in policy.retry_on.split(","):
+        return None
+    when = next_retry_time(policy, log.attempt)
+    if when is None:
+        return None
+    already = db.scalar(
+        select(CallLog.id).where(
+            CallLog.meeting_id == log.meeting_id,
+            CallLog.member_id == log.member_id,
+            CallLog.retry_policy_id == log.retry_policy_id,
+            CallLog.attempt == log.attempt + 1,
+        )
+    )
+    if already:
+        return None
+    retry = CallLog(
+        org_id=log.org_id,
+        meeting_id=log.meeting_id,
+        recording_id=log.recording_id,
+        member_id=log.member_id,
+        send_job_id=log.send_job_id,
+        retry_policy_id=log.retry_policy_id,
+        attempt=log.attempt + 1,
+        status="scheduled",
+        scheduled_for=when,
+    )
+    db.add(retry)
+    send_jobs.add(db, log.send_job_id, "scheduled")
+    db.flush()
+    return retry
+
+
+def arm(retry):
+    """Start the timer for a committed retry from ``add_retry``."""
+    when = retry.scheduled_for
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    scheduler.schedule(when, fire_retry, retry.id)
+    logger.info("Attempt %d (call %d) scheduled at %s", retry.attempt, retry.id, when.isoformat())
+
+
+def fire_retry(log_id):
+    from caller import _dispatch_settings
+
+    db = SessionLocal()
+    try:
+        # Only the process that flips the row out of "scheduled" dispatches it.
+        claimed = db.execute(
+            update(CallLog)
+            .where(CallLog.id == log_id, CallLog.status == "scheduled")
+            .values(status="queued", updated_at=datetime.now(timezone.utc))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not claimed:
+            db.rollback()
+            return
+        log = db.get(CallLog, log_id)
+        member = db.get(Member, log.member_id)
+        if member is None or not member.active:
+            send_jobs.move(db, log.send_job_id, "queued", "canceled")
+            log.status = "canceled"
+            db.commit()
+            return
+        domain, scheme, from_number = _dispatch_settings()
+        dispatch.enqueue(db, log.id, member.phone, log.recording_id, domain, scheme, from_number,
+                         meeting_id=log.meeting_id)
+        db.commit()
+        dispatch.worker.wake()
+    finally:
+        db.close()
+
+
+def sweep():
+    """Arm timers for scheduled retries coming due within the next sweep.
+
+    Picks up retries scheduled before a restart or by another process that
+    has since gone away. Arming a row twice is harmless: ``fire_retry`` only
+    dispatches it once.
+    """
+    horizon = datetime.now(timezone.utc) + timedelta(seconds=RETRY_SWEEP_SECONDS)
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(CallLog.id, CallLog.scheduled_for)
+            .where(CallLog.status == "scheduled", CallLog.scheduled_for <= horizon)
+        )
+        count = 0
+        for log_id, when in rows:
+            scheduler.schedule(when.replace(tzinfo=timezone.utc), fire_retry, log_id)
+            count += 1
+        if count:
+            logger.info("Armed %d scheduled retries", count)
+    finally:
+        db.close()
+    scheduler.schedule(horizon, sweep)
@@ -0,0 +1,102 @@
+from collections import Counter
+from datetime import timedelta
+from sqlalchemy import select, update
+from models import CallLog, Member, SendJob
+
+# CallLog status -> SendJob counter column.
+BUCKETS = {
+    "scheduled": "queued",
+    "queued": "queued",
+    "initiated": "initiated",
+    "ringing": "initiated",
+    "in-progress": "initiated",
+    "completed": "completed",
+    "failed": "failed",
+    "busy": "failed",
+    "no-answer": "failed",
+    "canceled": "canceled",
+}
+COUNTERS = ("queued", "initiated", "completed", "failed", "canceled")
+# Rows committed just before a cursor can carry an updated_at just behind
+# it; readers re-read this much and de-duplicate by id.
+CURSOR_OVERLAP = timedelta(seconds=5)
+
+
+def bucket(status):
+    return BUCKETS.get(status, "initiated")
+
+
+def add(db, send_job_id, status, n=1):
+    """Count ``n`` new call logs created in ``status``. Caller commits."""
+    if not send_job_id or not n:
+        return
+    column = bucket(status)
+    db.execute(
+        update(SendJob)
+        .where(SendJob.id == send_job_id)
+        .values({"total": SendJob.total + n, column: getattr(SendJob, column) + n})
+        .execution_options(synchronize_session=False)
+    )
+
+
+def move(db, send_job_id, old_status, new_status, n=1):
+    """Move ``n`` logs between counters in the caller's transaction.
+
+    A single ``SET a = a - n, b = b + n`` so concurrent webhooks and dispatch
+    threads never lose an update.
+    """
+    if not send_job_id or not n:
+        return
+    old, new = bucket(old_status), bucket(new_status)
+    if old == new:
+        return
+    db.execute(
+        update(SendJob)
+        .where(SendJob.id == send_job_id)
+        .values({old: getattr(SendJob, old) - n, new: getattr(SendJob, new) + n})
+        .execution_options(synchronize_session=False)
+    )
+
+
+def move_many(db, send_job_ids, old_status, new_status):
+    """``move`` for a bulk UPDATE, given the send_job_id of every changed row."""
+    for send_job_id, n in Counter(send_job_ids).items():
+        move(db, send_job_id, old_status, new_status, n)
+
+
+def summary(job):
+    counts = {c: getattr(job, c) for c in COUNTERS}
+    return {
+        "send_id": job.id,
+        "meeting_id": job.meeting_id,
+        "recording_id": job.recording_id,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "total": job.total,
+        "completed": job.completed,
+        "failed": job.failed + job.canceled,
+        "queued": job.queued + job.initiated,
+        "counts": counts,
+    }
+
+
+def rows(db, *criteria, since=None):
+    """Progress rows for calls matching ``criteria`` in one join.
+
+    Returns ``(rows, newest)`` where ``newest`` is the latest updated_at
+    seen; with ``since`` only calls changed from ``since - CURSOR_OVERLAP``
+    on are returned.
+    """
+    q = (
+        select(CallLog.id, CallLog.status, CallLog.updated_at, Member.name, Member.phone)
+        .join(Member, Member.id == CallLog.member_id)
+        .where(*criteria)
+        .order_by(CallLog.id)
+    )
+    if since is not None:
+        q = q.where(CallLog.updated_at >= since - CURSOR_OVERLAP)
+    result, newest = [], since
+    for log_id, status, updated_at, name, phone in db.execute(q):
+        result.append({"id": log_id, "member": name, "phone": phone, "status": status})
+        if updated_at is not None and (newest is None or updated_at > newest):
+            newest = updated_at
+    return result, newest
@@ -99,10 +99,10 @@ btnSave.addEventListener('click', async () => {
   fd.append('name', name);
   fd.append('audio', blob, 'recording.webm');
   btnSave.disabled = true;
-  status.textContent = 'Uploading & converting...';
+  status.textContent = 'Uploading...';
   const res = await fetch('/api/recordings', { method: 'POST', body: fd });
   if (res.ok) {
-    status.textContent = 'Saved!';
+    status.textContent = 'Saved! Converting...';
     location.reload();
   } else {
     const err = await res.json();
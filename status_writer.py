@@ -0,0 +1,360 @@
+import os
+import asyncio
+import logging
+import threading
+import weakref
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, insert, delete, func
+from database import SessionLocal
+from models import CallLog, CallStatusEvent, DispatchJob
+import analytics
+import cancellation
+import progress_stream
+import retries
+import send_jobs
+
+logger = logging.getLogger(__name__)
+
+STATUS_FLUSH_INTERVAL = float(os.environ.get("STATUS_FLUSH_INTERVAL", "0.5"))
+STATUS_FLUSH_BATCH_SIZE = int(os.environ.get("STATUS_FLUSH_BATCH_SIZE", "5000"))
+# How long a callback for an unknown SID is kept; it can arrive before the
+# placement that returned the SID is committed.
+STATUS_ORPHAN_SECONDS = float(os.environ.get("STATUS_ORPHAN_SECONDS", "120"))
+
+# Calls only move forward through these; a lower or equal rank is stale.
+RANK = {
+    "scheduled": 0, "queued": 0,
+    "initiated": 1, "ringing": 2, "in-progress": 3,
+    "completed": 4, "busy": 4, "no-answer": 4, "failed": 4, "canceled": 4,
+}
+
+
+def rank(status):
+    return RANK.get(status, 3)
+
+
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class _Update:
+    __slots__ = ("status", "sid", "received_at")
+
+    def __init__(self, status, sid=None, received_at=None):
+        self.status = status
+        self.sid = sid
+        self.received_at = received_at or _utcnow()
+
+    def merge(self, other):
+        """Fold a later update into this one."""
+        if rank(other.status) > rank(self.status):
+            self.status = other.status
+        self.sid = self.sid or other.sid
+        self.received_at = min(self.received_at, other.received_at)
+
+
+def _merge_into(buffer, key, update):
+    current = buffer.get(key)
+    if current is None:
+        buffer[key] = update
+        return False
+    current.merge(update)
+    return True
+
+
+class _CommitGroup:
+    """Webhook callbacks on one event loop waiting to share a commit."""
+
+    def __init__(self):
+        self.queued = []
+        self.busy = False
+
+
+class StatusWriter:
+    """Write-behind writer for CallLog status changes.
+
+    Placement results are buffered in memory along with their dispatch job.
+    Twilio callbacks are appended to ``call_status_event`` before the webhook
+    answers. Every ``interval`` seconds both are collapsed per call and
+    applied in one transaction, which also deletes the placed calls'
+    dispatch jobs, queues retries and claims the callbacks by deleting them.
+    A failed flush puts the placements back and leaves the callbacks for the
+    next flush (of this or any other process).
+
+    Until its placement is written a job stays leased: ``held_leases`` are
+    renewed by the dispatch worker and ``placed`` keeps this process from
+    dialing it again. Placements still buffered when the process dies are
+    lost, and their jobs are redialed once the lease expires.
+    """
+
+    def __init__(self, interval=STATUS_FLUSH_INTERVAL, orphan_seconds=STATUS_ORPHAN_SECONDS,
+                 batch_size=STATUS_FLUSH_BATCH_SIZE):
+        self.interval = interval
+        self.orphan_seconds = orphan_seconds
+        self.batch_size = batch_size
+        self.stats = Counter()
+        self._placements = {}
+        self._jobs = {}
+        self._groups = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def pending(self):
+        """Placements buffered plus callbacks stored, not applied yet."""
+        db = SessionLocal()
+        try:
+            stored = db.scalar(select(func.count()).select_from(CallStatusEvent))
+        finally:
+            db.close()
+        with self._lock:
+            return stored + len(self._placements)
+
+    def record_placement(self, log_id, sid, job=None):
+        """``calls.create`` returned ``sid`` for the log, or failed if it is None.
+
+        ``job`` is the dispatch job that placed the call; it is deleted when
+        the placement is written, so the caller must not complete it.
+        """
+        with self._lock:
+            if _merge_into(self._placements, log_id, _Update("initiated" if sid else "failed", sid)):
+                self.stats["coalesced"] += 1
+            if job is not None:
+                self._jobs[log_id] = (job.id, job.lease_owner)
+        self.start()
+
+    def placed(self, log_id):
+        """Whether a result for the log is buffered but not written yet."""
+        with self._lock:
+            return log_id in self._placements
+
+    def held_leases(self):
+        """Lease tokens of dispatch jobs waiting for their placement to be written."""
+        with self._lock:
+            return {lease_owner for _job_id, lease_owner in self._jobs.values()}
+
+    def clear(self):
+        with self._lock:
+            self._placements.clear()
+            self._jobs.clear()
+
+    def record_callback(self, sid, status):
+        db = SessionLocal()
+        try:
+            db.execute(insert(CallStatusEvent).values(sid=sid, status=status, received_at=_utcnow()))
+            db.commit()
+        finally:
+            db.close()
+        self.start()
+
+    async def record_callback_async(self, db, sid, status):
+        """``record_callback`` on the caller's AsyncSession, committed before returning.
+
+        Concurrent webhooks share a commit: while one request's INSERT is in
+        flight the others queue, and the first of them writes the whole
+        queue in one transaction on its own session.
+        """
+        loop = asyncio.get_running_loop()
+        group = self._groups.setdefault(loop, _CommitGroup())
+        waiter = loop.create_future()
+        group.queued.append(({"sid": sid, "status": status, "received_at": _utcnow()}, waiter))
+        if group.busy:
+            try:
+                lead = await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Chosen to lead the next commit but gone; pass it on.
+                    self._lead_next(group)
+                raise
+            if not lead:
+                self.start()
+                return
+        group.busy = True
+        batch, group.queued = group.queued, []
+        failed = True
+        try:
+            await db.execute(insert(CallStatusEvent), [row for row, _waiter in batch])
+            await db.commit()
+            failed = False
+        finally:
+            self.stats["callback_commits"] += 1
+            for _row, other in batch:
+                if other is not waiter and not other.done():
+                    if failed:
+                        other.set_exception(RuntimeError("Storing status callbacks failed"))
+                    else:
+                        other.set_result(False)
+            self._lead_next(group)
+        self.start()
+
+    @staticmethod
+    def _lead_next(group):
+        for _row, waiter in group.queued:
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        # Rows left only by canceled requests are dropped with them.
+        group.queued = []
+        group.busy = False
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="status-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+        self.flush()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """Apply buffered placements and up to ``batch_size`` stored callbacks;
+        returns the number of rows changed."""
+        with self._flush_lock:
+            # Placements stay buffered (and ``placed``) until they are committed.
+            with self._lock:
+                by_log, jobs = dict(self._placements), dict(self._jobs)
+            try:
+                changed = self._write(by_log, jobs)
+            except Exception:
+                self.stats["failures"] += 1
+                logger.exception("Status flush of %d placements failed; will retry", len(by_log))
+                return 0
+            with self._lock:
+                for log_id in by_log:
+                    if self._placements.get(log_id) is by_log[log_id]:
+                        del self._placements[log_id]
+                        self._jobs.pop(log_id, None)
+            self.stats["flushes"] += 1
+            return changed
+
+    def _claim(self, db):
+        """Delete the oldest stored callbacks and return them collapsed per SID.
+
+        Deleting is the claim: a concurrent flush in another process can't
+        get the same rows, and a rollback puts them back.
+        """
+        oldest = select(CallStatusEvent.id).order_by(CallStatusEvent.id).limit(self.batch_size)
+        if db.get_bind().dialect.name == "postgresql":
+            oldest = oldest.with_for_update(skip_locked=True)
+        rows = db.execute(
+            delete(CallStatusEvent)
+            .where(CallStatusEvent.id.in_(oldest))
+            .returning(CallStatusEvent.sid, CallStatusEvent.status, CallStatusEvent.received_at)
+        ).all()
+        by_sid = {}
+        for sid, status, received_at in rows:
+            self.stats["received"] += 1
+            if _merge_into(by_sid, sid, _Update(status, received_at=received_at)):
+                self.stats["coalesced"] += 1
+        return by_sid
+
+    def _write(self, by_log, jobs):
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            by_sid = self._claim(db)
+            if not by_log and not by_sid:
+                db.rollback()
+                return 0
+            changed, hang_ups, retried = self._apply(db, by_log, by_sid, jobs)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+        for retry in retried:
+            retries.arm(retry)
+        for sid in hang_ups:
+            cancellation._pool.submit(_hang_up_canceled, sid)
+        progress_stream.hub.notify(log.send_job_id for log in changed)
+        self.stats["written"] += len(changed)
+        return len(changed)
+
+    def _apply(self, db, by_log, by_sid, jobs):
+        # Copies: callbacks merged in here must not leak into the buffer.
+        by_log = {log_id: _Update(u.status, u.sid, u.received_at) for log_id, u in by_log.items()}
+        if by_sid:
+            # SIDs placed in this flush aren't in the table yet.
+            found = {update.sid: log_id for log_id, update in by_log.items() if update.sid}
+            found.update(db.execute(
+                select(CallLog.twilio_call_sid, CallLog.id).where(CallLog.twilio_call_sid.in_(list(by_sid)))
+            ).all())
+            cutoff = _utcnow() - timedelta(seconds=self.orphan_seconds)
+            unresolved = []
+            for sid, update in by_sid.items():
+                if sid in found:
+                    _merge_into(by_log, found[sid], update)
+                elif update.received_at > cutoff:
+                    unresolved.append({"sid": sid, "status": update.status, "received_at": update.received_at})
+                else:
+                    logger.warning("Dropping status %r for unknown call %s", update.status, sid)
+            if unresolved:
+                db.execute(insert(CallStatusEvent), unresolved)
+
+        # updated_at is the write time so readers can page through changes.
+        now = datetime.now(timezone.utc)
+        changed, hang_ups, moves = [], [], Counter()
+        q = select(CallLog).where(CallLog.id.in_(list(by_log)))
+        if db.get_bind().dialect.name == "postgresql":
+            # Status and the SendJob counters are read-modify-write; other
+            # processes write the same calls.
+            q = q.order_by(CallLog.id).with_for_update()
+        for log in db.scalars(q) if by_log else ():
+            update = by_log[log.id]
+            if update.sid and not log.twilio_call_sid:
+                log.twilio_call_sid = update.sid
+                if log.status == "canceled":
+                    # Canceled while calls.create was in flight: stop it right away.
+                    hang_ups.append(update.sid)
+                    continue
+            if rank(update.status) <= rank(log.status):
+                if update.status != log.status:
+                    self.stats["stale"] += 1
+                continue
+            moves[(log.send_job_id, log.status, update.status)] += 1
+            log.status = update.status
+            log.updated_at = now
+            changed.append(log)
+        for (send_job_id, old, new), n in moves.items():
+            send_jobs.move(db, send_job_id, old, new, n)
+        analytics.record(db, changed)
+        retried = []
+        for log in changed:
+            retry = retries.add_retry(db, log)
+            if retry is not None:
+                retried.append(retry)
+        if jobs:
+            # With the SID stored, a job leased again elsewhere sees the call
+            # as placed and skips it.
+            db.execute(
+                delete(DispatchJob)
+                .where(DispatchJob.id.in_([job_id for job_id, _lease_owner in jobs.values()]))
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
+        return changed, hang_ups, retried
+
+
+def _hang_up_canceled(sid):
+    from caller import get_cancel_twilio_client
+    try:
+        cancellation.hang_up(get_cancel_twilio_client(), sid, "initiated")
+    except Exception as e:
+        logger.warning("Could not hang up canceled call %s: %s", sid, e)
+
+
+writer = StatusWriter()
@@ -1,4 +1,5 @@
 import os
+import itertools
 import tempfile
 import pytest
 import bcrypt
@@ -11,6 +12,8 @@ _test_db_fd, _test_db_path = tempfile.mkstemp(suffix=".db")
 os.close(_test_db_fd)
 os.environ["DATABASE_URL"] = f"sqlite:///{_test_db_path}"
 os.environ["SECRET_KEY"] = "test-secret"
+os.environ["TWILIO_CPS"] = "1000"
+os.environ["QUERY_STATS_HEADERS"] = "1"
 
 from httpx import ASGITransport, AsyncClient
 from fastapi.testclient import TestClient
@@ -18,19 +21,29 @@ from database import engine, SessionLocal, get_db
 from models import Base, Organization, User, Member, Recording, Meeting, CallLog
 from auth import create_access_token
 from app import app
+import dispatch
+import status_writer
+import twiml_cache
 
 
 @pytest.fixture(scope="session", autouse=True)
 def setup_db():
     Base.metadata.create_all(bind=engine)
     yield
+    dispatch.worker.stop()
+    status_writer.writer.stop()
     Base.metadata.drop_all(bind=engine)
-    os.unlink(_test_db_path)
+    engine.dispose()
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(_test_db_path + suffix):
+            os.unlink(_test_db_path + suffix)
 
 
 @pytest.fixture(autouse=True)
 def clean_db():
     yield
+    twiml_cache.cache.clear()
+    status_writer.writer.clear()
     db = SessionLocal()
     try:
         for table in reversed(Base.metadata.sorted_tables):
@@ -49,6 +62,18 @@ def db():
         db.close()
 
 
+@pytest.fixture
+def query_budget():
+    """``query_budget(response, n)`` fails if the request ran more than n queries."""
+    def check(response, budget):
+        count = int(response.headers["X-DB-Query-Count"])
+        assert count <= budget, (
+            f"{response.request.method} {response.request.url.path} ran {count} queries, budget is {budget}"
+        )
+        return count
+    return check
+
+
 @pytest.fixture
 def client():
     return TestClient(app)
@@ -95,7 +120,11 @@ def second_client(second_org):
     return c
 
 
-def make_member(org_id, name="John Doe", phone="+15551234567"):
+_phones = itertools.count(1234567)
+
+
+def make_member(org_id, name="John Doe", phone=None):
+    phone = phone or f"+1555{next(_phones):07d}"
     db = SessionLocal()
     m = Member(org_id=org_id, name=name, phone=phone)
     db.add(m)
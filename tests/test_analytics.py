@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+from tests.conftest import make_member, make_recording, make_meeting
+from database import SessionLocal
+from models import CallLog, DailyCallStats, MemberCallStats
+import analytics
+import status_writer
+
+TODAY = datetime.now().replace(hour=12, minute=0, second=0, microsecond=0)
+
+
+def _calls(org_id, outcomes):
+    """``outcomes`` maps member name -> list of (days_ago, final status)."""
+    rec_id = make_recording(org_id)
+    members = {name: make_member(org_id, name=name, phone=f"+1555{i:07d}") for i, name in enumerate(outcomes)}
+    mtg_id = make_meeting(org_id, member_ids=list(members.values()))
+    db = SessionLocal()
+    sids = []
+    for name, calls in outcomes.items():
+        for days_ago, status in calls:
+            sid = f"CA_an_{len(sids)}"
+            db.add(CallLog(org_id=org_id, meeting_id=mtg_id, recording_id=rec_id, member_id=members[name],
+                           status="initiated", twilio_call_sid=sid, initiated_at=TODAY - timedelta(days=days_ago)))
+            sids.append((sid, status))
+    db.commit()
+    db.close()
+    for sid, status in sids:
+        status_writer.writer.record_callback(sid, status)
+    status_writer.writer.flush()
+    return mtg_id, members
+
+
+def test_webhook_updates_stats_incrementally(auth_client):
+    mtg_id, members = _calls(auth_client._org_id, {
+        "Reachable": [(0, "completed"), (1, "completed"), (2, "completed")],
+        "Hard": [(0, "busy"), (1, "no-answer"), (2, "completed")],
+    })
+    # A repeated final callback is stale and must not count twice.
+    status_writer.writer.record_callback("CA_an_0", "completed")
+    status_writer.writer.flush()
+
+    db = SessionLocal()
+    stats = {s.member_id: s for s in db.query(MemberCallStats)}
+    assert (stats[members["Hard"]].calls, stats[members["Hard"]].completed) == (3, 1)
+    assert stats[members["Reachable"]].calls == 3
+    assert sum(d.calls for d in db.query(DailyCallStats).filter_by(meeting_id=mtg_id)) == 6
+    db.close()
+
+    data = auth_client.get("/api/analytics?days=7").json()
+    assert [d["calls"] for d in data["days"]] == [2, 2, 2]
+    assert data["days"][-1]["busy"] == 1
+    (meeting,) = data["meetings"]
+    assert meeting["answer_rate"] == round(4 / 6, 3)
+    assert [m["name"] for m in data["least_reachable"]] == ["Hard", "Reachable"]
+    assert data["least_reachable"][0]["answer_rate"] == round(1 / 3, 3)
+
+
+def test_rebuild_matches_incremental(auth_client):
+    _calls(auth_client._org_id, {"A": [(0, "completed"), (3, "failed")], "B": [(1, "no-answer")]})
+    db = SessionLocal()
+    before = analytics.daily(db, auth_client._org_id), analytics.least_reachable(db, auth_client._org_id, 1)
+    assert analytics.rebuild(db, auth_client._org_id) == 3
+    db.commit()
+    assert (analytics.daily(db, auth_client._org_id), analytics.least_reachable(db, auth_client._org_id, 1)) == before
+    db.close()
+
+
+def test_analytics_page_is_tenant_scoped(auth_client, second_client):
+    _calls(auth_client._org_id, {"Mine": [(0, "busy"), (1, "busy"), (2, "busy")]})
+    assert "Mine" in auth_client.get("/analytics").text
+    assert "Mine" not in second_client.get("/analytics").text
+    assert second_client.get("/api/analytics").json()["days"] == []
@@ -0,0 +1,51 @@
+import re
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from tests.conftest import make_member, make_recording, make_meeting
+from database import SessionLocal
+from models import CallLog
+
+
+def _history(org_id):
+    alice = make_member(org_id, name="Alice", phone="+15550000001")
+    bob = make_member(org_id, name="Bob", phone="+15550000002")
+    rec_id = make_recording(org_id)
+    mtg_id = make_meeting(org_id, member_ids=[alice, bob])
+    start = datetime(2025, 6, 1, 12, 0)
+    db = SessionLocal()
+    for i, status in enumerate(["completed", "busy", "completed", "no-answer", "completed"]):
+        db.add(CallLog(org_id=org_id, meeting_id=mtg_id, recording_id=rec_id, member_id=alice if i % 2 else bob,
+                       status=status, initiated_at=start + timedelta(days=i), twilio_call_sid=f"CA_log_{i}"))
+    db.commit()
+    db.close()
+    return mtg_id, alice, bob
+
+
+def _sids(html):
+    return re.findall(r"CA_log_\d", html)
+
+
+def test_log_pages_by_keyset(auth_client):
+    _history(auth_client._org_id)
+    with patch("app.LOG_PAGE_SIZE", 2):
+        first = auth_client.get("/log")
+        assert _sids(first.text) == ["CA_log_4", "CA_log_3"]
+        older = re.search(r'href="/log\?([^"]*before=[^"]*)"', first.text).group(1).replace("&amp;", "&")
+        second = auth_client.get(f"/log?{older}")
+        assert _sids(second.text) == ["CA_log_2", "CA_log_1"]
+        assert "Newest" in second.text
+
+
+def test_log_filters_and_facets(auth_client):
+    mtg_id, alice, _bob = _history(auth_client._org_id)
+    resp = auth_client.get(f"/log?member_id={alice}")
+    assert _sids(resp.text) == ["CA_log_3", "CA_log_1"]
+
+    resp = auth_client.get("/log?status=completed&date_from=2025-06-02&date_to=2025-06-03")
+    assert _sids(resp.text) == ["CA_log_2"]
+    assert "busy: 1" in resp.text
+    assert "completed: 1" in resp.text
+
+    resp = auth_client.get(f"/log?meeting_id={mtg_id}")
+    assert "All: 5" in resp.text
+    assert "completed: 3" in resp.text
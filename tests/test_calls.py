@@ -1,7 +1,9 @@
 from unittest.mock import patch, MagicMock
 from tests.conftest import make_member, make_recording, make_meeting
 from database import SessionLocal
-from models import CallLog
+from models import CallLog, Recording
+import status_writer
+import twiml_cache
 
 
 def test_send_creates_call_logs(auth_client):
@@ -19,8 +21,9 @@ def test_send_creates_call_logs(auth_client):
         }, follow_redirects=True)
         assert resp.status_code == 200
 
-    import time
-    time.sleep(1)
+        import time
+        time.sleep(1)
+        status_writer.writer.flush()
 
     db = SessionLocal()
     logs = db.query(CallLog).filter_by(meeting_id=mtg_id).all()
@@ -36,6 +39,46 @@ def test_twiml_valid_recording(client):
     assert "Play" in resp.text or "play" in resp.text
 
 
+def test_twiml_is_served_from_cache(auth_client):
+    from sqlalchemy import event
+    from database import engine
+    rec_id = make_recording(auth_client._org_id, name="Test", filename="1/test.mp3")
+    first = auth_client.get(f"/twiml?recording_id={rec_id}")
+
+    statements = []
+    listener = lambda *args: statements.append(args[2])
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        again = auth_client.get(f"/twiml?recording_id={rec_id}")
+        not_modified = auth_client.get(f"/twiml?recording_id={rec_id}",
+                                       headers={"If-None-Match": first.headers["etag"]})
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+    assert statements == []
+    assert again.text == first.text
+    assert "max-age" in again.headers["cache-control"]
+    assert not_modified.status_code == 304
+
+    auth_client.post(f"/recordings/{rec_id}/delete")
+    resp = auth_client.get(f"/twiml?recording_id={rec_id}")
+    assert "No recording" in resp.text
+    assert resp.headers["cache-control"] == "no-store"
+
+
+def test_twiml_for_unfinished_recording_is_not_cached(client):
+    rec_id = make_recording(1, name="Test", filename="1/test.mp3")
+    db = SessionLocal()
+    db.get(Recording, rec_id).status = "processing"
+    db.commit()
+    db.close()
+
+    resp = client.get(f"/twiml?recording_id={rec_id}")
+    assert "1/test.mp3" in resp.text
+    assert resp.headers["cache-control"] == "no-store"
+    assert "etag" not in resp.headers
+    assert len(twiml_cache.cache) == 0
+
+
 def test_twiml_invalid_recording(client):
     resp = client.get("/twiml?recording_id=99999")
     assert resp.status_code == 200
@@ -66,6 +109,7 @@ def test_call_status_webhook(client):
         "CallSid": "CA_test123", "CallStatus": "completed"
     })
     assert resp.status_code == 204
+    status_writer.writer.flush()
 
     db = SessionLocal()
     updated = db.get(CallLog, log_id)
@@ -89,3 +133,77 @@ def test_send_progress(auth_client):
     data = resp.json()
     assert data["total"] == 1
     assert data["completed"] == 1
+
+
+def test_send_reminders_fans_out_in_batches(auth_client):
+    org_id = auth_client._org_id
+    m_ids = [make_member(org_id, name=f"M{i}", phone=f"+1555000000{i}") for i in range(5)]
+    db = SessionLocal()
+    from models import Member, DispatchJob
+    db.get(Member, m_ids[2]).active = False
+    db.commit()
+    db.close()
+    rec_id = make_recording(org_id)
+    mtg_id = make_meeting(org_id, member_ids=m_ids)
+
+    from caller import send_reminders
+    with patch("caller.FANOUT_BATCH_SIZE", 2), patch("dispatch.worker.wake") as wake:
+        send_reminders(mtg_id, rec_id, org_id)
+
+    assert wake.call_count == 2
+    db = SessionLocal()
+    logs = db.query(CallLog).filter_by(meeting_id=mtg_id).all()
+    assert sorted(l.member_id for l in logs) == sorted(m_ids[:2] + m_ids[3:])
+    assert all(l.status == "queued" for l in logs)
+    jobs = db.query(DispatchJob).filter(DispatchJob.call_log_id.in_([l.id for l in logs])).all()
+    assert {j.call_log_id: j.phone for j in jobs} == {l.id: f"+1555000000{m_ids.index(l.member_id)}" for l in logs}
+    db.close()
+
+
+def test_twilio_client_is_shared(monkeypatch):
+    import caller
+    monkeypatch.setenv("TWILIO_ACCOUNT_SID", "ACtest")
+    monkeypatch.setenv("TWILIO_AUTH_TOKEN", "token")
+    caller.reset_twilio_client()
+    try:
+        client = caller.get_twilio_client()
+        assert caller.get_twilio_client() is client
+        adapter = client.http_client.session.get_adapter("https://api.twilio.com")
+        assert adapter._pool_maxsize == caller.dispatch.DISPATCH_CONCURRENCY
+        assert client.http_client.timeout == caller.TWILIO_TIMEOUT
+        # Hang-ups don't wait for dispatch's connections.
+        cancel_client = caller.get_cancel_twilio_client()
+        assert cancel_client is not client
+        adapter = cancel_client.http_client.session.get_adapter("https://api.twilio.com")
+        assert adapter._pool_maxsize == caller.cancellation.CANCEL_CONCURRENCY
+    finally:
+        caller.reset_twilio_client()
+
+
+def test_latency_stats():
+    from caller import LatencyStats
+    stats = LatencyStats()
+    for ms in range(1, 101):
+        stats.record(ms / 1000, ok=ms != 100)
+    snap = stats.snapshot()
+    assert snap["count"] == 100
+    assert snap["errors"] == 1
+    assert snap["p50_ms"] == 51.0
+    assert snap["max_ms"] == 100.0
+
+
+def test_dispatch_stats_report_twilio_latency(auth_client, monkeypatch):
+    import caller
+    assert auth_client.get("/api/dispatch-stats").status_code == 404
+    monkeypatch.setattr("app.OPS_ENDPOINTS", True)
+    monkeypatch.setenv("TWILIO_ACCOUNT_SID", "ACtest")
+    monkeypatch.setenv("TWILIO_AUTH_TOKEN", "token")
+    caller.reset_twilio_client()
+    try:
+        caller.get_twilio_client().http_client.latency.record(0.02)
+        stats = auth_client.get("/api/dispatch-stats").json()
+    finally:
+        caller.reset_twilio_client()
+    assert stats["twilio_latency"]["sync"]["count"] == 1
+    assert stats["twilio_latency"]["sync"]["p50_ms"] == 20.0
+    assert stats["concurrency_limit"] >= 1
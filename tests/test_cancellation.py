@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+import pytest
+import cancellation
+import dispatch
+from tests.conftest import make_member, make_recording, make_meeting
+from database import SessionLocal
+from models import CallLog, DispatchJob
+
+
+@pytest.fixture(autouse=True)
+def fresh_registry():
+    dispatch.worker.stop()
+    cancellation.registry.clear()
+    yield
+    cancellation.registry.clear()
+
+
+def _campaign(org_id):
+    rec_id = make_recording(org_id)
+    m_ids = [make_member(org_id, name=f"M{i}", phone=f"+1555000000{i}") for i in range(4)]
+    mtg_id = make_meeting(org_id, member_ids=m_ids)
+    db = SessionLocal()
+    statuses = [("queued", None), ("scheduled", None), ("ringing", "CA_ring"), ("in-progress", "CA_talk")]
+    for m_id, (status, sid) in zip(m_ids, statuses):
+        log = CallLog(org_id=org_id, meeting_id=mtg_id, recording_id=rec_id, member_id=m_id,
+                      status=status, twilio_call_sid=sid)
+        db.add(log)
+        db.flush()
+        if status == "queued":
+            dispatch.enqueue(db, log.id, "+15550000000", rec_id, "localhost", "http", "", meeting_id=mtg_id)
+    db.commit()
+    db.close()
+    return mtg_id
+
+
+def test_cancel_reports_each_stage(auth_client):
+    mtg_id = _campaign(auth_client._org_id)
+
+    with patch("caller.get_cancel_twilio_client") as mock_twilio:
+        resp = auth_client.post("/api/cancel-calls", data={"meeting_id": mtg_id})
+
+    data = resp.json()
+    assert data["queued"] == 1
+    assert data["scheduled"] == 1
+    assert data["in_flight"] == 2
+    assert data["canceled"] == 4
+    assert "elapsed_ms" in data
+    updates = {c.args[0]: c.kwargs for c in mock_twilio.return_value.calls.call_args_list}
+    assert set(updates) == {"CA_ring", "CA_talk"}
+    mock_twilio.return_value.calls.return_value.update.assert_any_call(status="completed")
+    mock_twilio.return_value.calls.return_value.update.assert_any_call(status="canceled")
+
+    db = SessionLocal()
+    assert {l.status for l in db.query(CallLog).filter_by(meeting_id=mtg_id)} == {"canceled"}
+    assert db.query(DispatchJob).count() == 0
+    db.close()
+
+
+def test_cancel_other_orgs_meeting(auth_client, second_client):
+    mtg_id = _campaign(auth_client._org_id)
+    resp = second_client.post("/api/cancel-calls", data={"meeting_id": mtg_id})
+    assert resp.status_code == 404
+
+
+def test_registry_drops_claimed_job_without_db_check():
+    registry = cancellation.CancellationRegistry()
+    before = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(seconds=1)
+    registry.cancel(7)
+    after = datetime.now(timezone.utc) + timedelta(seconds=1)
+    assert registry.is_canceled(7, before)
+    assert not registry.is_canceled(7, after)
+    assert not registry.is_canceled(8, before)
+
+
+def test_worker_skips_canceled_meeting(auth_client):
+    mtg_id = _campaign(auth_client._org_id)
+    db = SessionLocal()
+    [job] = dispatch.claim(db, "worker", 1)
+    db.close()
+    cancellation.registry.cancel(mtg_id)
+
+    with patch("caller._should_place") as should_place:
+        dispatch.run_job(job)
+
+    should_place.assert_not_called()
+    db = SessionLocal()
+    assert db.query(DispatchJob).count() == 0
+    db.close()
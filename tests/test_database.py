@@ -0,0 +1,48 @@
+import threading
+from sqlalchemy import text
+from database import engine, SessionLocal, DB_POOL_SIZE
+from models import Member
+
+
+def test_sqlite_pragmas():
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() > 0
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+
+def test_concurrent_writers_do_not_lock(auth_client):
+    """Dispatch-sized bursts of writers wait for the lock instead of failing."""
+    errors = []
+
+    def write(i):
+        db = SessionLocal()
+        try:
+            for j in range(10):
+                db.add(Member(org_id=auth_client._org_id, name=f"W{i}-{j}", phone=f"+1555{i:03d}{j:04d}"))
+                db.commit()
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=write, args=(i,)) for i in range(10)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    db = SessionLocal()
+    assert db.query(Member).filter_by(org_id=auth_client._org_id).count() == 100
+    db.close()
+
+
+def test_db_pool_stats(auth_client, client, monkeypatch):
+    assert auth_client.get("/api/db-pool").status_code == 404
+    monkeypatch.setattr("app.OPS_ENDPOINTS", True)
+    assert client.get("/api/db-pool", follow_redirects=False).status_code in (302, 303, 401)
+    stats = auth_client.get("/api/db-pool").json()
+    assert stats["sync"]["size"] == DB_POOL_SIZE
+    assert stats["sync"]["checked_out"] >= 0
+    assert stats["sync"]["overflow"] == 0
+    assert "async" in stats
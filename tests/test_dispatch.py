@@ -0,0 +1,233 @@
+import time
+import itertools
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch, MagicMock
+import pytest
+import dispatch
+import status_writer
+from tests.conftest import make_member, make_recording, make_meeting
+from database import SessionLocal
+from models import CallLog, DispatchJob
+
+
+@pytest.fixture(autouse=True)
+def idle_worker():
+    # Keep the process-wide worker from claiming the jobs these tests inspect.
+    dispatch.worker.stop()
+    yield
+
+
+_phones = itertools.count(2000000)
+
+
+def _queued_call(org_id, phone=None):
+    phone = phone or f"+1555{next(_phones):07d}"
+    m_id = make_member(org_id, phone=phone)
+    rec_id = make_recording(org_id)
+    mtg_id = make_meeting(org_id, member_ids=[m_id])
+    db = SessionLocal()
+    log = CallLog(org_id=org_id, meeting_id=mtg_id, recording_id=rec_id, member_id=m_id, status="queued")
+    db.add(log)
+    db.flush()
+    dispatch.enqueue(db, log.id, phone, rec_id, "localhost:5000", "http", "+15550000000")
+    db.commit()
+    log_id = log.id
+    db.close()
+    return log_id
+
+
+def _wait_for_empty_queue(timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db = SessionLocal()
+        remaining = db.query(DispatchJob).count()
+        db.close()
+        if not remaining:
+            return
+        time.sleep(0.05)
+
+
+def test_jobs_are_leased_to_one_worker(auth_client):
+    for _ in range(3):
+        _queued_call(auth_client._org_id)
+
+    db = SessionLocal()
+    first = dispatch.claim(db, "worker-a", 2)
+    second = dispatch.claim(db, "worker-b", 10)
+    db.close()
+
+    assert len(first) == 2
+    assert len(second) == 1
+    assert not {j.id for j in first} & {j.id for j in second}
+
+
+def test_expired_lease_is_recovered(auth_client):
+    _queued_call(auth_client._org_id)
+
+    db = SessionLocal()
+    [job] = dispatch.claim(db, "crashed", 1)
+    assert dispatch.claim(db, "survivor", 1) == []
+
+    db.query(DispatchJob).update({"lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)})
+    db.commit()
+    [recovered] = dispatch.claim(db, "survivor", 1)
+    db.close()
+
+    assert recovered.id == job.id
+    assert recovered.attempts == 2
+    assert recovered.lease_owner.startswith("survivor:")
+
+
+def test_run_job_places_call_and_removes_job(auth_client):
+    log_id = _queued_call(auth_client._org_id)
+
+    db = SessionLocal()
+    [job] = dispatch.claim(db, "worker", 1)
+    db.close()
+    with patch("caller.get_twilio_client") as mock_twilio:
+        mock_call = MagicMock()
+        mock_call.sid = "CA_dispatched"
+        mock_twilio.return_value.calls.create.return_value = mock_call
+        dispatch.run_job(job)
+        dispatch.run_job(job)
+    status_writer.writer.flush()
+
+    db = SessionLocal()
+    log = db.get(CallLog, log_id)
+    assert log.status == "initiated"
+    assert log.twilio_call_sid == "CA_dispatched"
+    assert db.query(DispatchJob).count() == 0
+    db.close()
+    assert mock_twilio.return_value.calls.create.call_count == 1
+
+
+def test_unwritten_placement_is_not_redialed(auth_client):
+    log_id = _queued_call(auth_client._org_id)
+
+    db = SessionLocal()
+    [job] = dispatch.claim(db, "worker", 1)
+    db.close()
+    writer = status_writer.writer
+    writer.stop()
+    with patch("caller.get_twilio_client") as mock_twilio, patch.object(writer, "start"):
+        mock_twilio.return_value.calls.create.return_value.sid = "CA_unstored"
+        with patch.object(status_writer.StatusWriter, "_apply", side_effect=RuntimeError("disk I/O error")):
+            dispatch.run_job(job)
+            assert writer.flush() == 0
+
+        db = SessionLocal()
+        assert db.get(CallLog, log_id).status == "queued"
+        assert db.query(DispatchJob).filter_by(id=job.id, status="claimed").count() == 1
+        assert writer.held_leases() == {job.lease_owner}
+        # The lease runs out before the write succeeds; another lease skips the call.
+        db.query(DispatchJob).update({"lease_expires_at": datetime.now(timezone.utc) - timedelta(seconds=1)})
+        db.commit()
+        [again] = dispatch.claim(db, "other", 1)
+        db.close()
+        dispatch.run_job(again)
+        assert writer.flush() == 1
+
+    db = SessionLocal()
+    assert db.get(CallLog, log_id).twilio_call_sid == "CA_unstored"
+    assert db.query(DispatchJob).count() == 0
+    db.close()
+    assert mock_twilio.return_value.calls.create.call_count == 1
+
+
+def test_worker_drains_queue(auth_client):
+    log_id = _queued_call(auth_client._org_id)
+
+    with patch("caller.get_twilio_client") as mock_twilio:
+        mock_call = MagicMock()
+        mock_call.sid = "CA_worker"
+        mock_twilio.return_value.calls.create.return_value = mock_call
+        worker = dispatch.DispatchWorker(concurrency=2, poll_interval=0.05)
+        worker.wake()
+        _wait_for_empty_queue()
+        worker.stop()
+    status_writer.writer.flush()
+
+    db = SessionLocal()
+    assert db.get(CallLog, log_id).twilio_call_sid == "CA_worker"
+    db.close()
+
+
+def test_throttled_call_is_requeued(auth_client):
+    from twilio.base.exceptions import TwilioRestException
+    log_id = _queued_call(auth_client._org_id)
+
+    db = SessionLocal()
+    [job] = dispatch.claim(db, "worker", 1)
+    db.close()
+    limiter = dispatch.pacing.AIMDLimiter(initial=4, cooldown=0)
+    with patch("caller.get_twilio_client") as mock_twilio, patch("pacing.call_pacer.pause"):
+        mock_twilio.return_value.calls.create.side_effect = TwilioRestException(429, "/Calls.json")
+        dispatch.run_job(job, limiter)
+
+    db = SessionLocal()
+    assert db.get(CallLog, log_id).status == "queued"
+    requeued = db.query(DispatchJob).one()
+    assert requeued.status == "pending"
+    assert requeued.attempts == 0
+    assert requeued.run_at > datetime.now(timezone.utc).replace(tzinfo=None)
+    db.close()
+    assert limiter.limit == 2
+
+
+def test_async_engine_places_calls(auth_client):
+    from unittest.mock import AsyncMock
+    log_ids = [_queued_call(auth_client._org_id, phone=f"+1555123456{i}") for i in range(3)]
+
+    client = MagicMock()
+    client.http_client.close = AsyncMock()
+    client.calls.create_async = AsyncMock(side_effect=lambda **kw: MagicMock(sid="CA" + kw["to"][-4:]))
+    with patch("caller.make_async_twilio_client", return_value=client):
+        worker = dispatch.AsyncDispatchWorker(concurrency=50, poll_interval=0.05)
+        worker.wake()
+        _wait_for_empty_queue()
+        worker.stop()
+    status_writer.writer.flush()
+
+    db = SessionLocal()
+    logs = [db.get(CallLog, i) for i in log_ids]
+    assert [l.status for l in logs] == ["initiated"] * 3
+    assert sorted(l.twilio_call_sid for l in logs) == ["CA4560", "CA4561", "CA4562"]
+    db.close()
+    client.http_client.close.assert_awaited_once()
+
+
+def test_claims_capped_by_pacer_rate(monkeypatch):
+    monkeypatch.setattr(dispatch.pacing.call_pacer, "rate", 0.05)
+    monkeypatch.setattr(dispatch, "DISPATCH_LEASE_SECONDS", 120)
+    # 0.05 calls/s only starts 3 calls in half a 120s lease.
+    assert dispatch.claim_budget(500, 0) == 3
+    assert dispatch.claim_budget(500, 2) == 1
+    assert dispatch.claim_budget(2, 0) == 2
+
+
+def test_in_flight_leases_are_renewed(auth_client):
+    _queued_call(auth_client._org_id)
+
+    db = SessionLocal()
+    [job] = dispatch.claim(db, "slow", 1, lease_seconds=0)
+    dispatch.renew(db, [job.lease_owner])
+    assert dispatch.claim(db, "other", 1) == []
+    db.close()
+
+
+def test_call_placed_elsewhere_during_pacer_wait_is_skipped(auth_client):
+    log_id = _queued_call(auth_client._org_id)
+
+    def placed_meanwhile():
+        db = SessionLocal()
+        db.get(CallLog, log_id).twilio_call_sid = "CA_other_lease"
+        db.commit()
+        db.close()
+
+    db = SessionLocal()
+    [job] = dispatch.claim(db, "worker", 1)
+    db.close()
+    with patch("caller.get_twilio_client") as mock_twilio, \
+            patch("pacing.call_pacer.acquire", side_effect=placed_meanwhile):
+        dispatch.run_job(job)
+    mock_twilio.return_value.calls.create.assert_not_called()
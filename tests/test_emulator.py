@@ -0,0 +1,93 @@
+import time
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from loadtest.twilio_emulator import EmulatorConfig, create_app
+
+CALLS = "/2010-04-01/Accounts/ACtest/Calls.json"
+EVENTS = ["initiated", "ringing", "answered", "completed"]
+
+
+def _capture_app(received):
+    sink = FastAPI()
+
+    @sink.post("/api/call-status")
+    async def call_status(request: Request):
+        form = await request.form()
+        received.append((form["CallSid"], form["CallStatus"]))
+        return {}
+
+    return sink
+
+
+def _create(client, **extra):
+    data = {"To": "+15551234567", "From": "+15550000000", "Url": "http://app/twiml",
+            "StatusCallback": "http://app/api/call-status", "StatusCallbackEvent": EVENTS, **extra}
+    return client.post(CALLS, data=data)
+
+
+def test_answered_call_lifecycle():
+    received = []
+    config = EmulatorConfig(api_latency_ms=0, api_jitter_ms=0, answer_rate=1, busy_rate=0, fail_rate=0,
+                            time_scale=0.001, seed=1)
+    api = create_app(config, transport=httpx.ASGITransport(app=_capture_app(received)))
+    with TestClient(api) as client:
+        resp = _create(client)
+        assert resp.status_code == 201
+        sid = resp.json()["sid"]
+        deadline = time.monotonic() + 5
+        while len(received) < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        stats = client.get("/stats").json()
+
+    assert received == [(sid, "initiated"), (sid, "ringing"), (sid, "in-progress"), (sid, "completed")]
+    assert stats["callbacks_sent"] == 4
+    assert stats["statuses"] == {"completed": 1}
+
+
+def test_throttling_and_errors():
+    api = create_app(EmulatorConfig(api_latency_ms=0, api_jitter_ms=0, cps=2, time_scale=100))
+    with TestClient(api) as client:
+        codes = [_create(client, StatusCallback="").status_code for _ in range(4)]
+        assert codes == [201, 201, 429, 429]
+        assert client.post(CALLS, data={"To": "+1"}).json()["code"] == 20429
+
+    api = create_app(EmulatorConfig(api_latency_ms=0, api_jitter_ms=0, error_rate=1))
+    with TestClient(api) as client:
+        resp = _create(client)
+        assert resp.status_code == 500
+        assert client.get("/stats").json()["errors"] == 1
+
+
+def test_twilio_client_against_emulator(monkeypatch):
+    import socket
+    import threading
+    import uvicorn
+    import caller
+    from twilio.base.exceptions import TwilioRestException
+
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    api = create_app(EmulatorConfig(api_latency_ms=0, api_jitter_ms=0, cps=1, time_scale=100))
+    server = uvicorn.Server(uvicorn.Config(api, port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    try:
+        while not server.started:
+            time.sleep(0.01)
+        monkeypatch.setenv("TWILIO_ACCOUNT_SID", "ACtest")
+        monkeypatch.setenv("TWILIO_AUTH_TOKEN", "token")
+        monkeypatch.setattr(caller, "TWILIO_API_BASE_URL", f"http://127.0.0.1:{port}")
+        client = caller._build_client(caller.PooledHttpClient(pool_size=2))
+        call = client.calls.create(to="+15551234567", from_="+15550000000", url="http://app/twiml")
+        assert call.sid.startswith("CA")
+        try:
+            client.calls.create(to="+15551234567", from_="+15550000000", url="http://app/twiml")
+            raise AssertionError("expected a throttle error")
+        except TwilioRestException as e:
+            assert caller.pacing.is_throttle_error(e)
+        assert client.http_client.latency.snapshot()["count"] == 2
+    finally:
+        server.should_exit = True
+        thread.join(5)
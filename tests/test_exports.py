@@ -0,0 +1,79 @@
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from tests.conftest import make_member, make_recording, make_meeting
+from database import SessionLocal
+from models import CallLog
+import exports
+import retention
+
+START = datetime(2025, 6, 1, 12, 0)
+
+
+def _history(org_id):
+    alice = make_member(org_id, name="Alice")
+    bob = make_member(org_id, name="Bob")
+    rec_id = make_recording(org_id)
+    mtg_id = make_meeting(org_id, member_ids=[alice, bob])
+    db = SessionLocal()
+    for i, status in enumerate(["completed", "busy", "completed", "no-answer", "completed"]):
+        db.add(CallLog(org_id=org_id, meeting_id=mtg_id, recording_id=rec_id, member_id=alice if i % 2 else bob,
+                       status=status, initiated_at=START + timedelta(days=i), twilio_call_sid=f"CA_exp_{i}"))
+    db.commit()
+    db.close()
+    return mtg_id, alice
+
+
+def _csv(resp):
+    return list(csv.DictReader(io.StringIO(resp.text)))
+
+
+def test_call_log_csv_merges_archive_oldest_first(auth_client):
+    mtg_id, _alice = _history(auth_client._org_id)
+    # The first three calls move to the archive.
+    retention.run(now=START + timedelta(days=2, hours=1) + timedelta(days=retention.CALL_LOG_RETENTION_DAYS))
+
+    with patch("exports.EXPORT_BATCH_SIZE", 2), patch("exports.EXPORT_CHUNK_BYTES", 100):
+        resp = auth_client.get(f"/api/export/call-log?meeting_id={mtg_id}")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/csv")
+    assert "attachment" in resp.headers["content-disposition"]
+    rows = _csv(resp)
+    assert [r["twilio_call_sid"] for r in rows] == [f"CA_exp_{i}" for i in range(5)]
+    assert [r["archived"] for r in rows] == ["True"] * 3 + ["False"] * 2
+    assert rows[0]["member"] == "Bob"
+    assert rows[0]["initiated_at"] == START.isoformat()
+
+
+def test_call_log_ndjson_filters(auth_client):
+    _mtg_id, alice = _history(auth_client._org_id)
+    resp = auth_client.get("/api/export/call-log?format=ndjson&status=completed&date_from=2025-06-02")
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in resp.text.splitlines()]
+    assert [r["twilio_call_sid"] for r in rows] == ["CA_exp_2", "CA_exp_4"]
+    assert set(rows[0]) == set(exports.CALL_LOG_FIELDS)
+
+    resp = auth_client.get(f"/api/export/call-log?member_id={alice}&date_to=2025-06-02")
+    assert [r["twilio_call_sid"] for r in _csv(resp)] == ["CA_exp_1"]
+
+
+def test_member_export_and_tenancy(auth_client, second_client):
+    make_member(auth_client._org_id, name="Zed", phone="+15550001111")
+    make_member(auth_client._org_id, name="Amy", phone="+15550002222")
+    make_member(second_client._org_id, name="Other", phone="+15550003333")
+
+    rows = _csv(auth_client.get("/api/export/members"))
+    assert [(r["name"], r["phone"]) for r in rows] == [("Amy", "+15550002222"), ("Zed", "+15550001111")]
+    rows = [json.loads(line) for line in second_client.get("/api/export/members?format=ndjson").text.splitlines()]
+    assert [r["name"] for r in rows] == ["Other"]
+    assert rows[0]["active"] is True
+
+    _history(second_client._org_id)
+    assert _csv(auth_client.get("/api/export/call-log")) == []
+
+
+def test_unknown_format_rejected(auth_client):
+    assert auth_client.get("/api/export/members?format=xml").status_code == 400
+    assert auth_client.get("/api/export/call-log?format=xlsx").status_code == 400
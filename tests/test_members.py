@@ -1,5 +1,24 @@
 import io
+import re
+import time
+from datetime import datetime, timedelta, timezone
 from tests.conftest import make_member
+from database import SessionLocal
+from models import Member, MemberImport
+import member_import
+import heartbeats
+
+
+def _import_csv(client, data, mode="insert"):
+    """Upload a roster and wait for its background import; returns the final members page."""
+    resp = client.post("/members", files={"csv_file": ("members.csv", data, "text/csv")}, data={"mode": mode},
+                       follow_redirects=False)
+    import_id = re.search(r"import_id=(\d+)", resp.headers["location"]).group(1)
+    deadline = time.monotonic() + 10
+    while client.get(f"/api/member-imports/{import_id}").json()["status"] in ("pending", "running"):
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+    return client.get(f"/members?import_id={import_id}")
 
 
 def test_add_member_valid(auth_client):
@@ -34,25 +53,99 @@ def test_deactivate_member(auth_client):
 
 def test_csv_import_valid(auth_client):
     csv_data = "Alice,5551112222\nBob,5553334444\n"
-    resp = auth_client.post("/members", files={"csv_file": ("members.csv", csv_data.encode(), "text/csv")},
-                            follow_redirects=True)
+    resp = _import_csv(auth_client, csv_data.encode())
     assert "2 added" in resp.text
 
 
 def test_csv_import_invalid_phones_skipped(auth_client):
     csv_data = "Alice,5551112222\nBob,123\n"
-    resp = auth_client.post("/members", files={"csv_file": ("members.csv", csv_data.encode(), "text/csv")},
-                            follow_redirects=True)
+    resp = _import_csv(auth_client, csv_data.encode())
     assert "1 added" in resp.text
     assert "1 skipped" in resp.text
 
 
 def test_csv_import_empty(auth_client):
-    resp = auth_client.post("/members", files={"csv_file": ("empty.csv", b"", "text/csv")},
-                            follow_redirects=True)
+    resp = _import_csv(auth_client, b"")
     assert "0 added" in resp.text
 
 
+def test_csv_import_streams_in_batches_with_error_report(auth_client, monkeypatch):
+    import member_import
+    monkeypatch.setattr(member_import, "MEMBER_IMPORT_BATCH_SIZE", 50)
+    lines = ["Name,Phone"]
+    for i in range(1000):
+        lines.append(f"Member {i},(555) {i:03d}-{i:04d}" if i % 100 else f"Member {i},not a phone")
+    lines += ["", ",5551234567", "Only Name", '"Multi\nLine",5559998888']
+    resp = _import_csv(auth_client, "\n".join(lines).encode())
+    assert "991 added" in resp.text
+
+    job_id = re.search(r"/api/member-imports/(\d+)/errors", resp.text).group(1)
+    status = auth_client.get(f"/api/member-imports/{job_id}").json()
+    assert (status["rows"], status["added"], status["skipped"], status["percent"]) == (1004, 991, 13, 100.0)
+    report = auth_client.get(f"/api/member-imports/{job_id}/errors").text.splitlines()
+    assert report[0] == "line,reason,name,phone"
+    assert report[1] == "1,invalid phone,Name,Phone"
+    assert report[2] == "2,invalid phone,Member 0,not a phone"
+    assert report[-2:] == ["1003,missing name,,5551234567", "1004,missing phone,Only Name,"]
+
+
+def _roster(org_id):
+    from database import SessionLocal
+    from models import Member
+    db = SessionLocal()
+    rows = {m.phone: (m.name, m.active) for m in db.query(Member).filter_by(org_id=org_id)}
+    db.close()
+    return rows
+
+
+def test_csv_import_modes_upsert_by_phone(auth_client):
+    org_id = auth_client._org_id
+    _import_csv(auth_client, b"Alice,5551112222\nBob,5553334444\nCarol,5555556666\n")
+
+    resp = _import_csv(auth_client, b"Alicia,(555) 111-2222\nDan,5557778888\nDan Again,5557778888\n")
+    assert "1 added" in resp.text and "2 already present" in resp.text
+    assert _roster(org_id)["+15551112222"] == ("Alice", True)
+    assert _roster(org_id)["+15557778888"] == ("Dan", True)
+
+    resp = _import_csv(auth_client, b"Alicia,5551112222\nDaniel,5557778888\n", mode="update")
+    assert "0 added" in resp.text and "2 updated" in resp.text
+    assert len(_roster(org_id)) == 4
+    assert _roster(org_id)["+15551112222"] == ("Alicia", True)
+
+    resp = _import_csv(auth_client, b"Bobby,5553334444\nErin,5559990000\n", mode="sync")
+    assert "1 added" in resp.text and "1 updated" in resp.text and "3 deactivated" in resp.text
+    roster = _roster(org_id)
+    assert roster["+15553334444"] == ("Bobby", True)
+    assert roster["+15559990000"] == ("Erin", True)
+    assert sorted(phone for phone, (_name, active) in roster.items() if not active) == [
+        "+15551112222", "+15555556666", "+15557778888"]
+
+    # A sync with nothing valid in it leaves the roster alone.
+    resp = _import_csv(auth_client, b"Nobody,123\n", mode="sync")
+    assert "deactivated" not in resp.text
+    assert _roster(org_id)["+15553334444"] == ("Bobby", True)
+
+
+def test_duplicate_phone_rejected(auth_client):
+    auth_client.post("/members", data={"name": "Jane", "phone": "5551234000"})
+    resp = auth_client.post("/members", data={"name": "Jane Again", "phone": "(555) 123-4000"},
+                            follow_redirects=True)
+    assert "already exists" in resp.text
+    other = make_member(auth_client._org_id, phone="+15551234001")
+    resp = auth_client.post(f"/members/{other}/edit", data={"name": "X", "phone": "5551234000", "active": "1"},
+                            follow_redirects=True)
+    assert "already has that phone" in resp.text
+    assert len(_roster(auth_client._org_id)) == 2
+
+
+def test_csv_import_is_tenant_scoped(auth_client, second_client):
+    resp = auth_client.post("/members", files={"csv_file": ("m.csv", b"A,5551112222", "text/csv")},
+                            follow_redirects=False)
+    import_id = re.search(r"import_id=(\d+)", resp.headers["location"]).group(1)
+    assert second_client.get(f"/api/member-imports/{import_id}").status_code == 404
+    assert second_client.get(f"/api/member-imports/{import_id}/errors").status_code == 404
+
+
 def test_phone_validation():
     from app import _valid_phone
     assert _valid_phone("5551234567") == "+15551234567"
@@ -61,3 +154,78 @@ def test_phone_validation():
     assert _valid_phone("abc") is None
     assert _valid_phone("12345") is None
     assert _valid_phone("") is None
+
+
+def test_update_meeting_members(auth_client):
+    from tests.conftest import make_meeting
+    from database import SessionLocal
+    from models import Meeting
+    keep = make_member(auth_client._org_id, name="Keep")
+    drop = make_member(auth_client._org_id, name="Drop")
+    mtg_id = make_meeting(auth_client._org_id, member_ids=[keep, drop])
+
+    resp = auth_client.post(f"/meetings/{mtg_id}/members", data={"member_ids": [str(keep)]},
+                            follow_redirects=True)
+    assert "Meeting members updated" in resp.text
+    db = SessionLocal()
+    assert [m.id for m in db.get(Meeting, mtg_id).members] == [keep]
+    db.close()
+
+
+def test_interrupted_imports_resume_on_startup(auth_client, tmp_path, monkeypatch):
+    monkeypatch.setattr(member_import, "MEMBER_IMPORT_DIR", str(tmp_path))
+    long_ago = datetime.now(timezone.utc) - timedelta(seconds=heartbeats.JOB_STALE_SECONDS + 1)
+    db = SessionLocal()
+    cut_short = MemberImport(org_id=auth_client._org_id, filename="a.csv", status="running", size_bytes=24,
+                             owner="dead", heartbeat_at=long_ago)
+    lost = MemberImport(org_id=auth_client._org_id, filename="b.csv", status="pending",
+                        owner="dead", heartbeat_at=long_ago)
+    # Still running in a sibling worker, which keeps its heartbeat fresh.
+    live = MemberImport(org_id=auth_client._org_id, filename="c.csv", status="running", owner="sibling")
+    done = MemberImport(org_id=auth_client._org_id, filename="d.csv", status="done")
+    db.add_all([cut_short, lost, live, done])
+    db.commit()
+    cut_short_id, lost_id, live_id, done_id = cut_short.id, lost.id, live.id, done.id
+    db.close()
+    (tmp_path / f"{cut_short_id}.csv").write_text("Resumed,5557770001\n")
+    (tmp_path / f"{live_id}.csv").write_text("Sibling,5557770005\n")
+    (tmp_path / f"{done_id}.csv").write_text("Finished,5557770006\n")
+    (tmp_path / "999.csv").write_text("Stale,5557770002\n")
+
+    member_import.resume()
+    deadline = time.monotonic() + 10
+    while auth_client.get(f"/api/member-imports/{cut_short_id}").json()["status"] in ("pending", "running"):
+        assert time.monotonic() < deadline
+        time.sleep(0.02)
+
+    assert auth_client.get(f"/api/member-imports/{cut_short_id}").json()["added"] == 1
+    lost_job = auth_client.get(f"/api/member-imports/{lost_id}").json()
+    assert lost_job["status"] == "failed"
+    assert auth_client.get(f"/api/member-imports/{live_id}").json()["status"] == "running"
+    assert [p.name for p in tmp_path.iterdir()] == [f"{live_id}.csv"]
+    assert "Resumed" in auth_client.get("/members").text
+    assert "Sibling" not in auth_client.get("/members").text
+
+
+def test_sync_import_does_not_overlap_another(auth_client):
+    db = SessionLocal()
+    running = MemberImport(org_id=auth_client._org_id, filename="big.csv", status="running", mode="insert")
+    db.add(running)
+    db.commit()
+    running_id = running.id
+    db.close()
+
+    resp = auth_client.post("/members", files={"csv_file": ("m.csv", b"A,5557770003\n", "text/csv")},
+                            data={"mode": "sync"}, follow_redirects=True)
+    assert "Another import is still running" in resp.text
+
+    # A sync already underway keeps members another import is writing.
+    make_member(auth_client._org_id, name="FromOther", phone="+15557770004")
+    db = SessionLocal()
+    db.query(Member).filter_by(phone="+15557770004").update({"last_import_id": running_id})
+    db.commit()
+    sync = MemberImport(org_id=auth_client._org_id, filename="s.csv", status="running", mode="sync")
+    db.add(sync)
+    db.commit()
+    assert member_import._deactivate_missing(db, sync.id, auth_client._org_id) == 0
+    db.close()
@@ -0,0 +1,38 @@
+import time
+from pacing import TokenBucket, AIMDLimiter, is_throttle_error
+from twilio.base.exceptions import TwilioRestException
+
+
+def test_token_bucket_paces_to_rate():
+    bucket = TokenBucket(rate=50, burst=1)
+    start = time.monotonic()
+    for _ in range(6):
+        assert bucket.acquire()
+    assert time.monotonic() - start >= 0.09
+
+
+def test_token_bucket_timeout():
+    bucket = TokenBucket(rate=1, burst=1)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0.01)
+
+
+def test_aimd_grows_and_backs_off():
+    limiter = AIMDLimiter(initial=4, maximum=8, latency_target=1.0, cooldown=0)
+    for _ in range(40):
+        limiter.on_success(0.1)
+    assert limiter.limit == 8
+    limiter.on_throttle()
+    assert limiter.limit == 4
+    limiter.on_success(5.0)
+    assert limiter.limit == 2
+    for _ in range(5):
+        limiter.on_throttle()
+    assert limiter.limit == 1
+
+
+def test_throttle_detection():
+    assert is_throttle_error(TwilioRestException(429, "/Calls.json"))
+    assert is_throttle_error(TwilioRestException(400, "/Calls.json", code=20429))
+    assert not is_throttle_error(TwilioRestException(400, "/Calls.json", code=21211))
+    assert not is_throttle_error(ValueError("boom"))
@@ -0,0 +1,87 @@
+import json
+import asyncio
+import threading
+from unittest.mock import patch
+import progress_stream
+import status_writer
+from progress_stream import ProgressHub
+from tests.conftest import make_member, make_recording, make_meeting
+from database import SessionLocal
+from models import CallLog
+
+
+def _send(org_id, members=2):
+    from caller import send_reminders
+    m_ids = [make_member(org_id, name=f"M{i}", phone=f"+1555000000{i}") for i in range(members)]
+    mtg_id = make_meeting(org_id, member_ids=m_ids)
+    with patch("dispatch.worker.wake"):
+        send_id = send_reminders(mtg_id, make_recording(org_id), org_id)
+    db = SessionLocal()
+    log_ids = [l.id for l in db.query(CallLog).filter_by(send_job_id=send_id).order_by(CallLog.id)]
+    db.close()
+    return mtg_id, send_id, log_ids
+
+
+def _events(body):
+    events = []
+    for chunk in body.split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in chunk.splitlines() if not line.startswith(":"))
+        if "event" in lines:
+            events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_one_poll_fans_out_to_every_viewer(auth_client):
+    _mtg_id, send_id, log_ids = _send(auth_client._org_id)
+    hub = ProgressHub(interval=60)
+
+    async def scenario():
+        viewers = [hub.subscribe(send_id) for _ in range(3)]
+        assert len(hub._topics) == 1
+        await asyncio.sleep(0.1)
+        writer = status_writer.StatusWriter(interval=60)
+        with patch("status_writer.progress_stream.hub", hub):
+            writer.record_placement(log_ids[0], "CA_sse_1")
+            await asyncio.to_thread(writer.stop)
+        received = []
+        for q in viewers:
+            messages = [await asyncio.wait_for(q.get(), 5)]
+            while "event: counts" not in messages[-1]:
+                messages.append(await asyncio.wait_for(q.get(), 5))
+            received.append(messages)
+        for q in viewers:
+            hub.unsubscribe(send_id, q)
+        assert hub.viewers(send_id) == 0
+        return received
+
+    received = asyncio.run(scenario())
+    assert all(r == received[0] for r in received)
+    events = _events("".join(received[0]))
+    assert ("call", {"id": log_ids[0], "member": "M0", "phone": "+15550000000", "status": "initiated"}) in events
+    assert events[-1][1]["counts"]["initiated"] == 1
+
+
+def test_stream_sends_snapshot_then_changes(auth_client, monkeypatch):
+    mtg_id, send_id, log_ids = _send(auth_client._org_id)
+    monkeypatch.setattr(progress_stream, "PROGRESS_STREAM_MAX_SECONDS", 1.5)
+
+    def complete_call():
+        status_writer.writer.record_placement(log_ids[1], "CA_sse_2")
+
+    timer = threading.Timer(0.5, complete_call)
+    timer.start()
+    resp = auth_client.get(f"/api/send-progress/stream?meeting_id={mtg_id}")
+    timer.join()
+
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = _events(resp.text)
+    name, data = events[0]
+    assert name == "snapshot"
+    assert data["send_id"] == send_id
+    assert [r["status"] for r in data["rows"]] == ["queued", "queued"]
+    assert ("call", {"id": log_ids[1], "member": "M1", "phone": "+15550000001", "status": "initiated"}) in events
+
+
+def test_stream_needs_a_send(auth_client, second_client):
+    mtg_id, _send_id, _log_ids = _send(auth_client._org_id)
+    assert second_client.get(f"/api/send-progress/stream?meeting_id={mtg_id}").status_code == 404
@@ -0,0 +1,53 @@
+from unittest.mock import patch
+from tests.conftest import make_member, make_recording, make_meeting
+from database import SessionLocal
+from models import CallLog
+
+
+def _campaign(org_id, size=20):
+    m_ids = [make_member(org_id, name=f"M{i}", phone=f"+155500000{i:02d}") for i in range(size)]
+    rec_id = make_recording(org_id)
+    mtg_id = make_meeting(org_id, member_ids=m_ids)
+    return mtg_id, rec_id, m_ids
+
+
+def test_send_progress_budget(auth_client, query_budget):
+    from caller import send_reminders
+    mtg_id, rec_id, _m_ids = _campaign(auth_client._org_id)
+    with patch("dispatch.worker.wake"):
+        send_reminders(mtg_id, rec_id, auth_client._org_id)
+    resp = auth_client.get(f"/api/send-progress?meeting_id={mtg_id}")
+    assert len(resp.json()["rows"]) == 20
+    query_budget(resp, 3)
+
+
+def test_legacy_send_progress_budget(auth_client, query_budget):
+    mtg_id, rec_id, m_ids = _campaign(auth_client._org_id)
+    db = SessionLocal()
+    db.add_all(CallLog(org_id=auth_client._org_id, meeting_id=mtg_id, recording_id=rec_id, member_id=m,
+                       status="completed") for m in m_ids)
+    db.commit()
+    db.close()
+    resp = auth_client.get(f"/api/send-progress?meeting_id={mtg_id}")
+    assert resp.json()["completed"] == 20
+    query_budget(resp, 5)
+
+
+def test_call_log_budget(auth_client, query_budget):
+    mtg_id, rec_id, m_ids = _campaign(auth_client._org_id)
+    db = SessionLocal()
+    db.add_all(CallLog(org_id=auth_client._org_id, meeting_id=mtg_id, recording_id=rec_id, member_id=m,
+                       status="completed") for m in m_ids)
+    db.commit()
+    db.close()
+    resp = auth_client.get("/log")
+    assert resp.text.count("badge badge-completed") == 20
+    query_budget(resp, 8)
+
+
+def test_meeting_members_budget(auth_client, query_budget):
+    mtg_id, _rec_id, _m_ids = _campaign(auth_client._org_id)
+    resp = auth_client.get(f"/api/meeting-members?meeting_id={mtg_id}")
+    assert len(resp.json()["members"]) == 20
+    query_budget(resp, 3)
+    assert float(resp.headers["X-DB-Time-Ms"]) >= 0
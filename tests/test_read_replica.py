@@ -0,0 +1,58 @@
+import os
+import tempfile
+import pytest
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import sessionmaker
+from fastapi.testclient import TestClient
+from tests.conftest import _auth_cookies
+from database import engine, PRIMARY_COOKIE
+from models import Base, Organization, User, Member
+from app import app
+import database
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """A second SQLite file standing in for a read replica."""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    replica_engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=replica_engine)
+    monkeypatch.setattr(database, "read_engine", replica_engine)
+    monkeypatch.setattr(database, "ReadSessionLocal", sessionmaker(bind=replica_engine))
+
+    def replicate(*tables):
+        with engine.connect() as src, replica_engine.begin() as dst:
+            for table in tables:
+                rows = [dict(r) for r in src.execute(select(table)).mappings()]
+                if rows:
+                    dst.execute(insert(table), rows)
+
+    yield replica_engine, replicate
+    replica_engine.dispose()
+    os.unlink(path)
+
+
+def test_reads_go_to_replica_until_the_user_writes(auth_client, replica):
+    replica_engine, replicate = replica
+    org_id = auth_client._org_id
+    replicate(Organization.__table__, User.__table__)
+    with replica_engine.begin() as conn:
+        conn.execute(insert(Member), [{"org_id": org_id, "name": "Only On Replica", "phone": "+15550001111"}])
+
+    assert "Only On Replica" in auth_client.get("/members").text
+
+    resp = auth_client.post("/meetings", data={"title": "Fresh Meeting", "meeting_date": "2025-07-01"},
+                            follow_redirects=False)
+    assert PRIMARY_COOKIE in resp.cookies
+    # Pinned: the meeting only exists on the primary and is visible right away.
+    assert "Fresh Meeting" in auth_client.get("/meetings").text
+    assert "Only On Replica" not in auth_client.get("/members").text
+
+    unpinned = TestClient(app, cookies=_auth_cookies(auth_client._user_id, org_id))
+    assert "Fresh Meeting" not in unpinned.get("/meetings").text
+
+
+def test_no_replica_means_no_pin(auth_client):
+    resp = auth_client.post("/meetings", data={"title": "M", "meeting_date": "2025-07-01"}, follow_redirects=False)
+    assert PRIMARY_COOKIE not in resp.cookies
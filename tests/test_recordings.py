@@ -0,0 +1,152 @@
+import os
+import sys
+import time
+import asyncio
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from httpx import ASGITransport, AsyncClient
+from app import app
+from tests.conftest import _auth_cookies
+from database import SessionLocal
+from models import Recording
+import transcoding
+import heartbeats
+
+
+@pytest.fixture
+def slow_ffmpeg(tmp_path, monkeypatch):
+    """Stand-in for ffmpeg that takes a second and writes the output file."""
+    script = tmp_path / "ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys, time\n"
+        "time.sleep(1)\n"
+        "open(sys.argv[-1], 'wb').write(b'mp3')\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setattr(transcoding, "FFMPEG", str(script))
+
+
+def _upload(client, name):
+    return client.post("/api/recordings", data={"name": name},
+                       files={"audio": (f"{name}.webm", b"webm", "audio/webm")})
+
+
+def _wait(client, rec_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while True:
+        data = client.get(f"/api/recordings/{rec_id}").json()
+        if data["status"] != "processing" or time.monotonic() > deadline:
+            return data
+        time.sleep(0.05)
+
+
+def _upload_path(filename):
+    return os.path.join(transcoding.UPLOAD_FOLDER, filename)
+
+
+def test_upload_returns_before_transcode(auth_client, slow_ffmpeg):
+    started = time.monotonic()
+    resp = _upload(auth_client, "Agenda")
+    assert time.monotonic() - started < 0.5
+    assert resp.status_code == 202
+    data = resp.json()
+    assert data["status"] == "processing"
+    assert "Converting" in auth_client.get("/recordings").text
+    assert ">Agenda<" not in auth_client.get("/send").text
+
+    done = _wait(auth_client, data["id"])
+    assert done["status"] == "ready"
+    assert os.path.exists(_upload_path(data["filename"]))
+    assert not os.path.exists(transcoding.source_path(data["filename"]))
+    assert ">Agenda<" in auth_client.get("/send").text
+    os.remove(_upload_path(data["filename"]))
+
+
+def test_webhook_responsive_during_transcode(auth_client, slow_ffmpeg):
+    cookies = _auth_cookies(auth_client._user_id, auth_client._org_id)
+
+    async def scenario():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test", cookies=cookies) as client:
+            upload = await client.post(
+                "/api/recordings", data={"name": "Agenda"},
+                files={"audio": ("agenda.webm", b"webm", "audio/webm")},
+            )
+            await asyncio.sleep(0.3)
+            started = time.monotonic()
+            webhook = await client.post("/api/call-status", data={"CallSid": "CA_none", "CallStatus": "ringing"})
+            twiml = await client.get("/twiml?recording_id=0")
+            webhook_seconds = time.monotonic() - started
+            transcoding_status = (await client.get(f"/api/recordings/{upload.json()['id']}")).json()["status"]
+            return upload, webhook, twiml, webhook_seconds, transcoding_status
+
+    upload, webhook, twiml, webhook_seconds, transcoding_status = asyncio.run(scenario())
+    # ffmpeg was still running while the webhooks were answered.
+    assert transcoding_status == "processing"
+    assert webhook.status_code == 204
+    assert twiml.status_code == 200
+    assert webhook_seconds < 0.5
+
+    data = _wait(auth_client, upload.json()["id"])
+    assert data["status"] == "ready"
+    os.remove(_upload_path(data["filename"]))
+
+
+def test_failed_transcode_is_reported(auth_client, monkeypatch):
+    monkeypatch.setattr(transcoding, "FFMPEG", "false")
+    data = _wait(auth_client, _upload(auth_client, "Broken").json()["id"])
+    assert data["status"] == "failed"
+    assert data["error"] == "ffmpeg exited with status 1"
+    assert "Conversion failed: ffmpeg exited with status 1" in auth_client.get("/recordings").text
+    assert not os.path.exists(transcoding.source_path(data["filename"]))
+
+
+def test_transcode_timeout(auth_client, slow_ffmpeg, monkeypatch):
+    monkeypatch.setattr(transcoding, "TRANSCODE_TIMEOUT_SECONDS", 0.2)
+    data = _wait(auth_client, _upload(auth_client, "Slow").json()["id"])
+    assert data["status"] == "failed"
+    assert data["error"] == "timed out after 0.2 seconds"
+
+
+def test_resume_fails_recordings_without_upload(auth_client, second_client):
+    long_ago = datetime.now(timezone.utc) - timedelta(seconds=heartbeats.JOB_STALE_SECONDS + 1)
+    db = SessionLocal()
+    rec = Recording(org_id=auth_client._org_id, name="Lost", filename="0/missing.mp3", status="processing",
+                    owner="dead", heartbeat_at=long_ago)
+    # Still being transcoded by a sibling worker.
+    live = Recording(org_id=auth_client._org_id, name="Live", filename="0/live.mp3", status="processing",
+                     owner="sibling")
+    db.add_all([rec, live])
+    db.commit()
+    rec_id, live_id = rec.id, live.id
+    db.close()
+
+    with patch("transcoding.start") as start:
+        transcoding.resume()
+    start.assert_not_called()
+    data = auth_client.get(f"/api/recordings/{rec_id}").json()
+    assert data["status"] == "failed"
+    assert data["error"] == "upload lost before transcoding"
+    assert auth_client.get(f"/api/recordings/{live_id}").json()["status"] == "processing"
+    assert second_client.get(f"/api/recordings/{rec_id}").status_code == 404
+
+
+def test_resume_takes_over_stale_transcodes_once(auth_client):
+    os.makedirs(os.path.join(transcoding.UPLOAD_FOLDER, "0"), exist_ok=True)
+    with open(transcoding.source_path("0/stale.mp3"), "wb") as f:
+        f.write(b"webm")
+    db = SessionLocal()
+    rec = Recording(org_id=auth_client._org_id, name="Stale", filename="0/stale.mp3", status="processing",
+                    owner="dead", heartbeat_at=datetime.now(timezone.utc) - timedelta(hours=1))
+    db.add(rec)
+    db.commit()
+    rec_id = rec.id
+    db.close()
+
+    with patch("transcoding.start") as start:
+        transcoding.resume()
+        transcoding.resume()
+    start.assert_called_once_with(rec_id, "0/stale.mp3")
+    os.remove(transcoding.source_path("0/stale.mp3"))
@@ -0,0 +1,129 @@
+import gzip
+import threading
+from unittest.mock import patch
+import pytest
+from datetime import datetime, timedelta
+from tests.conftest import make_member, make_recording, make_meeting
+from database import SessionLocal
+from models import CallLog, CallLogArchive, CallRollup, DispatchJob
+import retention
+
+NOW = datetime(2025, 12, 1, 12, 0)
+
+
+def _calls(org_id, statuses, days_ago, prefix="CA_ret_"):
+    m_ids = [make_member(org_id, name=f"M{i}", phone=f"+1555{days_ago:03d}{i:04d}") for i in range(len(statuses))]
+    rec_id = make_recording(org_id)
+    mtg_id = make_meeting(org_id, member_ids=m_ids)
+    db = SessionLocal()
+    logs = [CallLog(org_id=org_id, meeting_id=mtg_id, recording_id=rec_id, member_id=m, status=s,
+                    twilio_call_sid=f"{prefix}{i}", initiated_at=NOW - timedelta(days=days_ago, hours=i))
+            for i, (m, s) in enumerate(zip(m_ids, statuses))]
+    db.add_all(logs)
+    db.commit()
+    ids = [log.id for log in logs]
+    db.close()
+    return mtg_id, ids
+
+
+def test_old_finished_calls_move_to_archive_and_rollups(auth_client):
+    org_id = auth_client._org_id
+    mtg_id, ids = _calls(org_id, ["completed", "completed", "busy", "queued"], days_ago=200)
+    _recent_mtg, recent_ids = _calls(org_id, ["completed"], days_ago=1, prefix="CA_new_")
+
+    assert retention.run(now=NOW, batch_size=2) == 3
+
+    db = SessionLocal()
+    assert {log.id for log in db.query(CallLog)} == {ids[3], recent_ids[0]}
+    assert sorted(a.id for a in db.query(CallLogArchive)) == sorted(ids[:3])
+    rollups = {(r.status, r.calls) for r in db.query(CallRollup).filter_by(meeting_id=mtg_id)}
+    assert rollups == {("completed", 2), ("busy", 1)}
+    db.close()
+    assert retention.run(now=NOW) == 0
+
+
+def test_log_and_progress_read_archived_calls(auth_client):
+    org_id = auth_client._org_id
+    mtg_id, _ids = _calls(org_id, ["completed", "completed", "busy"], days_ago=200)
+    retention.run(now=NOW)
+
+    resp = auth_client.get(f"/log?meeting_id={mtg_id}")
+    assert resp.text.count("CA_ret_") == 3
+    assert "All: 3" in resp.text
+    assert "completed: 2" in resp.text
+
+    progress = auth_client.get(f"/api/send-progress?meeting_id={mtg_id}").json()
+    assert progress["total"] == 3
+    assert progress["completed"] == 2
+    assert progress["failed"] == 1
+
+
+def test_calls_with_pending_dispatch_stay(auth_client):
+    org_id = auth_client._org_id
+    _mtg_id, ids = _calls(org_id, ["failed"], days_ago=200)
+    db = SessionLocal()
+    db.add(DispatchJob(call_log_id=ids[0], phone="+15550000000", recording_id=1, domain="x", scheme="https"))
+    db.commit()
+    db.close()
+    assert retention.run(now=NOW) == 0
+
+
+def test_export_to_compressed_files(auth_client, tmp_path):
+    org_id = auth_client._org_id
+    mtg_id, ids = _calls(org_id, ["completed", "no-answer"], days_ago=200)
+    assert retention.run(now=NOW, archive_dir=str(tmp_path)) == 2
+
+    (path,) = tmp_path.iterdir()
+    with gzip.open(path, "rt") as f:
+        lines = f.read().splitlines()
+    assert lines[0].startswith("id,org_id,meeting_id")
+    assert len(lines) == 3
+    db = SessionLocal()
+    assert db.query(CallLogArchive).count() == 0
+    assert db.query(CallLog).filter(CallLog.id.in_(ids)).count() == 0
+    assert db.query(CallRollup).filter_by(meeting_id=mtg_id).count() == 2
+    db.close()
+
+
+def test_rollups_add_up_across_runs(auth_client):
+    org_id = auth_client._org_id
+    mtg_id, _ids = _calls(org_id, ["busy", "busy"], days_ago=200)
+    assert retention.run(now=NOW, batch_size=1) == 2
+    db = SessionLocal()
+    [rollup] = db.query(CallRollup).filter_by(meeting_id=mtg_id).all()
+    assert rollup.calls == 2
+    db.close()
+
+
+def test_export_waits_for_commit(auth_client, tmp_path):
+    org_id = auth_client._org_id
+    _mtg_id, ids = _calls(org_id, ["completed"], days_ago=200)
+    with patch("sqlalchemy.orm.Session.commit", side_effect=RuntimeError("disk full")):
+        with pytest.raises(RuntimeError):
+            retention.run(now=NOW, archive_dir=str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
+    db = SessionLocal()
+    assert db.query(CallLog).filter(CallLog.id.in_(ids)).count() == 1
+    db.close()
+
+    assert retention.run(now=NOW, archive_dir=str(tmp_path)) == 1
+    (path,) = tmp_path.iterdir()
+    with gzip.open(path, "rt") as f:
+        assert len(f.read().splitlines()) == 2
+
+
+def test_scheduled_run_does_not_hold_up_the_timer():
+    started, release = threading.Event(), threading.Event()
+
+    def slow_run():
+        started.set()
+        release.wait(5)
+        return 0
+
+    with patch("retention.run", side_effect=slow_run), patch("retention.schedule") as reschedule:
+        retention._scheduled_run()
+        assert started.wait(5)
+        reschedule.assert_not_called()
+        release.set()
+        retention._pool.submit(lambda: None).result(5)
+    reschedule.assert_called_once_with()
@@ -0,0 +1,122 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+import retries
+import status_writer
+from tests.conftest import make_member, make_recording, make_meeting
+from database import SessionLocal
+from models import CallLog, RetryPolicy, DispatchJob
+
+
+def _policy(org_id, **kwargs):
+    db = SessionLocal()
+    policy = RetryPolicy(org_id=org_id, max_attempts=kwargs.pop("max_attempts", 3), backoff_seconds=60, **kwargs)
+    db.add(policy)
+    db.commit()
+    policy_id = policy.id
+    db.close()
+    return policy_id
+
+
+def _initiated_call(org_id, policy_id, sid="CA_retry", attempt=1):
+    m_id = make_member(org_id)
+    rec_id = make_recording(org_id)
+    mtg_id = make_meeting(org_id, member_ids=[m_id])
+    db = SessionLocal()
+    log = CallLog(org_id=org_id, meeting_id=mtg_id, recording_id=rec_id, member_id=m_id,
+                  retry_policy_id=policy_id, attempt=attempt, twilio_call_sid=sid, status="initiated")
+    db.add(log)
+    db.commit()
+    log_id = log.id
+    db.close()
+    return log_id
+
+
+def test_backoff_and_quiet_hours():
+    policy = RetryPolicy(max_attempts=3, backoff_seconds=600, backoff_factor=2,
+                         quiet_start="21:00", quiet_end="09:00", timezone="UTC")
+    noon = datetime(2025, 6, 15, 12, 0, tzinfo=timezone.utc)
+    assert retries.next_retry_time(policy, 1, noon) == noon + timedelta(minutes=10)
+    assert retries.next_retry_time(policy, 2, noon) == noon + timedelta(minutes=20)
+    assert retries.next_retry_time(policy, 3, noon) is None
+
+    late = datetime(2025, 6, 15, 20, 55, tzinfo=timezone.utc)
+    assert retries.next_retry_time(policy, 1, late) == datetime(2025, 6, 16, 9, 0, tzinfo=timezone.utc)
+
+
+def test_busy_webhook_schedules_one_retry(client):
+    policy_id = _policy(1)
+    log_id = _initiated_call(1, policy_id)
+
+    with patch.object(retries.scheduler, "schedule") as schedule:
+        client.post("/api/call-status", data={"CallSid": "CA_retry", "CallStatus": "busy"})
+        client.post("/api/call-status", data={"CallSid": "CA_retry", "CallStatus": "busy"})
+        status_writer.writer.flush()
+
+    db = SessionLocal()
+    [retry] = db.query(CallLog).filter(CallLog.id != log_id).all()
+    assert retry.status == "scheduled"
+    assert retry.attempt == 2
+    assert schedule.call_count == 1
+    assert schedule.call_args.args[1:] == (retries.fire_retry, retry.id)
+    db.close()
+
+
+def test_answered_call_is_not_retried(client):
+    policy_id = _policy(1)
+    _initiated_call(1, policy_id)
+
+    with patch.object(retries.scheduler, "schedule") as schedule:
+        client.post("/api/call-status", data={"CallSid": "CA_retry", "CallStatus": "completed"})
+        status_writer.writer.flush()
+
+    db = SessionLocal()
+    assert db.query(CallLog).count() == 1
+    db.close()
+    schedule.assert_not_called()
+
+
+def test_last_attempt_is_not_retried(client):
+    policy_id = _policy(1, max_attempts=2)
+    _initiated_call(1, policy_id, attempt=2)
+
+    with patch.object(retries.scheduler, "schedule"):
+        client.post("/api/call-status", data={"CallSid": "CA_retry", "CallStatus": "no-answer"})
+        status_writer.writer.flush()
+
+    db = SessionLocal()
+    assert db.query(CallLog).count() == 1
+    db.close()
+
+
+def test_fire_retry_dispatches_once(client):
+    policy_id = _policy(1)
+    log_id = _initiated_call(1, policy_id)
+    with patch.object(retries.scheduler, "schedule"):
+        client.post("/api/call-status", data={"CallSid": "CA_retry", "CallStatus": "busy"})
+        status_writer.writer.flush()
+    db = SessionLocal()
+    retry_id = db.query(CallLog.id).filter(CallLog.id != log_id).scalar()
+    db.close()
+
+    with patch("dispatch.worker.wake"):
+        retries.fire_retry(retry_id)
+        retries.fire_retry(retry_id)
+
+    db = SessionLocal()
+    assert db.get(CallLog, retry_id).status == "queued"
+    assert db.query(DispatchJob).filter_by(call_log_id=retry_id).count() == 1
+    db.close()
+
+
+def test_timer_scheduler_fires_in_order():
+    scheduler = retries.TimerScheduler()
+    fired = []
+    done = threading.Event()
+    now = datetime.now(timezone.utc)
+    scheduler.schedule(now + timedelta(milliseconds=60), lambda: (fired.append("late"), done.set()))
+    scheduler.schedule(now + timedelta(milliseconds=10), fired.append, "early")
+    scheduler.schedule(now - timedelta(seconds=5), fired.append, "overdue")
+    assert done.wait(2)
+    scheduler.stop()
+    assert fired == ["overdue", "early", "late"]
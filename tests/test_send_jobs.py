@@ -0,0 +1,131 @@
+from unittest.mock import patch
+import pytest
+import cancellation
+import dispatch
+import status_writer
+from tests.conftest import make_member, make_recording, make_meeting
+from database import SessionLocal
+from models import CallLog, SendJob
+
+
+@pytest.fixture(autouse=True)
+def stopped_worker():
+    dispatch.worker.stop()
+    cancellation.registry.clear()
+    yield
+    cancellation.registry.clear()
+
+
+def _send(org_id, members=3):
+    from caller import send_reminders
+    m_ids = [make_member(org_id, name=f"M{i}", phone=f"+1555000000{i}") for i in range(members)]
+    rec_id = make_recording(org_id)
+    mtg_id = make_meeting(org_id, member_ids=m_ids)
+    with patch("dispatch.worker.wake"):
+        send_id = send_reminders(mtg_id, rec_id, org_id)
+    return mtg_id, send_id
+
+
+def _counters(send_id):
+    db = SessionLocal()
+    job = db.get(SendJob, send_id)
+    counts = {c: getattr(job, c) for c in ("total", "queued", "initiated", "completed", "failed", "canceled")}
+    db.close()
+    return counts
+
+
+def _place(send_id, sids):
+    from caller import _record_result
+    db = SessionLocal()
+    log_ids = [l.id for l in db.query(CallLog).filter_by(send_job_id=send_id).order_by(CallLog.id)]
+    db.close()
+    for log_id, sid in zip(log_ids, sids):
+        _record_result(log_id, sid)
+    status_writer.writer.flush()
+
+
+def test_send_creates_job_with_counters(auth_client):
+    mtg_id, send_id = _send(auth_client._org_id)
+    assert _counters(send_id) == {"total": 3, "queued": 3, "initiated": 0, "completed": 0, "failed": 0, "canceled": 0}
+
+    from caller import _record_result, _fail_call
+    db = SessionLocal()
+    log_ids = [l.id for l in db.query(CallLog).filter_by(send_job_id=send_id).order_by(CallLog.id)]
+    db.close()
+    _record_result(log_ids[0], "CA_sj_1")
+    _record_result(log_ids[1], None)
+    _fail_call(log_ids[2])
+    status_writer.writer.flush()
+    assert _counters(send_id) == {"total": 3, "queued": 0, "initiated": 1, "completed": 0, "failed": 2, "canceled": 0}
+
+    auth_client.post("/api/call-status", data={"CallSid": "CA_sj_1", "CallStatus": "ringing"})
+    auth_client.post("/api/call-status", data={"CallSid": "CA_sj_1", "CallStatus": "completed"})
+    auth_client.post("/api/call-status", data={"CallSid": "CA_sj_1", "CallStatus": "completed"})
+    status_writer.writer.flush()
+    assert _counters(send_id)["completed"] == 1
+    assert _counters(send_id)["initiated"] == 0
+
+
+def test_progress_reads_latest_send(auth_client):
+    org_id = auth_client._org_id
+    mtg_id, first = _send(org_id, members=2)
+    _place(first, ["CA_old_1", "CA_old_2"])
+    from caller import send_reminders
+    db = SessionLocal()
+    rec_id = db.get(SendJob, first).recording_id
+    db.close()
+    with patch("dispatch.worker.wake"):
+        second = send_reminders(mtg_id, rec_id, org_id)
+
+    data = auth_client.get(f"/api/send-progress?meeting_id={mtg_id}").json()
+    assert data["send_id"] == second
+    assert data["total"] == 2
+    assert data["queued"] == 2
+    assert len(data["rows"]) == 2
+
+    data = auth_client.get(f"/api/send-progress?send_id={first}").json()
+    assert data["counts"]["initiated"] == 2
+
+    history = auth_client.get(f"/api/sends?meeting_id={mtg_id}").json()["sends"]
+    assert [s["send_id"] for s in history] == [second, first]
+
+
+def test_progress_hides_other_orgs_send(auth_client, second_client):
+    _mtg_id, send_id = _send(auth_client._org_id)
+    resp = second_client.get(f"/api/send-progress?send_id={send_id}")
+    assert resp.status_code == 404
+    assert second_client.get("/api/sends").json()["sends"] == []
+
+
+def test_cancel_moves_counters(auth_client):
+    mtg_id, send_id = _send(auth_client._org_id)
+    _place(send_id, ["CA_live"])
+
+    with patch("caller.get_cancel_twilio_client"):
+        auth_client.post("/api/cancel-calls", data={"meeting_id": mtg_id})
+
+    assert _counters(send_id) == {"total": 3, "queued": 0, "initiated": 0, "completed": 0, "failed": 0, "canceled": 3}
+
+
+def test_progress_since_cursor_returns_changed_rows(auth_client):
+    from datetime import datetime, timedelta
+    from sqlalchemy import update
+    mtg_id, send_id = _send(auth_client._org_id)
+    data = auth_client.get(f"/api/send-progress?meeting_id={mtg_id}").json()
+    assert len(data["rows"]) == 3
+    cursor = data["cursor"]
+
+    # Age the untouched rows past the cursor overlap, then change one.
+    db = SessionLocal()
+    db.execute(update(CallLog).values(updated_at=datetime.fromisoformat(cursor) - timedelta(minutes=1)))
+    db.commit()
+    db.close()
+    _place(send_id, ["CA_delta"])
+
+    data = auth_client.get("/api/send-progress", params={"meeting_id": mtg_id, "since": cursor}).json()
+    assert [r["status"] for r in data["rows"]] == ["initiated"]
+    assert data["counts"]["initiated"] == 1
+    assert data["cursor"] > cursor
+
+    resp = auth_client.get("/api/send-progress", params={"meeting_id": mtg_id, "since": "yesterday"})
+    assert resp.status_code == 400
@@ -0,0 +1,144 @@
+import asyncio
+from unittest.mock import patch
+import pytest
+from httpx import ASGITransport, AsyncClient
+from app import app
+import status_writer
+from status_writer import StatusWriter
+from tests.conftest import make_member, make_recording, make_meeting
+from database import SessionLocal
+from models import CallLog
+
+
+@pytest.fixture
+def writer():
+    # Callbacks are stored in one table; keep the process-wide writer's
+    # thread from draining it under these tests.
+    status_writer.writer.stop()
+    w = StatusWriter(interval=60)
+    with patch.object(status_writer.writer, "start"):
+        yield w
+    w.stop()
+
+
+def _log(org_id, status="queued", sid=None):
+    m_id = make_member(org_id)
+    rec_id = make_recording(org_id)
+    mtg_id = make_meeting(org_id, member_ids=[m_id])
+    db = SessionLocal()
+    log = CallLog(org_id=org_id, meeting_id=mtg_id, recording_id=rec_id, member_id=m_id,
+                  status=status, twilio_call_sid=sid)
+    db.add(log)
+    db.commit()
+    log_id = log.id
+    db.close()
+    return log_id
+
+
+def _status(log_id):
+    db = SessionLocal()
+    log = db.get(CallLog, log_id)
+    db.close()
+    return log.status, log.twilio_call_sid
+
+
+def test_updates_for_one_call_are_coalesced(client, writer):
+    log_id = _log(1)
+    writer.record_placement(log_id, "CA_w1")
+    for status in ("initiated", "ringing", "in-progress", "completed"):
+        writer.record_callback("CA_w1", status)
+
+    assert _status(log_id) == ("queued", None)
+    assert writer.pending() == 5
+    assert writer.flush() == 1
+    assert _status(log_id) == ("completed", "CA_w1")
+    assert writer.stats["coalesced"] == 3
+    assert writer.pending() == 0
+
+
+def test_stale_callback_is_dropped(client, writer):
+    log_id = _log(1, status="initiated", sid="CA_w2")
+    writer.record_callback("CA_w2", "completed")
+    writer.flush()
+    writer.record_callback("CA_w2", "ringing")
+    assert writer.flush() == 0
+    assert _status(log_id) == ("completed", "CA_w2")
+    assert writer.stats["stale"] == 1
+
+
+def test_failed_flush_is_retried(client, writer):
+    log_id = _log(1, status="initiated", sid="CA_w3")
+    writer.record_callback("CA_w3", "busy")
+    with patch.object(writer, "_apply", side_effect=RuntimeError("database is locked")):
+        assert writer.flush() == 0
+    assert writer.pending() == 1
+    assert _status(log_id)[0] == "initiated"
+
+    assert writer.flush() == 1
+    assert _status(log_id)[0] == "busy"
+
+
+def test_callbacks_outlive_the_process(client, writer):
+    log_id = _log(1, status="initiated", sid="CA_w6")
+    resp = client.post("/api/call-status", data={"CallSid": "CA_w6", "CallStatus": "completed"})
+    assert resp.status_code == 204
+    # Stored before the webhook answered; any writer picks it up.
+    assert writer.pending() == 1
+    assert writer.flush() == 1
+    assert _status(log_id)[0] == "completed"
+
+
+def test_callback_for_unknown_sid_waits_for_placement(client, writer):
+    log_id = _log(1)
+    writer.record_callback("CA_w4", "ringing")
+    writer.flush()
+    assert writer.pending() == 1
+
+    writer.record_placement(log_id, "CA_w4")
+    writer.flush()
+    assert _status(log_id) == ("ringing", "CA_w4")
+    assert writer.pending() == 0
+
+
+def test_placement_after_cancel_hangs_up(client, writer):
+    log_id = _log(1, status="canceled")
+    with patch("status_writer._hang_up_canceled") as hang_up, \
+            patch("cancellation._pool.submit", side_effect=lambda fn, *a: fn(*a)):
+        writer.record_placement(log_id, "CA_w5")
+        writer.flush()
+    hang_up.assert_called_once_with("CA_w5")
+    assert _status(log_id) == ("canceled", "CA_w5")
+
+
+def test_retry_is_queued_with_the_status(client, writer):
+    log_id = _log(1)
+    writer.record_placement(log_id, None)
+    with patch("retries.add_retry", side_effect=RuntimeError("database is locked")):
+        assert writer.flush() == 0
+    assert writer.placed(log_id)
+    assert _status(log_id)[0] == "queued"
+
+    with patch("retries.add_retry", return_value=None) as add_retry:
+        assert writer.flush() == 1
+    add_retry.assert_called_once()
+    assert not writer.placed(log_id)
+    assert _status(log_id)[0] == "failed"
+
+
+def test_concurrent_webhooks_share_commits(client, writer):
+    log_id = _log(1, status="initiated", sid="CA_w7")
+
+    async def scenario():
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(*(
+                ac.post("/api/call-status", data={"CallSid": "CA_w7", "CallStatus": "ringing"})
+                for _ in range(20)
+            ))
+
+    commits = status_writer.writer.stats["callback_commits"]
+    assert all(r.status_code == 204 for r in asyncio.run(scenario()))
+    assert writer.pending() == 20
+    assert status_writer.writer.stats["callback_commits"] - commits < 20
+    writer.flush()
+    assert _status(log_id)[0] == "ringing"
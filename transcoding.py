@@ -0,0 +1,103 @@
+import os
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import select, update
+from database import SessionLocal
+from models import Recording
+import heartbeats
+
+logger = logging.getLogger(__name__)
+
+FFMPEG = os.environ.get("FFMPEG", "ffmpeg")
+# One ffmpeg process per worker; uploads past this wait in the pool's queue.
+TRANSCODE_CONCURRENCY = int(os.environ.get("TRANSCODE_CONCURRENCY", str(os.cpu_count() or 1)))
+TRANSCODE_TIMEOUT_SECONDS = float(os.environ.get("TRANSCODE_TIMEOUT_SECONDS", "300"))
+UPLOAD_FOLDER = os.path.join(os.path.dirname(__file__), "uploads")
+
+_pool = ThreadPoolExecutor(TRANSCODE_CONCURRENCY, thread_name_prefix="transcode")
+heartbeat = heartbeats.Heartbeat(Recording)
+
+
+def source_path(filename):
+    """Where the upload for a recording's mp3 waits until it is transcoded."""
+    return os.path.join(UPLOAD_FOLDER, os.path.splitext(filename)[0] + ".webm")
+
+
+def start(recording_id, filename):
+    """Transcode a recording owned by this process (created with ``owner=heartbeats.OWNER``)."""
+    heartbeat.hold(recording_id)
+    return _pool.submit(run, recording_id, filename)
+
+
+def _transcode(src, dest):
+    """Returns None on success, else why ffmpeg failed."""
+    try:
+        proc = subprocess.run(
+            [FFMPEG, "-y", "-i", src, "-codec:a", "libmp3lame", "-qscale:a", "4", dest],
+            stdin=subprocess.DEVNULL, capture_output=True, timeout=TRANSCODE_TIMEOUT_SECONDS,
+        )
+    except subprocess.TimeoutExpired:
+        return f"timed out after {TRANSCODE_TIMEOUT_SECONDS:g} seconds"
+    except OSError as e:
+        return f"could not run ffmpeg: {e.strerror or e}"
+    if proc.returncode == 0:
+        return None
+    lines = proc.stderr.decode(errors="replace").strip().splitlines()
+    return lines[-1] if lines else f"ffmpeg exited with status {proc.returncode}"
+
+
+def run(recording_id, filename):
+    """Transcode a recording's upload to mp3 and mark it ready or failed."""
+    src, dest = source_path(filename), os.path.join(UPLOAD_FOLDER, filename)
+    try:
+        error = _transcode(src, dest)
+    finally:
+        heartbeat.release(recording_id)
+        if os.path.exists(src):
+            os.remove(src)
+    db = SessionLocal()
+    try:
+        rec = db.get(Recording, recording_id)
+        if rec is None or error:
+            if os.path.exists(dest):
+                os.remove(dest)
+        if rec is None:
+            return
+        if error:
+            logger.warning("Transcoding recording %d failed: %s", recording_id, error)
+            rec.status, rec.error = "failed", error[:500]
+        else:
+            rec.status = "ready"
+        db.commit()
+    finally:
+        db.close()
+
+
+def resume():
+    """Take over recordings whose process died mid-transcode; fail those whose upload is gone.
+
+    Recordings still kept alive by a sibling worker are left alone.
+    """
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(Recording.id, Recording.filename).where(
+            Recording.status == "processing", heartbeats.stale(Recording))).all()
+        queued = []
+        for rec_id, filename in rows:
+            if not heartbeat.claim(db, rec_id, Recording.status == "processing"):
+                continue
+            if os.path.exists(source_path(filename)):
+                queued.append((rec_id, filename))
+            else:
+                db.execute(update(Recording).where(Recording.id == rec_id).values(
+                    status="failed", error="upload lost before transcoding"))
+        db.commit()
+    finally:
+        db.close()
+    for rec_id, filename in queued:
+        start(rec_id, filename)
+
+
+def summary(rec):
+    return {"id": rec.id, "name": rec.name, "filename": rec.filename, "status": rec.status, "error": rec.error}
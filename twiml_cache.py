@@ -0,0 +1,68 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from twilio.twiml.voice_response import VoiceResponse
+
+TWIML_CACHE_SIZE = int(os.environ.get("TWIML_CACHE_SIZE", "1024"))
+# Bounds how long another worker process can serve TwiML for a recording
+# deleted through this one.
+TWIML_CACHE_TTL = float(os.environ.get("TWIML_CACHE_TTL", "300"))
+TWIML_MAX_AGE = int(os.environ.get("TWIML_MAX_AGE", "300"))
+
+
+def render(filename, base_url):
+    resp = VoiceResponse()
+    resp.play(f"{base_url}/uploads/{filename}")
+    return str(resp)
+
+
+class TwimlCache:
+    """Bounded LRU of rendered TwiML, keyed by (recording id, public base URL)."""
+
+    def __init__(self, maxsize=TWIML_CACHE_SIZE, ttl=TWIML_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, recording_id, base_url):
+        """Return ``(body, etag)`` or None."""
+        key = (recording_id, base_url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[1]
+
+    def put(self, recording_id, base_url, filename):
+        body = render(filename, base_url)
+        etag = '"%s"' % hashlib.sha1(body.encode()).hexdigest()[:16]
+        with self._lock:
+            self._entries[(recording_id, base_url)] = (body, etag, time.monotonic() + self.ttl)
+            self._entries.move_to_end((recording_id, base_url))
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return body, etag
+
+    def invalidate(self, recording_id):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == recording_id]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+cache = TwimlCache()